@@ -0,0 +1,19 @@
+from core_tools.analysis.run_analysis_functions import analyze_logs, format_summary_report
+import sys
+
+#Analyzes full log histories after a run: per-hour statistics, overall statistics and gas volume delivered (for flowrate logs)
+#Logs are read in chunks and split into segments processed in parallel, so memory use does not grow with the length of the logs
+#Archived logs (log.csv.gz, see archive_logs.py) can be analyzed the same way
+#To run script, use format: python3 <analyze_run.py filepath> <workers (0 for one per CPU)> <datatype> <log_filepath> <datatype> <log_filepath> (optional, as many pairs as needed)
+#If using venv, use format: .venv\Scripts\python.exe <analyze_run.py filepath> <workers (0 for one per CPU)> <datatype> <log_filepath> <datatype> <log_filepath> (optional, as many pairs as needed)
+#Supported datatypes are the same as for the GUI plots (e.g., outer_vessel_pressure, inner_vessel_pressure, flowrate, vmm_temperature:3)
+#The datatype and the filepath are separate arguments, so datatypes and filepaths can both hold colons (e.g., vmm_temperature:3 C:\logs\temperature_log.csv)
+
+if __name__ == '__main__':  # Required for the process pool on Windows
+    workers = int(sys.argv[1]) or None
+    if len(sys.argv) < 4 or len(sys.argv) % 2 != 0:
+        sys.exit('Give the logs to analyze as <datatype> <log_filepath> pairs, e.g. flowrate gas_flow_log.csv')
+    logs = list(zip(sys.argv[2::2], sys.argv[3::2]))
+
+    results = analyze_logs(logs, workers=workers)
+    print(format_summary_report(results))
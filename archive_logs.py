@@ -0,0 +1,22 @@
+from core_tools.archive.log_archive_functions import archive_closed_logs, LONGEST_LOG_INTERVAL_SEC
+import sys
+import time
+
+#Compresses closed log CSVs (not written to for at least min_age_hours) in a directory into seekable block archives (log.csv -> log.csv.gz + log.csv.gz.idx)
+#The GUI and get_data_for_GUI functions keep reading archived logs transparently, so nothing else has to change
+#min_age_hours must be longer than the longest interval a logger can log at (1hr from the GUI), otherwise a log that is still open can look closed between two rows
+#To run script, use format: python3 <archive_logs.py filepath> <log_directory> <min_age_hours> <check_interval_sec (optional, leave empty to archive once and exit)>
+#If using venv, use format: .venv\Scripts\python.exe <archive_logs.py filepath> <log_directory> <min_age_hours> <check_interval_sec (optional, leave empty to archive once and exit)>
+
+log_directory = sys.argv[1]
+min_age_sec = float(sys.argv[2]) * 3600
+check_interval_sec = float(sys.argv[3]) if len(sys.argv) > 3 else None
+if min_age_sec <= LONGEST_LOG_INTERVAL_SEC:
+    sys.exit(f'min_age_hours must be longer than {LONGEST_LOG_INTERVAL_SEC / 3600:g} hour(s), the longest interval the loggers can log at, or logs that are still open get archived')
+
+while True:
+    for archive_filepath in archive_closed_logs(log_directory, min_age_sec):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - Archived {archive_filepath}")
+    if check_interval_sec is None:
+        break
+    time.sleep(check_interval_sec)  # Keep running in the background, checking for newly closed logs
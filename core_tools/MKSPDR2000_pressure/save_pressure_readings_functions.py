@@ -2,6 +2,7 @@ import time
 import csv
 import os
 from .pressure_sensor_serial_class import MKSPDR2000Serial
+from ..analysis.leak_rate_estimator_class import LeakRateEstimator, create_leak_rate_log_csv
 
 '''Functions to handle pressure readings and log them to a CSV file'''
 
@@ -15,6 +16,33 @@ def get_pressure_readings(sensor):
     units = sensor.read_units()
     return convert_str_to_float(gauge1), convert_str_to_float(gauge2), units
 
+# Combines a single reading of both gauges into one pressure in Torr, same rules as get_outer_vessel_pressure in core_tools/gui/get_data_for_GUI.py
+# Returns NaN if there is no valid pressure reading
+def convert_pressure_to_torr(gauge1, gauge2, units):
+    if units == 'Off':
+        return float('nan')
+
+    if gauge1 != 'Off' and gauge2 == 'Off':
+        pressure = gauge1
+    elif gauge1 == 'Off' and gauge2 != 'Off':
+        pressure = gauge2
+    elif gauge1 == 'Off' and gauge2 == 'Off':
+        return float('nan')
+    elif gauge1 > 0.0 and gauge2 > 0.0:
+        pressure = min(gauge1, gauge2)
+    elif gauge1 > 0.0:
+        pressure = gauge1
+    elif gauge2 > 0.0:
+        pressure = gauge2
+    else:
+        return float('nan')
+
+    if units == 'Pascal':
+        pressure = pressure * 0.0075006168
+    elif units == 'Bar':
+        pressure = pressure * 750.06
+    return pressure
+
 # Creates a new CSV file with a header row if it doesn't already exist
 def create_pressure_log_csv(filepath):
     if not os.path.exists(filepath):  # Check if the file already exists
@@ -23,23 +51,51 @@ def create_pressure_log_csv(filepath):
             writer.writerow(['Time', 'Gauge 1', 'Gauge 2', 'Units'])  # Write column headers
 
 #Logs pressure readings to CSV at regular intervals indefinitely or for a set duration
-def log_pressure_to_csv(sensor, filepath, interval_sec, duration_sec=None): #None by default means run indefinitely unless specified
+#If a SampleStreamServer is given, every reading is also pushed (in Torr) to its subscribers on the 'outer_vessel_pressure' channel
+#If a leak rate log filepath is given, the pressure rise rate fitted over each of leak_rate_windows_sec is also logged for every reading (see LeakRateEstimator)
+#If an InterlockEngine is given, its rules are checked on every reading (in Torr, 'outer_vessel_pressure' channel) before anything else is done with it
+def log_pressure_to_csv(sensor, filepath, interval_sec, duration_sec=None, stream_server=None, leak_rate_filepath=None, leak_rate_windows_sec=(600, 3600, 6*3600), interlock=None): #None by default means run indefinitely unless specified
     start_time = time.time()
 
+    if leak_rate_filepath is not None:
+        create_leak_rate_log_csv(leak_rate_filepath, leak_rate_windows_sec)
+        leak_rate_estimator = LeakRateEstimator(leak_rate_windows_sec)
+        leak_rate_file = open(leak_rate_filepath, mode='a', newline='')
+        leak_rate_writer = csv.writer(leak_rate_file)
+
     with open(filepath, mode='a', newline='') as file:  # Open in append mode
         writer = csv.writer(file)
 
         while duration_sec is None or time.time() - start_time < duration_sec:  # Loop indefinitely or keep looping until time is up
             gauge1, gauge2, units = get_pressure_readings(sensor)  # Read current values
-            timestamp = time.strftime('%Y-%m-%d %H:%M:%S')         # Format current time
+            sample_time = time.time()
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sample_time))  # Format current time
+            pressure = convert_pressure_to_torr(gauge1, gauge2, units)
+
+            if interlock is not None:
+                interlock.process_sample('outer_vessel_pressure', sample_time, pressure)  # Fire interlock actions first, before any disk write
+            if stream_server is not None:
+                stream_server.publish('outer_vessel_pressure', sample_time, pressure)  # Push to subscribers before the slow disk write
 
             writer.writerow([timestamp, gauge1, gauge2, units])  # Write to CSV
             file.flush()               # Flush Python’s internal buffer
             os.fsync(file.fileno())   # Force OS to flush file to disk
+
+            if leak_rate_filepath is not None:
+                leak_rate_estimator.add_sample(sample_time, pressure)  # O(1) update of every window
+                leak_rate_writer.writerow([timestamp] + leak_rate_estimator.results_row())
+                leak_rate_file.flush()
+
             print(f"{timestamp} - Gauge1: {gauge1}, Gauge2: {gauge2}, Units: {units}")  # Console log, uncomment for debugging
             time.sleep(interval_sec)  # Wait before next reading
 
     sensor.close_port()  # Close serial connection when done
+    if leak_rate_filepath is not None:
+        leak_rate_file.close()
+    if stream_server is not None:
+        stream_server.close()
+    if interlock is not None:
+        interlock.close()
 
 # Example usage
 if __name__ == '__main__':
@@ -0,0 +1,146 @@
+import csv
+import math
+import os
+import threading
+from collections import deque
+
+'''Classes to estimate the pressure rise (leak) rate of the vessel with running least-squares fits over sliding time windows'''
+
+# Least-squares straight line fit (pressure vs time) over the samples of the last window_sec seconds
+# Keeps running sums so adding a sample (and dropping the ones that fall out of the window) is O(1) instead of refitting the whole window
+class SlidingWindowFit:
+    def __init__(self, window_sec):
+        self.window_sec = window_sec
+        self.samples = deque()                    # (time, value) of every sample inside the window
+        self.t0 = None                            # reference time the sums are taken relative to, keeps the numbers small
+        self.reset_sums()
+        self.removed_since_recompute = 0
+
+    def reset_sums(self):
+        self.S_t = 0.0
+        self.S_y = 0.0
+        self.S_tt = 0.0
+        self.S_ty = 0.0
+        self.S_yy = 0.0
+
+    # Add a new sample (time in seconds, e.g. time.time()), samples must come in time order, NaN values are skipped
+    def add(self, t, y):
+        if math.isnan(y):
+            return
+        if self.t0 is None:
+            self.t0 = t
+        self.samples.append((t, y))
+        self.add_to_sums(t, y, 1.0)
+
+        # Drop the samples that are now older than the window
+        while t - self.samples[0][0] > self.window_sec:
+            old_t, old_y = self.samples.popleft()
+            self.add_to_sums(old_t, old_y, -1.0)
+            self.removed_since_recompute += 1
+
+        # Subtracting from running sums slowly adds rounding error, so once the whole window has been replaced,
+        # recompute the sums from scratch around the oldest sample (amortized O(1) per sample)
+        if self.removed_since_recompute >= len(self.samples):
+            self.recompute_sums()
+
+    def add_to_sums(self, t, y, sign):
+        dt = t - self.t0
+        self.S_t += sign * dt
+        self.S_y += sign * y
+        self.S_tt += sign * dt * dt
+        self.S_ty += sign * dt * y
+        self.S_yy += sign * y * y
+
+    def recompute_sums(self):
+        self.t0 = self.samples[0][0]
+        self.reset_sums()
+        for t, y in self.samples:
+            self.add_to_sums(t, y, 1.0)
+        self.removed_since_recompute = 0
+
+    # Returns a dict with the fit over the current window:
+    # n (number of samples), slope and slope_err (value units per second), value and value_err (fitted value at the latest sample time)
+    # Slope is NaN with fewer than 2 samples, errors are NaN with fewer than 3 samples
+    def result(self):
+        n = len(self.samples)
+        nan = float('nan')
+        if n < 2:
+            return {'n': n, 'slope': nan, 'slope_err': nan, 'value': self.samples[-1][1] if n else nan, 'value_err': nan}
+
+        mean_t = self.S_t / n
+        Stt = self.S_tt - self.S_t * mean_t
+        Sty = self.S_ty - self.S_y * mean_t
+        Syy = self.S_yy - self.S_y * self.S_y / n
+        if Stt <= 0.0:
+            return {'n': n, 'slope': nan, 'slope_err': nan, 'value': self.S_y / n, 'value_err': nan}
+
+        slope = Sty / Stt
+        intercept = self.S_y / n - slope * mean_t
+        latest_dt = self.samples[-1][0] - self.t0
+        value = intercept + slope * latest_dt
+
+        if n < 3:
+            return {'n': n, 'slope': slope, 'slope_err': nan, 'value': value, 'value_err': nan}
+        residual_variance = max(Syy - slope * Sty, 0.0) / (n - 2)
+        slope_err = math.sqrt(residual_variance / Stt)
+        value_err = math.sqrt(residual_variance * (1.0 / n + (latest_dt - mean_t) ** 2 / Stt))
+        return {'n': n, 'slope': slope, 'slope_err': slope_err, 'value': value, 'value_err': value_err}
+
+# Runs one SlidingWindowFit per window length on the same pressure channel (e.g., 10 minutes, 1 hour, 6 hours)
+# Samples can be added from another thread (e.g., a SampleStreamClient callback) while results are read from the GUI
+class LeakRateEstimator:
+    def __init__(self, windows_sec=(600, 3600, 6 * 3600)):
+        self.windows_sec = list(windows_sec)
+        self.fits = [SlidingWindowFit(window_sec) for window_sec in self.windows_sec]
+        self.last_time = None                     # time of the latest sample added, to skip samples that were already added
+        self.lock = threading.Lock()
+
+    # Add a new sample to every window, samples older than (or as old as) the latest one are ignored
+    def add_sample(self, t, y):
+        with self.lock:
+            if self.last_time is not None and t <= self.last_time:
+                return
+            self.last_time = t
+            for fit in self.fits:
+                fit.add(t, y)
+
+    # Returns a list of (window_sec, result dict), see SlidingWindowFit.result
+    def results(self):
+        with self.lock:
+            return [(fit.window_sec, fit.result()) for fit in self.fits]
+
+    # One row of values for the leak rate log, in the same order as the header from create_leak_rate_log_csv
+    def results_row(self):
+        row = []
+        for window_sec, result in self.results():
+            row += [result['slope'], result['slope_err'], result['n']]
+        return row
+
+# Formats a window length as a short string (e.g., 600 -> '10m', 3600 -> '1h')
+def format_window(window_sec):
+    if window_sec % 3600 == 0:
+        return f'{window_sec // 3600:g}h'
+    if window_sec % 60 == 0:
+        return f'{window_sec // 60:g}m'
+    return f'{window_sec:g}s'
+
+# Creates a new leak rate log CSV with a header row if it doesn't already exist
+def create_leak_rate_log_csv(filepath, windows_sec):
+    if not os.path.exists(filepath):  # Check if the file already exists
+        with open(filepath, mode='w', newline='') as file:  # Open in write mode
+            writer = csv.writer(file)
+            header = ['Time']
+            for window_sec in windows_sec:
+                window = format_window(window_sec)
+                header += [f'Slope {window} (Torr/s)', f'Slope Error {window} (Torr/s)', f'Samples {window}']
+            writer.writerow(header)  # Write column headers
+
+# Example usage
+if __name__ == '__main__':
+    import random
+
+    estimator = LeakRateEstimator(windows_sec=[60, 600])
+    for i in range(1200):
+        estimator.add_sample(float(i), 750.0 + 0.001 * i + random.gauss(0.0, 0.01))  # 1 mTorr/s leak with some noise
+    for window_sec, result in estimator.results():
+        print(format_window(window_sec), result)
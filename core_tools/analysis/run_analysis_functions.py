@@ -0,0 +1,224 @@
+import io
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from ..gui.get_data_for_GUI import decode_datatype, get_log_parts
+from ..archive.log_archive_functions import is_archive, read_archive_index, read_archive_blocks
+
+'''Functions to analyze full log histories after a run, streaming the logs in chunks and processing segments on a process pool'''
+
+# Running count/sum/min/max/mean/variance of a set of values, partial results from different chunks or processes can be merged
+# Mean and variance use Welford's method (and Chan's formula to merge), which stays accurate even for long logs
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.mean = 0.0
+        self.M2 = 0.0  # Sum of squared differences from the mean
+
+    # Add a numpy array of values (NaNs must already be removed)
+    def add_array(self, values):
+        if len(values) == 0:
+            return
+        chunk = RunningStats()
+        chunk.count = len(values)
+        chunk.total = float(np.sum(values))
+        chunk.minimum = float(np.min(values))
+        chunk.maximum = float(np.max(values))
+        chunk.mean = chunk.total / chunk.count
+        chunk.M2 = float(np.sum((values - chunk.mean) ** 2))
+        self.merge(chunk)
+
+    # Merge the statistics of another RunningStats into this one
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.total, self.minimum, self.maximum, self.mean, self.M2 = other.count, other.total, other.minimum, other.maximum, other.mean, other.M2
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / count
+        self.M2 = self.M2 + other.M2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    # Sample standard deviation, NaN if there are fewer than 2 values
+    def std(self):
+        return np.sqrt(self.M2 / (self.count - 1)) if self.count > 1 else np.nan
+
+# Partial results of analyzing a segment of one log, merged in time order into the result for the whole log
+class LogAggregate:
+    def __init__(self):
+        self.rows = 0                             # rows read, including invalid readings
+        self.total = RunningStats()               # statistics of every valid reading
+        self.hours = {}                           # hour (seconds // 3600, see get_wall_clock_seconds) -> RunningStats
+        self.volume = 0.0                         # integral of the values over time in minutes (gas volume in L for flowrate in L/min)
+        self.hour_volume = {}                     # hour -> volume delivered during that hour
+        self.first = None                         # (time, value) of the first valid reading, to join with the previous segment
+        self.last = None                          # (time, value) of the last valid reading, to join with the next segment
+
+    # Add a chunk of decoded readings, times are in seconds (see get_wall_clock_seconds), values can hold NaN for invalid readings
+    def add_chunk(self, times, values, max_gap_sec):
+        self.rows += len(values)
+        valid = ~np.isnan(values)
+        times = times[valid]
+        values = values[valid]
+        if len(values) == 0:
+            return
+
+        self.total.add_array(values)
+        hours = (times // 3600).astype(np.int64)
+        # Rows are in time order, so each hour is one contiguous run
+        boundaries = np.flatnonzero(np.diff(hours)) + 1
+        for start, end in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(hours)]))):
+            self.hours.setdefault(int(hours[start]), RunningStats()).add_array(values[start:end])
+
+        # Trapezoid integral between consecutive readings, including the join with the previous chunk
+        if self.last is not None:
+            times = np.concatenate(([self.last[0]], times))
+            values = np.concatenate(([self.last[1]], values))
+        else:
+            self.first = (times[0], values[0])
+        self.add_volume(times, values, max_gap_sec)
+        self.last = (times[-1], values[-1])
+
+    # Add the integral between consecutive readings, gaps longer than max_gap_sec (e.g., logger stopped) are not integrated over
+    def add_volume(self, times, values, max_gap_sec):
+        if len(times) < 2:
+            return
+        dt = np.diff(times)
+        area = (values[1:] + values[:-1]) / 2.0 * dt / 60.0  # Values are per minute (e.g., L/min)
+        area[dt > max_gap_sec] = 0.0
+        self.volume += float(np.sum(area))
+        interval_hours = (times[:-1] // 3600).astype(np.int64)  # Each interval counts towards the hour it starts in
+        for hour in np.unique(interval_hours):
+            self.hour_volume[int(hour)] = self.hour_volume.get(int(hour), 0.0) + float(np.sum(area[interval_hours == hour]))
+
+    # Merge the aggregate of the segment that comes right after this one
+    def merge(self, other, max_gap_sec):
+        self.rows += other.rows
+        self.total.merge(other.total)
+        for hour in other.hours:
+            self.hours.setdefault(hour, RunningStats()).merge(other.hours[hour])
+        if self.last is not None and other.first is not None:
+            self.add_volume(np.array([self.last[0], other.first[0]]), np.array([self.last[1], other.first[1]]), max_gap_sec)
+        self.volume += other.volume
+        for hour in other.hour_volume:
+            self.hour_volume[hour] = self.hour_volume.get(hour, 0.0) + other.hour_volume[hour]
+        if self.first is None:
+            self.first = other.first
+        if other.last is not None:
+            self.last = other.last
+
+# Converts the 'Time' column of a chunk to seconds since 1970-01-01 00:00:00 on the wall clock the loggers wrote (no time zone conversion)
+# This keeps hours lined up with the hours in the log, daylight saving time included
+def get_wall_clock_seconds(dataframe):
+    timestamps = pd.to_datetime(dataframe['Time'], format='%Y-%m-%d %H:%M:%S')
+    return (timestamps - pd.Timestamp('1970-01-01')).dt.total_seconds().to_numpy()
+
+# Decodes one chunk of raw CSV bytes (header + rows) and adds it to the aggregate
+def add_csv_chunk(aggregate, chunk_bytes, datatype, max_gap_sec):
+    dataframe = pd.read_csv(io.BytesIO(chunk_bytes))
+    if len(dataframe) == 0:
+        return
+    values = decode_datatype(dataframe, datatype).to_numpy(dtype=float)
+    aggregate.add_chunk(get_wall_clock_seconds(dataframe), values, max_gap_sec)
+
+# Splits a log into about num_segments pieces that can be analyzed independently
+# Plain CSVs are split into byte ranges, archives into groups of blocks
+def split_log(log_filepath, num_segments, min_segment_bytes=1 << 20):
+    if is_archive(log_filepath):
+        index = read_archive_index(log_filepath)
+        size = max(1, -(-len(index) // max(1, num_segments)))  # ceil division
+        return [index[i:i + size] for i in range(0, len(index), size)] or [[]]
+
+    file_size = os.path.getsize(log_filepath)
+    num_segments = max(1, min(num_segments, file_size // min_segment_bytes))
+    edges = [file_size * i // num_segments for i in range(num_segments + 1)]
+    return [(edges[i], edges[i + 1]) for i in range(num_segments)]
+
+# Analyzes one segment of a log, runs in a worker process
+# Only chunk_rows rows are held in memory at a time, no matter how long the log is
+def analyze_log_segment(log_filepath, datatype, segment, chunk_rows, max_gap_sec):
+    aggregate = LogAggregate()
+
+    if is_archive(log_filepath):
+        index = read_archive_index(log_filepath)
+        for block in segment:
+            add_csv_chunk(aggregate, read_archive_blocks(log_filepath, [block], index), datatype, max_gap_sec)
+        return aggregate
+
+    start, end = segment
+    with open(log_filepath, 'rb') as file:
+        header = file.readline()
+        if start > 0:
+            # A segment owns every line that starts inside it, so skip the line that started in the previous segment
+            file.seek(start - 1)
+            file.readline()
+        lines = []
+        while file.tell() < end:
+            line = file.readline()
+            if not line:
+                break
+            if line.strip():
+                lines.append(line)
+            if len(lines) == chunk_rows:
+                add_csv_chunk(aggregate, header + b''.join(lines), datatype, max_gap_sec)
+                lines = []
+        if lines:
+            add_csv_chunk(aggregate, header + b''.join(lines), datatype, max_gap_sec)
+    return aggregate
+
+# Analyzes several logs at once on a process pool
+# logs is a list of (datatype, log_filepath) tuples, returns a list of (datatype, log_filepath, LogAggregate)
+def analyze_logs(logs, workers=None, chunk_rows=100000, max_gap_sec=60.0):
+    workers = workers or os.cpu_count() or 1
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = []
+        for datatype, log_filepath in logs:
+            # A log archived and started again is in two parts, the archive (oldest rows) then the live CSV, their segments are merged in that order
+            futures = [pool.submit(analyze_log_segment, part, datatype, segment, chunk_rows, max_gap_sec) for part in get_log_parts(log_filepath) for segment in split_log(part, workers)]
+            jobs.append((datatype, log_filepath, futures))
+
+        # Merge the segments of each log in time order
+        for datatype, log_filepath, futures in jobs:
+            aggregate = LogAggregate()
+            for future in futures:
+                aggregate.merge(future.result(), max_gap_sec)
+            results.append((datatype, log_filepath, aggregate))
+    return results
+
+# Formats the results of analyze_logs as a readable text report
+def format_summary_report(results):
+    lines = []
+    for datatype, log_filepath, aggregate in results:
+        stats = aggregate.total
+        lines.append(f'=== {log_filepath} ({datatype}) ===')
+        lines.append(f'Rows: {aggregate.rows}, valid readings: {stats.count}')
+        if stats.count == 0:
+            lines.append('')
+            continue
+        lines.append(f'Overall: mean={stats.mean:.6g}, std={stats.std():.6g}, min={stats.minimum:.6g}, max={stats.maximum:.6g}')
+        if datatype == 'flowrate':
+            lines.append(f'Gas volume delivered: {aggregate.volume:.6g} L')
+        lines.append('Hour              Count       Mean        Std         Min         Max' + ('         Volume (L)' if datatype == 'flowrate' else ''))
+        for hour in sorted(aggregate.hours):
+            hour_stats = aggregate.hours[hour]
+            row = f'{time.strftime("%Y-%m-%d %H:00", time.gmtime(hour * 3600))}  {hour_stats.count:<10d}  {hour_stats.mean:<10.6g}  {hour_stats.std():<10.6g}  {hour_stats.minimum:<10.6g}  {hour_stats.maximum:<10.6g}'
+            if datatype == 'flowrate':
+                row += f'  {aggregate.hour_volume.get(hour, 0.0):<10.6g}'
+            lines.append(row)
+        lines.append('')
+    return '\n'.join(lines)
+
+# Example usage
+if __name__ == '__main__':
+    print(format_summary_report(analyze_logs([('flowrate', '40L_run_control/gas_flow_log.csv'), ('outer_vessel_pressure', '40L_run_control/outer_vessel_pressure_log.csv')])))
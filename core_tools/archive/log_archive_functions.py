@@ -0,0 +1,236 @@
+import csv
+import gzip
+import os
+import shutil
+import time
+
+'''Functions to compress closed log CSVs into seekable block archives and to read back only the blocks that are needed'''
+
+# An archive of log.csv is made of two files:
+#   log.csv.gz      the CSV split into independent gzip members (the header, then blocks of rows_per_block rows)
+#                   since gzip allows several members in one file, standard tools (zcat, 7-Zip, pandas) still read it as the full CSV
+#   log.csv.gz.idx  a small CSV index with the byte offset, size, number of rows and first/last timestamp of every block
+# With the index, a reader can seek straight to the blocks it needs and decompress only those
+ARCHIVE_EXTENSION = '.gz'
+INDEX_EXTENSION = '.idx'
+ARCHIVING_EXTENSION = '.archiving'                # log.csv is renamed to log.csv.archiving while it is being archived, see archive_log_csv
+LONGEST_LOG_INTERVAL_SEC = 3600                   # Longest interval the loggers can be set to log at from the GUI (1hr)
+INDEX_HEADER = ['Offset', 'CompressedBytes', 'Rows', 'FirstTime', 'LastTime']
+
+# Returns the path of the archive that replaces csv_filepath once archived
+def get_archive_filepath(csv_filepath):
+    return csv_filepath + ARCHIVE_EXTENSION
+
+def is_archive(filepath):
+    return filepath.endswith('.csv' + ARCHIVE_EXTENSION)
+
+# Compresses a closed log CSV into a block archive, the original CSV is deleted once the archive has been checked
+# If the log was already archived before (and log.csv was started again since), its rows are added as new blocks at the end of the existing archive
+# Only use this on logs nothing is writing to anymore (see archive_closed_logs)
+# The CSV is first renamed to log.csv.archiving, so a pass that is interrupted (crash, power cut) can be finished by the next one without archiving its rows twice
+# (see finish_interrupted_archive), and on Windows the rename fails with a PermissionError while a logger still has the CSV open, before anything is written
+def archive_log_csv(csv_filepath, rows_per_block=5000, remove_original=True):
+    finish_interrupted_archive(csv_filepath, rows_per_block)
+    index_rows = start_archive(csv_filepath, csv_filepath)
+
+    source_filepath = csv_filepath
+    if remove_original:
+        source_filepath = csv_filepath + ARCHIVING_EXTENSION
+        try:
+            os.replace(csv_filepath, source_filepath)
+        except OSError:
+            os.remove(get_archive_filepath(csv_filepath) + '.tmp')
+            raise
+
+    try:
+        write_archive(source_filepath, csv_filepath, index_rows, rows_per_block)
+    except ValueError:
+        if remove_original and not os.path.exists(csv_filepath):
+            os.replace(source_filepath, csv_filepath)  # Put the original back where it was
+        raise
+    if remove_original:
+        os.remove(source_filepath)
+    return get_archive_filepath(csv_filepath)
+
+# Finishes archiving a log whose archive_log_csv was interrupted, i.e. log.csv.archiving is still there
+# The archive (.gz) is replaced before its index (.idx), and the temporary archive only exists until it replaces the archive, so:
+#   .gz.tmp still there: nothing was replaced yet, the rows are archived again from the start
+#   only .idx.tmp there: the archive was replaced but not its index, the index is replaced
+#   neither: both were replaced, only log.csv.archiving was left to delete
+def finish_interrupted_archive(csv_filepath, rows_per_block=5000):
+    source_filepath = csv_filepath + ARCHIVING_EXTENSION
+    if not os.path.exists(source_filepath):
+        return False
+    archive_filepath = get_archive_filepath(csv_filepath)
+    index_filepath = archive_filepath + INDEX_EXTENSION
+    if os.path.exists(archive_filepath + '.tmp'):
+        if os.path.exists(index_filepath + '.tmp'):
+            os.remove(index_filepath + '.tmp')
+        write_archive(source_filepath, csv_filepath, start_archive(source_filepath, csv_filepath), rows_per_block)
+    elif os.path.exists(index_filepath + '.tmp'):
+        os.replace(index_filepath + '.tmp', index_filepath)
+    os.remove(source_filepath)
+    return True
+
+# Starts the temporary archive (.gz.tmp) of a log: a copy of the existing archive if there is one, otherwise a new file with only the header
+# Returns the index rows of the blocks already in it
+def start_archive(source_filepath, csv_filepath):
+    archive_filepath = get_archive_filepath(csv_filepath)
+    with open(source_filepath, 'rb') as source:
+        header = source.readline()
+
+    if not os.path.exists(archive_filepath):
+        with open(archive_filepath + '.tmp', 'wb') as archive:
+            archive.write(gzip.compress(header))
+        return []
+
+    existing_index = read_archive_index(archive_filepath)
+    if header.strip() != read_archive_header(archive_filepath, existing_index).strip():
+        raise ValueError(f'{csv_filepath} does not have the same columns as its archive {archive_filepath}, not archived')
+    shutil.copyfile(archive_filepath, archive_filepath + '.tmp')  # The new blocks go after the existing ones
+    return [[block['offset'], block['compressed_bytes'], block['rows'], block['first_time'], block['last_time']] for block in existing_index]
+
+# Adds the rows of source_filepath as new blocks at the end of the temporary archive started by start_archive, checks it, then replaces the archive and its index
+# Write to temporary files first so a half-written archive is never mistaken for a good one
+def write_archive(source_filepath, csv_filepath, index_rows, rows_per_block):
+    archive_filepath = get_archive_filepath(csv_filepath)
+    index_filepath = archive_filepath + INDEX_EXTENSION
+    total_rows = sum(row[2] for row in index_rows)
+
+    with open(source_filepath, 'rb') as source, open(archive_filepath + '.tmp', 'ab') as archive:
+        source.readline()  # Header, already in the archive
+        block = []
+        for line in source:
+            if not line.strip():
+                continue  # Skip blank lines (e.g., trailing newline)
+            if not line.endswith(b'\n'):
+                line += b'\n'
+            block.append(line)
+            if len(block) == rows_per_block:
+                index_rows.append(write_block(archive, block))
+                total_rows += len(block)
+                block = []
+        if block:
+            index_rows.append(write_block(archive, block))
+            total_rows += len(block)
+
+    # Check the archive decompresses back to every row before trusting it
+    with gzip.open(archive_filepath + '.tmp', 'rb') as check:
+        archived_rows = sum(1 for line in check) - 1
+    if archived_rows != total_rows:
+        os.remove(archive_filepath + '.tmp')
+        raise ValueError(f'Archive of {csv_filepath} has {archived_rows} rows instead of {total_rows}, original kept')
+
+    with open(index_filepath + '.tmp', 'w', newline='') as index_file:
+        writer = csv.writer(index_file)
+        writer.writerow(INDEX_HEADER)
+        writer.writerows(index_rows)
+
+    # The blocks already in the archive keep their offsets, so the old index still reads the new archive correctly until the new index replaces it
+    os.replace(archive_filepath + '.tmp', archive_filepath)
+    os.replace(index_filepath + '.tmp', index_filepath)
+
+# Compresses one block of rows as its own gzip member and returns its index row
+def write_block(archive, block):
+    offset = archive.tell()
+    compressed = gzip.compress(b''.join(block))
+    archive.write(compressed)
+    first_time = block[0].split(b',', 1)[0].decode('utf-8')
+    last_time = block[-1].split(b',', 1)[0].decode('utf-8')
+    return [offset, len(compressed), len(block), first_time, last_time]
+
+# Reads the block index of an archive as a list of dicts
+def read_archive_index(archive_filepath):
+    index = []
+    with open(archive_filepath + INDEX_EXTENSION, 'r', newline='') as index_file:
+        for row in csv.DictReader(index_file):
+            index.append({'offset': int(row['Offset']), 'compressed_bytes': int(row['CompressedBytes']), 'rows': int(row['Rows']), 'first_time': row['FirstTime'], 'last_time': row['LastTime']})
+    return index
+
+# Returns the header line of an archive (as bytes), it is stored as its own member right before the first block
+def read_archive_header(archive_filepath, index=None):
+    if index is None:
+        index = read_archive_index(archive_filepath)
+    with open(archive_filepath, 'rb') as archive:
+        header_bytes = index[0]['offset'] if index else os.path.getsize(archive_filepath)
+        return gzip.decompress(archive.read(header_bytes))
+
+# Returns the header plus the rows of the selected blocks as CSV bytes, only the selected blocks are read and decompressed
+def read_archive_blocks(archive_filepath, blocks, index=None):
+    if index is None:
+        index = read_archive_index(archive_filepath)
+    parts = [read_archive_header(archive_filepath, index)]
+    with open(archive_filepath, 'rb') as archive:
+        for block in blocks:
+            archive.seek(block['offset'])
+            parts.append(gzip.decompress(archive.read(block['compressed_bytes'])))
+    return b''.join(parts)
+
+# Picks the fewest blocks at the end of the archive that hold at least the last n rows
+def select_last_n_rows_blocks(index, n):
+    selected = []
+    rows = 0
+    for block in reversed(index):
+        if rows >= n:
+            break
+        selected.insert(0, block)
+        rows += block['rows']
+    return selected
+
+# Picks the blocks that overlap the time range [start_time, end_time]
+# Times are strings in the log format ('%Y-%m-%d %H:%M:%S'), which sort the same way as the times they represent, None means open ended
+def select_time_range_blocks(index, start_time=None, end_time=None):
+    selected = []
+    for block in index:
+        if start_time is not None and block['last_time'] < start_time:
+            continue
+        if end_time is not None and block['first_time'] > end_time:
+            continue
+        selected.append(block)
+    return selected
+
+# Total number of data rows in an archive, read from the index only
+def count_archive_rows(archive_filepath):
+    return sum(block['rows'] for block in read_archive_index(archive_filepath))
+
+# Number of data rows of a plain CSV
+def count_csv_rows(csv_filepath):
+    with open(csv_filepath, 'rb') as f:
+        return sum(1 for line in f if line.strip()) - 1
+
+# Archives every CSV in a directory that has not been written to for at least min_age_sec, i.e. logs that are closed
+# A logger only writes once per interval, so min_age_sec must be longer than the longest interval a logger can run at (longest_log_interval_sec),
+# otherwise a log that is still open can look closed between two of its rows
+# On Windows a log that a logger still has open is skipped no matter its age (renaming it fails, see archive_log_csv), other systems only have min_age_sec to go by
+# A log that was archived before is added to the end of its archive, and archiving interrupted by a previous call is finished first
+# Returns the list of archives created
+def archive_closed_logs(log_directory, min_age_sec, rows_per_block=5000, longest_log_interval_sec=LONGEST_LOG_INTERVAL_SEC):
+    if min_age_sec <= longest_log_interval_sec:
+        raise ValueError(f'min_age_sec ({min_age_sec:g} s) must be longer than the longest logging interval ({longest_log_interval_sec:g} s), or logs that are still open get archived')
+    archived = []
+    for filename in sorted(os.listdir(log_directory)):
+        if filename.endswith('.csv' + ARCHIVING_EXTENSION):
+            csv_filepath = os.path.join(log_directory, filename[:-len(ARCHIVING_EXTENSION)])
+            if finish_interrupted_archive(csv_filepath, rows_per_block):
+                archived.append(get_archive_filepath(csv_filepath))
+
+    now = time.time()
+    for filename in sorted(os.listdir(log_directory)):
+        csv_filepath = os.path.join(log_directory, filename)
+        if not filename.endswith('.csv') or not os.path.isfile(csv_filepath):
+            continue
+        if now - os.path.getmtime(csv_filepath) < min_age_sec:
+            continue  # Still being written to (or was recently), leave it alone
+        if count_csv_rows(csv_filepath) == 0:
+            continue  # Nothing to add, e.g. a log started again after being archived that has not been written to
+        try:
+            archived.append(archive_log_csv(csv_filepath, rows_per_block=rows_per_block))
+        except PermissionError:
+            print(f'{csv_filepath} is still open (a logger is writing to it), not archived')
+    return archived
+
+# Example usage
+if __name__ == '__main__':
+    archive_filepath = archive_log_csv('40L_run_control/gas_flow_log.csv', remove_original=False)
+    index = read_archive_index(archive_filepath)
+    print(read_archive_blocks(archive_filepath, select_last_n_rows_blocks(index, 10), index)[-500:].decode('utf-8'))
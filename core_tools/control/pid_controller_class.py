@@ -0,0 +1,59 @@
+'''Class for a PID controller with anti-windup and output rate limiting, used to drive the gas flow setpoint from a pressure measurement'''
+
+# Output is clamped to [output_min, output_max] (e.g., 0-100% of the flow controller's full scale)
+# Anti-windup: the integral is not allowed to grow while the output is held at a limit (clamp or rate limit) in the direction of the error
+# Rate limiting: the output never moves by more than max_output_rate_per_sec per second, so the setpoint is not slammed on a step change
+# The derivative acts on the measurement (not the error) so changing the setpoint does not kick the output, and is low pass filtered over derivative_filter_sec
+class PIDController:
+    def __init__(self, kp, ki, kd, output_min=0.0, output_max=100.0, max_output_rate_per_sec=None, derivative_filter_sec=1.0):
+        self.kp = kp
+        self.ki = ki                              # Output units per (measurement units * second)
+        self.kd = kd                              # Output units per (measurement units / second)
+        self.output_min = output_min
+        self.output_max = output_max
+        self.max_output_rate_per_sec = max_output_rate_per_sec
+        self.derivative_filter_sec = derivative_filter_sec
+        self.reset()
+
+    # Forget the history, the next output starts from output (bumpless start when the controller is already at a known setpoint)
+    def reset(self, output=None):
+        self.integral = min(max(output, self.output_min), self.output_max) if output is not None else 0.0
+        self.output = output
+        self.derivative = 0.0
+        self.last_measurement = None
+
+    # Computes the new output from the setpoint and the latest measurement, dt is the time in seconds since the last update
+    def update(self, setpoint, measurement, dt):
+        error = setpoint - measurement
+
+        if self.last_measurement is not None and dt > 0:
+            raw_derivative = -(measurement - self.last_measurement) / dt
+            self.derivative += dt / (self.derivative_filter_sec + dt) * (raw_derivative - self.derivative)
+        self.last_measurement = measurement
+
+        new_integral = self.integral + self.ki * error * dt
+        unlimited = self.kp * error + new_integral + self.kd * self.derivative
+        output = min(max(unlimited, self.output_min), self.output_max)
+        if self.max_output_rate_per_sec is not None and self.output is not None and dt > 0:
+            max_step = self.max_output_rate_per_sec * dt
+            output = min(max(output, self.output - max_step), self.output + max_step)
+
+        # Only integrate if the output is free to follow, or if the error would pull it back from the limit
+        held_high = unlimited > output
+        held_low = unlimited < output
+        if not (held_high and error > 0) and not (held_low and error < 0):
+            self.integral = min(max(new_integral, self.output_min), self.output_max)
+
+        self.output = output
+        return output
+
+# Example usage
+if __name__ == '__main__':
+    # Toy vessel: pressure rises with the flow and leaks out through a fixed conductance
+    pid = PIDController(kp=2.0, ki=0.5, kd=0.0, max_output_rate_per_sec=10.0)
+    pressure = 0.0
+    for step in range(600):
+        flowPercent = pid.update(setpoint=20.0, measurement=pressure, dt=0.1)
+        pressure += (0.5 * flowPercent - 0.8 * pressure) * 0.1
+        if step % 50 == 0:
+            print(f't={step * 0.1:.1f} s, flow={flowPercent:.2f}%, pressure={pressure:.2f}')
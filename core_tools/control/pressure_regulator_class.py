@@ -0,0 +1,199 @@
+import csv
+import math
+import os
+import time
+from ..gui.get_data_for_GUI import read_last_row, decode_datatype, get_timestamps
+from ..streaming.sample_stream_client_class import SampleStreamClient
+
+'''Classes to hold the vessel pressure at a setpoint by driving the gas flow controller setpoint with a PID loop'''
+
+# Latest pressure from a live sample stream (see SampleStreamServer), no file I/O
+class StreamPressureSource:
+    def __init__(self, stream_address, channel):
+        self.channel = channel
+        self.client = SampleStreamClient(stream_address, channels=[channel])
+        self.latest = None
+
+    # Returns (timestamp, value) of the latest valid sample, or None if there has not been one yet
+    def read(self):
+        times, values = self.client.get_new_samples(self.channel)
+        for t, value in zip(times, values):
+            if not math.isnan(value):
+                self.latest = (t, value)
+        return self.latest
+
+    def close(self):
+        self.client.close()
+
+# Latest pressure from the end of a log CSV (e.g., the inner vessel pressure logged by FlowVision2), only the last few KB of the file are read
+class CSVPressureSource:
+    def __init__(self, csv_filepath, datatype):
+        self.csv_filepath = csv_filepath
+        self.datatype = datatype
+        self.latest = None
+
+    def read(self):
+        try:
+            dataframe = read_last_row(self.csv_filepath)
+        except (OSError, ValueError):
+            return self.latest  # File missing or being replaced, keep the last reading (it will go stale if this lasts)
+        if len(dataframe) > 0:
+            value = float(decode_datatype(dataframe, self.datatype).iloc[-1])
+            if not math.isnan(value):
+                self.latest = (float(get_timestamps(dataframe)[-1]), value)
+        return self.latest
+
+    def close(self):
+        pass
+
+# Loop timing statistics over one reporting period
+# Jitter is how late an iteration started compared to when it was scheduled, a deadline is missed when an iteration is still running when the next one is due
+class LoopTimingStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.iterations = 0
+        self.total_work_sec = 0.0
+        self.max_work_sec = 0.0
+        self.total_jitter_sec = 0.0
+        self.max_jitter_sec = 0.0
+        self.missed_deadlines = 0
+
+    def add(self, work_sec, jitter_sec, missed_deadline):
+        self.iterations += 1
+        self.total_work_sec += work_sec
+        self.max_work_sec = max(self.max_work_sec, work_sec)
+        self.total_jitter_sec += jitter_sec
+        self.max_jitter_sec = max(self.max_jitter_sec, jitter_sec)
+        self.missed_deadlines += int(missed_deadline)
+
+    # [iterations, mean work (ms), max work (ms), mean jitter (ms), max jitter (ms), missed deadlines]
+    def row(self):
+        n = max(self.iterations, 1)
+        return [self.iterations, f'{self.total_work_sec / n * 1000:.3f}', f'{self.max_work_sec * 1000:.3f}', f'{self.total_jitter_sec / n * 1000:.3f}', f'{self.max_jitter_sec * 1000:.3f}', self.missed_deadlines]
+
+# Holds the gauge pressure at setpoint_torr, with the same sign as 'Plot Gauge Pressure' in the GUI: outer vessel - inner vessel (negative while the inner vessel is above the outer vessel)
+# If there is no outer source, the inner vessel pressure alone is held at setpoint_torr instead
+# Gas flows into the inner vessel, so more flow lowers the gauge pressure (but raises the inner vessel pressure), read_measurement and step take care of the direction
+# Every iteration reads the sources, runs the PID and writes the new flow setpoint to the controller (a controller on a GF100Bus, so the write is one short transaction on a port that stays open)
+# If the pressure data is older than max_data_age_sec (logger stopped, sensor off), the flow is set to safe_output and the PID is reset until fresh data comes back
+class PressureRegulator:
+    def __init__(self, controller, pid, setpoint_torr, inner_source, outer_source=None, loop_hz=10.0, max_data_age_sec=10.0, safe_output=0.0, min_output_change=0.01):
+        if outer_source is None and setpoint_torr < 0:
+            raise ValueError(f'Setpoint {setpoint_torr:g} Torr is negative, without an outer source the setpoint is the inner vessel pressure itself')
+        self.controller = controller
+        self.pid = pid
+        self.setpoint_torr = setpoint_torr
+        self.inner_source = inner_source
+        self.outer_source = outer_source
+        self.period_sec = 1.0 / loop_hz
+        self.max_data_age_sec = max_data_age_sec
+        self.safe_output = safe_output
+        self.min_output_change = min_output_change  # Smaller changes are not written, saves bus time (the controller's resolution is about 0.003%)
+        self.written_output = None
+        self.stats = LoopTimingStats()
+        self.running = True
+
+    # Measurement in Torr (outer - inner, or inner alone), or None if any source has no data newer than max_data_age_sec
+    def read_measurement(self, now):
+        inner = self.inner_source.read()
+        if inner is None or now - inner[0] > self.max_data_age_sec:
+            return None
+        if self.outer_source is None:
+            return inner[1]
+        outer = self.outer_source.read()
+        if outer is None or now - outer[0] > self.max_data_age_sec:
+            return None
+        return outer[1] - inner[1]
+
+    # One iteration of the loop, returns (measurement, output), measurement is None when the data is stale
+    def step(self, dt):
+        measurement = self.read_measurement(time.time())
+        if measurement is None:
+            output = self.safe_output
+            self.pid.reset(output)
+        else:
+            if self.outer_source is None:
+                output = self.pid.update(self.setpoint_torr, measurement, dt)
+            else:
+                output = self.pid.update(-self.setpoint_torr, -measurement, dt)  # The PID drives inner - outer, which rises with the flow
+
+        if self.written_output is None or abs(output - self.written_output) >= self.min_output_change or (output == self.safe_output and self.written_output != output):
+            if self.controller.new_setpoint(output) is not False:  # GF100Serial returns None, a bus controller returns False if the write was not acknowledged
+                self.written_output = output
+        return measurement, output
+
+    # Runs the loop at loop_hz (indefinitely or for duration_sec), writing a row of timing statistics to log_filepath every report_interval_sec
+    # Iterations are scheduled on a fixed grid, if one runs late the next ones are not bunched up to catch up, the missed slots are counted instead
+    def run(self, log_filepath=None, report_interval_sec=10.0, duration_sec=None):
+        if log_filepath is not None:
+            create_regulator_log_csv(log_filepath)
+            log_file = open(log_filepath, mode='a', newline='')
+            writer = csv.writer(log_file)
+
+        self.pid.reset(self.safe_output)
+        start = time.perf_counter()
+        next_deadline = start
+        last_step = None
+        next_report = start + report_interval_sec
+        measurement, output = None, self.safe_output
+
+        try:
+            while self.running and (duration_sec is None or time.perf_counter() - start < duration_sec):
+                now = time.perf_counter()
+                if now < next_deadline:
+                    time.sleep(next_deadline - now)
+                    now = time.perf_counter()
+                jitter = now - next_deadline
+
+                dt = now - last_step if last_step is not None else self.period_sec
+                last_step = now
+                measurement, output = self.step(dt)
+
+                done = time.perf_counter()
+                next_deadline += self.period_sec
+                missed = done > next_deadline
+                if missed:
+                    next_deadline += math.ceil((done - next_deadline) / self.period_sec) * self.period_sec  # Skip the slots that already passed
+                self.stats.add(done - now, jitter, missed)
+
+                if done >= next_report:
+                    timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+                    row = [timestamp, self.setpoint_torr, f'{measurement:.6g}' if measurement is not None else 'Stale', f'{output:.3f}'] + self.stats.row()
+                    if log_filepath is not None:
+                        writer.writerow(row)
+                        log_file.flush()
+                        os.fsync(log_file.fileno())
+                    print(f"{timestamp} - Setpoint: {row[1]} Torr, Measured: {row[2]} Torr, Flow: {row[3]}%, Loops: {row[4]}, Work mean/max: {row[5]}/{row[6]} ms, Jitter mean/max: {row[7]}/{row[8]} ms, Missed deadlines: {row[9]}")
+                    self.stats.reset()
+                    next_report += report_interval_sec
+        finally:
+            self.controller.new_setpoint(self.safe_output)  # Leave the gas flow in a safe state when the loop stops
+            self.inner_source.close()
+            if self.outer_source is not None:
+                self.outer_source.close()
+            if log_filepath is not None:
+                log_file.close()
+
+    def stop(self):
+        self.running = False
+
+# Creates a new regulator log CSV with a header row if it doesn't already exist
+def create_regulator_log_csv(filepath):
+    if not os.path.exists(filepath):  # Check if the file already exists
+        with open(filepath, mode='w', newline='') as file:  # Open in write mode
+            writer = csv.writer(file)
+            writer.writerow(['Time', 'SetpointTorr', 'MeasuredTorr', 'FlowPercent', 'Loops', 'MeanWorkMs', 'MaxWorkMs', 'MeanJitterMs', 'MaxJitterMs', 'MissedDeadlines'])  # Write column headers
+
+# Example usage
+if __name__ == '__main__':
+    from .pid_controller_class import PIDController
+    from ..flowrate.gas_flow_controller_bus_class import GF100Bus
+
+    bus = GF100Bus('COM3', baudrate=115200, macIDs=[36])
+    regulator = PressureRegulator(bus.controller(36), PIDController(kp=0.5, ki=0.05, kd=0.0, max_output_rate_per_sec=5.0), setpoint_torr=-10.0,
+                                  inner_source=CSVPressureSource('40L_run_control/inner_vessel_pressure_log.csv', 'inner_vessel_pressure'),
+                                  outer_source=StreamPressureSource(50007, 'outer_vessel_pressure'))
+    regulator.run(log_filepath='40L_run_control/pressure_regulator_log.csv')
+    bus.close_port()
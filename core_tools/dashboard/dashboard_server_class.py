@@ -0,0 +1,244 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from ..gui.get_data_for_GUI import read_new_rows, get_timestamps, decode_datatype
+from ..streaming.sample_stream_client_class import SampleStreamClient
+
+'''Class to serve the GUI's plots read-only to any number of web browsers, with one shared read of the data per tick no matter how many are watching'''
+
+# Every tick, the server reads each plot's data once (same decoders and plot layout as the GUI) and builds two messages:
+#   snapshot  the whole window of every plot, downsampled to at most max_points points per plot, sent to viewers when they connect
+#   update    only the points added since the previous tick, plus where each window now starts so viewers can drop old points
+# New points are counted from what was read (rows appended after the byte offset already read, samples received this tick), not by timestamp,
+# since log timestamps are whole seconds and several rows can share one
+# Both are encoded once and the same bytes are written to every viewer (Server-Sent Events over plain HTTP, any browser can read them without extra libraries)
+# A viewer that fell behind by more than one tick gets the latest snapshot instead of the updates it missed
+PAGE_FILEPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard_page.html')
+
+class DashboardServer:
+    def __init__(self, layout, port, host='0.0.0.0', tick_sec=1.0, max_points=500):
+        # layout: list of {'tab', 'plots_per_row', 'plots'}, see LivePlotter.get_plot_layout
+        # max_points: most points sent per plot in a snapshot, larger windows are reduced to the min and max of each bucket so spikes stay visible
+        self.layout = layout
+        self.tick_sec = tick_sec
+        self.max_points = max_points
+        self.plots = [plot for tab in layout for plot in tab['plots']]
+
+        # Stream plots are fed by one client per address, samples are kept here between ticks
+        self.stream_clients = {}                  # stream address -> SampleStreamClient
+        self.stream_buffers = {}                  # title -> deque of (timestamp, value)
+        for plot in self.plots:
+            if plot['kind'] == 'stream':
+                if plot['stream_address'] not in self.stream_clients:
+                    self.stream_clients[plot['stream_address']] = SampleStreamClient(plot['stream_address'])
+                self.stream_buffers[plot['title']] = deque(maxlen=plot['buffer_size'])
+
+        # CSV plots keep their window between ticks and only read the rows appended since (see read_new_rows)
+        self.csv_buffers = {}                     # title -> {'t': timestamps, 'y': values, 'offset': byte offset in the log read up to}
+        for plot in self.plots:
+            if plot['kind'] == 'csv':
+                self.csv_buffers[plot['title']] = {'t': np.array([]), 'y': np.array([]), 'offset': 0}
+        self.condition = threading.Condition()
+        self.version = 0                          # Incremented every tick, viewers wait for it to change
+        self.snapshot_bytes = encode_event('snapshot', {'server_time': time.time(), 'plots': {}})
+        self.update_bytes = b''
+        self.layout_bytes = json.dumps(make_json_safe(layout)).encode('utf-8')
+        with open(PAGE_FILEPATH, 'rb') as page:
+            self.page_bytes = page.read()
+        self.running = True
+
+        self.httpd = ThreadingHTTPServer((host, port), make_request_handler(self))
+        self.httpd.daemon_threads = True
+
+    def start(self):
+        self.tick_thread = threading.Thread(target=self.tick_loop, daemon=True)
+        self.tick_thread.start()
+        self.http_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.http_thread.start()
+
+    # Blocks until the server is closed
+    def wait(self):
+        while self.running:
+            time.sleep(0.5)
+
+    # Runs in its own thread, reads every plot once per tick and publishes the messages for all viewers
+    def tick_loop(self):
+        while self.running:
+            start = time.monotonic()
+            try:
+                self.tick()
+            except Exception as error:  # A log being replaced or half written must not stop the dashboard
+                print(f'Dashboard tick failed: {error}')
+            time.sleep(max(0.0, self.tick_sec - (time.monotonic() - start)))
+
+    def tick(self):
+        series = {}
+        reads = {}  # (CSV filepath, offset, rows) -> read_new_rows result, plots of the same log (e.g., every VMM of a wide temperature log) share one read per tick
+        for plot in self.plots:
+            series[plot['title']] = self.read_plot(plot, series, reads)
+
+        snapshot = {}
+        update = {}
+        for title, (times, values, num_new) in series.items():
+            if len(times) == 0:
+                continue
+            snapshot[title] = make_series_message(*downsample_min_max(times, values, self.max_points), times[0])
+            if num_new > 0:  # Plots with nothing new are left out of the update
+                update[title] = make_series_message(*downsample_min_max(times[-num_new:], values[-num_new:], self.max_points), times[0])
+
+        server_time = time.time()
+        snapshot_bytes = encode_event('snapshot', {'server_time': server_time, 'plots': snapshot})
+        update_bytes = encode_event('update', {'server_time': server_time, 'plots': update})
+        with self.condition:
+            self.snapshot_bytes = snapshot_bytes
+            self.update_bytes = update_bytes
+            self.version += 1
+            self.condition.notify_all()
+
+    # Returns (timestamps, values, number of new points at the end) of the plot's current window, series holds the plots already read this tick (for subtraction plots)
+    # and reads the CSV reads already done this tick
+    def read_plot(self, plot, series, reads):
+        empty = (np.array([]), np.array([]), 0)
+        if plot['kind'] == 'csv':
+            buffer = self.csv_buffers[plot['title']]
+            key = (plot['csv_filepath'], buffer['offset'], plot['buffer_size'])
+            if key not in reads:
+                reads[key] = read_new_rows(plot['csv_filepath'], buffer['offset'], max_rows=plot['buffer_size'])
+            dataframe, buffer['offset'], reset = reads[key]
+            if reset:
+                buffer['t'], buffer['y'] = np.array([]), np.array([])
+            num_new = len(dataframe)
+            if num_new > 0:
+                buffer['t'] = np.concatenate((buffer['t'], get_timestamps(dataframe)))[-plot['buffer_size']:]
+                buffer['y'] = np.concatenate((buffer['y'], decode_datatype(dataframe, plot['datatype']).to_numpy(dtype=float)))[-plot['buffer_size']:]
+            return buffer['t'], buffer['y'], min(num_new, len(buffer['t']))
+
+        if plot['kind'] == 'stream':
+            buffer = self.stream_buffers[plot['title']]
+            new_times, new_values = self.stream_clients[plot['stream_address']].get_new_samples(plot['channel'])
+            buffer.extend(zip(new_times, new_values))
+            if not buffer:
+                return empty
+            times, values = zip(*buffer)
+            return np.array(times), np.array(values, dtype=float), min(len(new_times), len(buffer))
+
+        # Subtraction plot, same as LiveTab.update_subtraction_plot: plot2 - plot1 over the points both have, on plot1's times (so plot1's new points are the new ones)
+        if plot['plot1_title'] not in series or plot['plot2_title'] not in series:
+            return empty
+        times1, values1, num_new1 = series[plot['plot1_title']]
+        times2, values2, num_new2 = series[plot['plot2_title']]
+        min_len = min(len(values1), len(values2), plot['buffer_size'])
+        if min_len == 0:
+            return empty
+        return times1[-min_len:], values2[-min_len:] - values1[-min_len:], min(num_new1, min_len)
+
+    # Writes every message to one viewer until it disconnects, runs in the viewer's own request thread
+    def stream_to_viewer(self, write):
+        with self.condition:
+            version = self.version
+            payload = self.snapshot_bytes
+        write(payload)
+
+        while self.running:
+            with self.condition:
+                self.condition.wait_for(lambda: self.version != version or not self.running, timeout=15)
+                if not self.running:
+                    return
+                if self.version == version:
+                    payload = b': keepalive\n\n'  # Keeps proxies and browsers from closing an idle connection
+                elif self.version == version + 1:
+                    payload = self.update_bytes
+                else:
+                    payload = self.snapshot_bytes  # Missed some updates, start over from the latest snapshot
+                version = self.version
+            write(payload)
+
+    def close(self):
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for stream_address in self.stream_clients:
+            self.stream_clients[stream_address].close()
+
+# Builds the request handler class for a server, only GET requests are answered (read-only)
+def make_request_handler(server):
+    class DashboardRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/':
+                self.send_bytes(server.page_bytes, 'text/html; charset=utf-8')
+            elif path == '/layout':
+                self.send_bytes(server.layout_bytes, 'application/json')
+            elif path == '/events':
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                try:
+                    server.stream_to_viewer(self.write_and_flush)
+                except OSError:
+                    pass  # Viewer closed the page
+            else:
+                self.send_error(404)
+
+        def send_bytes(self, body, content_type):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def write_and_flush(self, payload):
+            self.wfile.write(payload)
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass  # Do not print a line for every request
+
+    return DashboardRequestHandler
+
+# Reduces a series to at most max_points points by keeping the min and max of each bucket (in time order), so short spikes are not lost
+def downsample_min_max(times, values, max_points):
+    if len(times) <= max_points:
+        return times, values
+    num_buckets = max(1, max_points // 2)
+    edges = np.linspace(0, len(times), num_buckets + 1).astype(int)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = values[start:end]
+        if np.all(np.isnan(bucket)):
+            keep.append(start)
+            continue
+        low = start + int(np.nanargmin(bucket))
+        high = start + int(np.nanargmax(bucket))
+        keep += sorted({low, high})
+    return times[keep], values[keep]
+
+# One plot's part of a message, NaN (invalid readings) becomes null since JSON has no NaN
+def make_series_message(times, values, window_start):
+    return {'t': [round(float(t), 3) for t in times], 'y': [None if math.isnan(v) else float(v) for v in values], 'start': float(window_start)}
+
+# Layout entries hold tuples (axes), turn them into lists for JSON
+def make_json_safe(layout):
+    return json.loads(json.dumps(layout, default=list))
+
+# Encodes one Server-Sent Event
+def encode_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode('utf-8')
+
+# Example usage
+if __name__ == '__main__':
+    layout = [{'tab': 'Pressure', 'plots_per_row': 2, 'plots': [
+        {'title': 'Plot Outer Vessel Pressure', 'kind': 'csv', 'x_axis': ('Time since present', 's'), 'y_axis': ('Pressure', 'Torr'), 'buffer_size': 1000, 'csv_filepath': '40L_run_control/outer_vessel_pressure_log.csv', 'datatype': 'outer_vessel_pressure'},
+        {'title': 'Plot Gas Flowrate', 'kind': 'csv', 'x_axis': ('Time since present', 's'), 'y_axis': ('Flowrate', 'L/min'), 'buffer_size': 1000, 'csv_filepath': '40L_run_control/gas_flow_log.csv', 'datatype': 'flowrate'},
+    ]}]
+    server = DashboardServer(layout, 8080)
+    server.start()
+    server.wait()
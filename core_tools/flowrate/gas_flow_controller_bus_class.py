@@ -0,0 +1,91 @@
+import serial
+import threading
+import time
+from .gas_flow_controller_serial_class import build_setpoint_packet, build_indicated_flow_packet, parse_indicated_flow_response
+
+'''Class to talk to several GF100 mass flow controllers sharing one RS-485 bus (one serial port, one MAC ID per controller)'''
+
+INDICATED_FLOW_RESPONSE_BYTES = 12
+SETPOINT_RESPONSE_BYTES = 2
+ACK = 0x06
+NAK = 0x16
+
+# Owns the serial port of the bus, every request is written and its full response read back right away (no fixed sleeps)
+# RS-485 is half duplex, so only one request can be on the bus at a time: transactions from different threads (e.g., a logger and a regulator) are serialized with a lock
+class GF100Bus:
+    def __init__(self, port_name, baudrate=115200, macIDs=(36,), response_timeout_sec=0.2):
+        # response_timeout_sec: longest wait for a full response, a controller that does not answer only costs this long instead of stalling the bus
+        self.ser = serial.Serial(
+            port=port_name,
+            baudrate=baudrate,
+            bytesize=serial.EIGHTBITS,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            timeout=response_timeout_sec
+        )
+        self.macIDs = [int(macID) for macID in macIDs]
+        self.lock = threading.Lock()
+        self.transactions = 0
+        self.timeouts = 0
+
+    # Writes one request and reads back exactly response_length bytes, returns the response (shorter than response_length on timeout)
+    # read() returns as soon as the whole response is in, so each transaction only takes as long as the wire and the controller need
+    def transact(self, packet, response_length):
+        with self.lock:
+            self.ser.reset_input_buffer()  # Drop leftovers from an earlier timed out transaction so responses never get out of step
+            self.ser.write(packet)
+            response = self.ser.read(response_length)
+            self.transactions += 1
+            if len(response) < response_length:
+                self.timeouts += 1
+            return response
+
+    # Indicated flow of one controller as a percentage of full scale, or 'Bad'
+    def indicated_flow(self, macID):
+        return parse_indicated_flow_response(self.transact(build_indicated_flow_packet(macID), INDICATED_FLOW_RESPONSE_BYTES))
+
+    # Writes a new setpoint (percentage of full scale, int or float) to one controller, returns True if the request was received and the write executed
+    def new_setpoint(self, macID, flowPercent):
+        response = self.transact(build_setpoint_packet(macID, flowPercent), SETPOINT_RESPONSE_BYTES)
+        return len(response) == SETPOINT_RESPONSE_BYTES and response[0] == ACK and response[1] == ACK
+
+    # Polls every controller on the bus back to back, returns a dict of MAC ID -> flow percentage (or 'Bad')
+    def poll_all(self):
+        return {macID: self.indicated_flow(macID) for macID in self.macIDs}
+
+    # Writes setpoints to several controllers back to back, setpoints is a dict of MAC ID -> flow percentage
+    # Returns a dict of MAC ID -> True/False (see new_setpoint)
+    def write_setpoints(self, setpoints):
+        return {macID: self.new_setpoint(macID, flowPercent) for macID, flowPercent in setpoints.items()}
+
+    # One controller on the bus, with the same methods as GF100Serial so it can be used with log_flow_to_csv and change_gas_flowrate.py
+    def controller(self, macID):
+        return GF100BusController(self, macID)
+
+    def close_port(self):
+        # Close the serial port connection cleanly
+        self.ser.close()
+
+class GF100BusController:
+    def __init__(self, bus, macID):
+        self.bus = bus
+        self.macID = int(macID)
+
+    def indicated_flow(self):
+        return self.bus.indicated_flow(self.macID)
+
+    def new_setpoint(self, flowPercent):
+        return self.bus.new_setpoint(self.macID, flowPercent)
+
+    # The port belongs to the bus (other controllers still use it), close it with GF100Bus.close_port
+    def close_port(self):
+        pass
+
+# Example usage
+if __name__ == '__main__':
+    bus = GF100Bus('COM3', baudrate=115200, macIDs=[36, 37])
+    while True:
+        start = time.perf_counter()
+        flows = bus.poll_all()
+        print(f'{flows} ({(time.perf_counter() - start) * 1000:.1f} ms for {len(flows)} controllers)')
+        time.sleep(1)
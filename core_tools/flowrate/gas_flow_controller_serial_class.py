@@ -1,6 +1,31 @@
 import serial
 import time
 
+# Packet to write a new flow setpoint (percentage of full scale) to the controller with the given MAC ID
+def build_setpoint_packet(macID, flowPercent):
+    flowPercent = min(max(flowPercent, 0), 100)
+    newSetpoint = int(round(((0xC000-0x4000)*flowPercent) / 100)) + 0x4000
+    LSB = newSetpoint & 0xFF
+    MSB = (newSetpoint >> 8) & 0xFF
+
+    packet = [int(macID), 0x02, 0x81, 0x05, 0x69, 0x01, 0xA4, LSB, MSB, 0x00]
+    checksum = sum(packet[1:]) & 0xFF
+    packet.append(checksum)
+    return bytes(packet)
+
+# Packet to request the indicated flow of the controller with the given MAC ID
+def build_indicated_flow_packet(macID):
+    return bytes([int(macID), 0x02, 0x80, 0x03, 0x6A, 0x01, 0xA9, 0x00, 0x99])
+
+# Decodes the 12 byte response to an indicated flow request, returns the flow as a percentage of full scale, or 'Bad'
+def parse_indicated_flow_response(response):
+    if len(response) < 12 or response[0] != 0x06:
+        return 'Bad'
+    if sum(response[2:10]) & 0xFF != response[11]:
+        return 'Bad'
+    flow = response[8] + (response[9] << 8)
+    return (flow - 0x4000)*100 / (0xC000-0x4000)
+
 class GF100Serial:
     def __init__(self, port_name, baudrate=115200, macID=1):
         self.ser = serial.Serial(
@@ -16,26 +41,18 @@ class GF100Serial:
     def new_setpoint(self, flowPercent):
         self.ser.reset_input_buffer()
 
-        newSetpoint = (((0xC000-0x4000)*flowPercent) // 100) + 0x4000
-        LSB = newSetpoint & 0xFF
-        MSB = (newSetpoint >> 8) & 0xFF
-
-        packet = [self.macID, 0x02, 0x81, 0x05, 0x69, 0x01, 0xA4, LSB, MSB, 0x00]
-        checksum = sum(packet[1:]) & 0xFF
-        packet.append(checksum)
-        
-        self.ser.write(bytes(packet))
+        self.ser.write(build_setpoint_packet(self.macID, flowPercent))
 
         time.sleep(0.1)
         response = self.ser.read(2)
 
-        if response[0] == 0x06 & response[1] == 0x06:
+        if response[0] == 0x06 and response[1] == 0x06:
             print('Request recieved, write executed')
-        elif response[0] == 0x06 & response[1] == 0x16:
+        elif response[0] == 0x06 and response[1] == 0x16:
             print('Request recieved, write error')
-        elif response[0] == 0x16 & response[1] == 0x06:
+        elif response[0] == 0x16 and response[1] == 0x06:
             print('Request not received, write success?? ERROR')
-        elif response[0] == 0x16 & response[1] == 0x16:
+        elif response[0] == 0x16 and response[1] == 0x16:
             print('Request not received, write error')
         else:
             print('Something horribly wrong ERROR')
@@ -43,31 +60,22 @@ class GF100Serial:
     def indicated_flow(self):
         self.ser.reset_input_buffer()
 
-        packet = [self.macID, 0x02, 0x80, 0x03, 0x6A, 0x01, 0xA9, 0x00, 0x99]
-
-        self.ser.write(bytes(packet))
+        self.ser.write(build_indicated_flow_packet(self.macID))
 
         time.sleep(0.1)
         response = self.ser.read(12)
 
-        if response[0] == 0x06:
-            print('Packet received (ack)')
-            if sum(response[2:10]) & 0xFF == response[11]:
-                LSB = response[8]
-                MSB = response[9]
-                flow = LSB + (MSB << 8)
-                flowPercent = (flow - 0x4000)*100 / (0xC000-0x4000)
-                print(f'Checksum good, Flow={flowPercent}%')
-                return flowPercent
-            else:
-                print('Checksum bad')
-                return 'Bad'
-        elif response[0] == 0x16:
+        # Same decoding as GF100Bus, the messages only say why a response was bad
+        flowPercent = parse_indicated_flow_response(response)
+        if flowPercent != 'Bad':
+            print(f'Packet received (ack), checksum good, Flow={flowPercent}%')
+        elif len(response) > 0 and response[0] == 0x06:
+            print('Packet received (ack), checksum bad or response cut short')
+        elif len(response) > 0 and response[0] == 0x16:
             print('nak')
-            return 'Bad'
         else:
             print('Something went wrong')
-            return 'Bad'
+        return flowPercent
         
     def close_port(self):
         # Close the serial port connection cleanly
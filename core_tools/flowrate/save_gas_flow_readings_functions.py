@@ -14,6 +14,15 @@ def get_flow_reading(sensor, maxFlow, maxFlowUnits):
         flowRate = 'Bad'
     return flowPercent, flowRate, maxFlowUnits
 
+# Converts a single flow rate reading to L/min, same rules as get_flowrate in core_tools/gui/get_data_for_GUI.py
+# Returns NaN if the reading is bad
+def convert_flowrate_to_L_per_min(flowRate, flowRateUnits):
+    if flowRate == 'Bad' or flowRateUnits == 'Bad':
+        return float('nan')
+    if flowRateUnits == 'SCCM':
+        return flowRate / 1000.0
+    return flowRate
+
 # Creates a new CSV file with a header row if it doesn't already exist
 def create_flow_log_csv(filepath):
     if not os.path.exists(filepath):  # Check if the file already exists
@@ -22,7 +31,9 @@ def create_flow_log_csv(filepath):
             writer.writerow(['Time', 'FlowPercent', 'FlowRate', 'FlowRateUnits'])  # Write column headers
 
 #Logs pressure readings to CSV at regular intervals indefinitely or for a set duration
-def log_flow_to_csv(sensor, filepath, interval_sec, maxFlow, maxFlowUnits, duration_sec=None): #None by default means run indefinitely unless specified
+#If a SampleStreamServer is given, every reading is also pushed (in L/min) to its subscribers on the 'flowrate' channel
+#If an InterlockEngine is given, its rules are checked on every reading (in L/min, 'flowrate' channel) before anything else is done with it
+def log_flow_to_csv(sensor, filepath, interval_sec, maxFlow, maxFlowUnits, duration_sec=None, stream_server=None, interlock=None): #None by default means run indefinitely unless specified
     start_time = time.time()
 
     with open(filepath, mode='a', newline='') as file:  # Open in append mode
@@ -30,7 +41,14 @@ def log_flow_to_csv(sensor, filepath, interval_sec, maxFlow, maxFlowUnits, durat
 
         while duration_sec is None or time.time() - start_time < duration_sec:  # Loop indefinitely or keep looping until time is up
             flowPercent, flowRate, FlowRateUnits = get_flow_reading(sensor, maxFlow, maxFlowUnits)  # Read current values
-            timestamp = time.strftime('%Y-%m-%d %H:%M:%S')         # Format current time
+            sample_time = time.time()
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sample_time))  # Format current time
+            flowrate = convert_flowrate_to_L_per_min(flowRate, FlowRateUnits)
+
+            if interlock is not None:
+                interlock.process_sample('flowrate', sample_time, flowrate)  # Fire interlock actions first, before any disk write
+            if stream_server is not None:
+                stream_server.publish('flowrate', sample_time, flowrate)  # Push to subscribers before the slow disk write
 
             writer.writerow([timestamp, flowPercent, flowRate, FlowRateUnits])  # Write to CSV
             file.flush()               # Flush Python’s internal buffer
@@ -39,6 +57,53 @@ def log_flow_to_csv(sensor, filepath, interval_sec, maxFlow, maxFlowUnits, durat
             time.sleep(interval_sec)  # Wait before next reading
 
     sensor.close_port()  # Close serial connection when done
+    if stream_server is not None:
+        stream_server.close()
+    if interlock is not None:
+        interlock.close()
+
+#Logs the readings of every controller on a GF100Bus (see gas_flow_controller_bus_class.py) to its own CSV, same columns as log_flow_to_csv
+#filepaths is a dict of MAC ID -> log filepath, make each one first with create_flow_log_csv
+#All controllers are polled back to back at the start of every interval, the interval is kept from start to start so polling more controllers does not stretch it
+#If a SampleStreamServer is given, every reading is also pushed (in L/min) on the 'flowrate_<macID>' channel
+#If an InterlockEngine is given, its rules are checked on every reading (in L/min, 'flowrate_<macID>' channel) as soon as the controller has been read
+def log_bus_flows_to_csv(bus, filepaths, interval_sec, maxFlow, maxFlowUnits, duration_sec=None, stream_server=None, interlock=None): #None by default means run indefinitely unless specified
+    start_time = time.time()
+    controllers = {macID: bus.controller(macID) for macID in filepaths}
+    files = {macID: open(filepath, mode='a', newline='') for macID, filepath in filepaths.items()}  # Open in append mode
+    writers = {macID: csv.writer(file) for macID, file in files.items()}
+    next_poll = time.monotonic()
+
+    try:
+        while duration_sec is None or time.time() - start_time < duration_sec:  # Loop indefinitely or keep looping until time is up
+            readings = {}
+            for macID, controller in controllers.items():
+                readings[macID] = get_flow_reading(controller, maxFlow, maxFlowUnits) + (time.time(),)  # Read current values
+                if interlock is not None:
+                    flowPercent, flowRate, FlowRateUnits, sample_time = readings[macID]
+                    interlock.process_sample(f'flowrate_{macID}', sample_time, convert_flowrate_to_L_per_min(flowRate, FlowRateUnits))  # Fire interlock actions before polling the next controller
+
+            for macID, (flowPercent, flowRate, FlowRateUnits, sample_time) in readings.items():
+                timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sample_time))  # Format current time
+                if stream_server is not None:
+                    stream_server.publish(f'flowrate_{macID}', sample_time, convert_flowrate_to_L_per_min(flowRate, FlowRateUnits))  # Push to subscribers before the slow disk write
+                writers[macID].writerow([timestamp, flowPercent, flowRate, FlowRateUnits])  # Write to CSV
+                print(f"{timestamp} - MAC ID {macID} - Flow Percent: {flowPercent}%, Flow Rate: {flowRate} {FlowRateUnits}")  # Console log, uncomment for debugging
+
+            for file in files.values():
+                file.flush()               # Flush Python’s internal buffer
+                os.fsync(file.fileno())   # Force OS to flush file to disk
+
+            next_poll += interval_sec
+            time.sleep(max(0.0, next_poll - time.monotonic()))  # Wait until the next interval starts
+    finally:
+        for file in files.values():
+            file.close()
+        bus.close_port()  # Close serial connection when done
+        if stream_server is not None:
+            stream_server.close()
+        if interlock is not None:
+            interlock.close()
 
 # Example usage
 if __name__ == '__main__':
@@ -1,22 +1,78 @@
 import pandas as pd
 from datetime import datetime
 import numpy as np
+import io
+import os
+import time
+from ..archive.log_archive_functions import is_archive, get_archive_filepath, read_archive_index, read_archive_blocks, read_archive_header, select_last_n_rows_blocks, select_time_range_blocks, count_archive_rows
 
 '''This module provides functions to read data from a CSV file and process it for GUI display.'''
 
+# Log CSVs that have been archived (see core_tools/archive/log_archive_functions.py) are read transparently:
+# either pass the archive path (log.csv.gz) or keep using the original path (log.csv). Once a log has been archived, create_*_log_csv starts a new log.csv
+# next to the archive, so a log can be in two parts: the archive (oldest rows) followed by the live CSV (newest rows), the readers below read both as one log
+def get_log_parts(csv_filepath):
+    if is_archive(csv_filepath):
+        return [csv_filepath]
+    parts = []
+    if os.path.exists(get_archive_filepath(csv_filepath)):
+        parts.append(get_archive_filepath(csv_filepath))
+    if os.path.exists(csv_filepath) or not parts:
+        parts.append(csv_filepath)  # A log that does not exist at all still gives the usual error when it is read
+    return parts
+
+# Returns the part of a log that gets new rows (the live CSV, or the archive if there is no live CSV)
+def resolve_log_filepath(csv_filepath):
+    return get_log_parts(csv_filepath)[-1]
+
+# Returns the first data row of the file of a log that read_new_rows offsets refer to, to tell whether a saved offset still belongs to the same file
+# (a log that was deleted and started again, or archived, does not start with the same row), None if the file has no complete row yet
+def get_log_identity(csv_filepath, max_bytes=4096):
+    csv_filepath = resolve_log_filepath(csv_filepath)
+    try:
+        if is_archive(csv_filepath):
+            index = read_archive_index(csv_filepath)
+            return index[0]['first_time'] if index else None
+        with open(csv_filepath, 'rb') as f:
+            f.readline()  # Header
+            first_row = f.readline(max_bytes)
+    except OSError:
+        return None
+    return first_row.decode('utf-8', errors='replace').strip() if first_row.endswith(b'\n') else None
+
 def count_lines(csv_filepath):
+    return 1 + sum(count_data_rows(part) for part in get_log_parts(csv_filepath))  # + 1 for the header, same as a plain CSV
+
+# Number of data rows of one file of a log (archive or plain CSV)
+def count_data_rows(filepath):
+    if is_archive(filepath):
+        return count_archive_rows(filepath)
+
     # Open the file in binary mode ('rb') for efficient line counting
-    with open(csv_filepath, 'rb') as f:
+    with open(filepath, 'rb') as f:
         # Iterate over each line in the file and count the total number of lines
         # sum(1 for _ in f) adds 1 for every line encountered, giving total line count
-        return sum(1 for _ in f)
-    
-def read_last_n_rows(csv_filepath, n):
-    # Count the total number of lines in the file (including the header line)
-    total_lines = count_lines(csv_filepath)
+        return sum(1 for _ in f) - 1  # - 1 for the header
 
-    # Subtract 1 to exclude the header, giving the number of actual data rows
-    data_lines = total_lines - 1
+def read_last_n_rows(csv_filepath, n):
+    parts = get_log_parts(csv_filepath)
+    dataframe = read_last_n_rows_of_file(parts[-1], n)
+    if len(parts) > 1 and len(dataframe) < n:
+        # The live CSV is shorter than n rows, the rest come from the end of the archive
+        older = read_last_n_rows_of_file(parts[0], n - len(dataframe))
+        dataframe = pd.concat([older, dataframe], ignore_index=True)
+    return dataframe
+
+# Reads the last n rows of one file of a log (archive or plain CSV)
+def read_last_n_rows_of_file(csv_filepath, n):
+    if is_archive(csv_filepath):
+        # Only decompress the blocks at the end of the archive that hold the last n rows
+        index = read_archive_index(csv_filepath)
+        dataframe = pd.read_csv(io.BytesIO(read_archive_blocks(csv_filepath, select_last_n_rows_blocks(index, n), index)))
+        return dataframe.iloc[-n:].reset_index(drop=True) if n > 0 else dataframe.iloc[0:0]
+
+    # Count the number of actual data rows (the header is not counted)
+    data_lines = count_data_rows(csv_filepath)
 
     # Determine how many of the earliest data rows to skip
     # This ensures that only the last `n` rows are read
@@ -34,6 +90,148 @@ def read_last_n_rows(csv_filepath, n):
     # Read the CSV file, skipping the early rows but keeping the header
     return pd.read_csv(csv_filepath, skiprows=skip)
 
+# Reads only the last complete row of a CSV (plus the header), by reading at most tail_bytes from the end of the file no matter how long the log is
+# Meant for polling a log that is being written to, a line that is still being written is ignored
+def read_last_row(csv_filepath, tail_bytes=4096):
+    parts = get_log_parts(csv_filepath)
+    csv_filepath = parts[-1]
+    if is_archive(csv_filepath):
+        return read_last_n_rows_of_file(csv_filepath, 1)
+
+    with open(csv_filepath, 'rb') as f:
+        header = f.readline()
+        size = f.seek(0, os.SEEK_END)
+        start = max(len(header), size - tail_bytes)
+        f.seek(start)
+        lines = f.read().split(b'\n')[:-1]  # Everything after the last newline is still being written
+    if start > len(header):
+        lines = lines[1:]  # The first line may have started before the bytes that were read
+    lines = [line for line in lines if line.strip()]
+    if not lines and len(parts) > 1 and start == len(header):
+        return read_last_n_rows_of_file(parts[0], 1)  # Live CSV was just started, its last row is still the archive's last row
+    return pd.read_csv(io.BytesIO(header + (lines[-1] + b'\n' if lines else b'')))
+
+# Reads the rows appended to a CSV after byte offset, returns (dataframe, new offset, reset), pass the new offset back in on the next call
+# Only complete lines are read, a line that is still being written is left for the next call
+# An offset of 0 (or one that no longer fits the file, e.g. the log was truncated or recreated) reads the file from the start, and reset is True so the caller can drop the rows it had
+# max_rows: if given, only the last max_rows new rows are read, reading backwards from the end of the file in chunk_bytes chunks so catching up on a long log does not read all of it
+# The dataframe has no columns if there is no new complete row
+# For a log in two parts (archive + live CSV), the offset is in the live CSV, and reading from the start also reads the archive (its last rows if max_rows is given)
+def read_new_rows(csv_filepath, offset=0, max_rows=None, chunk_bytes=1 << 20):
+    parts = get_log_parts(csv_filepath)
+    csv_filepath = parts[-1]
+    if is_archive(csv_filepath):
+        # Archives are closed logs that no longer grow: read everything (or the last max_rows) once, the archive's size is used as the offset
+        size = os.path.getsize(csv_filepath)
+        if offset == size:
+            return pd.DataFrame(), offset, False
+        dataframe = read_last_n_rows_of_file(csv_filepath, max_rows) if max_rows is not None else read_time_range(csv_filepath)
+        return dataframe, size, True
+
+    dataframe, offset, reset = read_new_rows_of_file(csv_filepath, offset, max_rows, chunk_bytes)
+    if reset and len(parts) > 1 and (max_rows is None or len(dataframe) < max_rows):
+        if max_rows is None:
+            older = read_time_range(parts[0])
+        else:
+            older = read_last_n_rows_of_file(parts[0], max_rows - len(dataframe))
+        dataframe = pd.concat([older, dataframe], ignore_index=True) if len(dataframe) > 0 else older
+    return dataframe, offset, reset
+
+# read_new_rows for one plain CSV
+def read_new_rows_of_file(csv_filepath, offset, max_rows, chunk_bytes):
+
+    with open(csv_filepath, 'rb') as f:
+        header = f.readline()
+        size = f.seek(0, os.SEEK_END)
+        reset = offset < len(header) or offset > size
+        if reset:
+            offset = len(header)
+
+        # Read backwards from the end until the start offset, or until there are enough lines for max_rows
+        chunks = []
+        newlines = 0
+        position = size
+        while position > offset and (max_rows is None or newlines <= max_rows):
+            read_from = max(offset, position - chunk_bytes)
+            f.seek(read_from)
+            chunk = f.read(position - read_from)
+            chunks.insert(0, chunk)
+            newlines += chunk.count(b'\n')
+            position = read_from
+
+    data = b''.join(chunks)
+    complete = data.rfind(b'\n') + 1  # Everything after the last newline is still being written
+    new_offset = position + complete
+    lines = data[:complete]
+    if position > offset:
+        lines = lines[lines.find(b'\n') + 1:]  # The first line may have started before the bytes that were read
+    if max_rows is not None:
+        lines = b''.join(lines.splitlines(keepends=True)[-max_rows:]) if max_rows > 0 else b''
+    if not lines.strip():
+        return pd.DataFrame(), max(new_offset, offset), reset
+    return pd.read_csv(io.BytesIO(header + lines)), new_offset, reset
+
+# Reads the rows with a timestamp between start_time and end_time (strings in the '%Y-%m-%d %H:%M:%S' log format, None means open ended)
+# For archives, only the blocks that overlap the range are decompressed
+def read_time_range(csv_filepath, start_time=None, end_time=None):
+    dataframes = []
+    for part in get_log_parts(csv_filepath):
+        if is_archive(part):
+            index = read_archive_index(part)
+            dataframes.append(pd.read_csv(io.BytesIO(read_archive_blocks(part, select_time_range_blocks(index, start_time, end_time), index))))
+        else:
+            dataframes.append(pd.read_csv(part))
+    dataframe = pd.concat(dataframes, ignore_index=True) if len(dataframes) > 1 else dataframes[0]
+
+    # Blocks can hold rows on both sides of the range, so filter row by row as well
+    in_range = np.ones(len(dataframe), dtype=bool)
+    if start_time is not None:
+        in_range &= (dataframe['Time'] >= start_time).to_numpy()
+    if end_time is not None:
+        in_range &= (dataframe['Time'] <= end_time).to_numpy()
+    return dataframe[in_range].reset_index(drop=True)
+
+# Reads the rows with a timestamp at or after start_time, returns (dataframe, offset), the offset can be passed to read_new_rows to read the rows appended afterwards
+# The live CSV is read backwards from the end in chunk_bytes chunks, only until a row older than start_time is reached, so the cost depends on the time range and not on how long the log is
+# The archive of a log in two parts is only read if the range goes back past the start of the live CSV
+def read_rows_since(csv_filepath, start_time, chunk_bytes=1 << 20):
+    parts = get_log_parts(csv_filepath)
+    csv_filepath = parts[-1]
+    if is_archive(csv_filepath):
+        return read_time_range(csv_filepath, start_time=start_time), os.path.getsize(csv_filepath)  # Same offset as read_new_rows uses for archives
+
+    with open(csv_filepath, 'rb') as f:
+        header = f.readline()
+        size = f.seek(0, os.SEEK_END)
+        chunks = []
+        position = size
+        while position > len(header):
+            read_from = max(len(header), position - chunk_bytes)
+            f.seek(read_from)
+            chunk = f.read(position - read_from)
+            chunks.insert(0, chunk)
+            position = read_from
+            # Rows are in time order, so once the first complete row read is older than start_time every row before it is too
+            first_line = chunk if position == len(header) else chunk[chunk.find(b'\n') + 1:]
+            first_line = first_line.lstrip()
+            if first_line and first_line.split(b',', 1)[0].decode('utf-8', errors='replace') < start_time:
+                break
+
+    data = b''.join(chunks)
+    complete = data.rfind(b'\n') + 1  # Everything after the last newline is still being written
+    offset = position + complete
+    lines = data[:complete]
+    if position > len(header):
+        lines = lines[lines.find(b'\n') + 1:]  # The first line may have started before the bytes that were read
+    dataframe = pd.read_csv(io.BytesIO(header + lines))
+    dataframe = dataframe[(dataframe['Time'] >= start_time).to_numpy()].reset_index(drop=True)
+
+    if position <= len(header) and len(parts) > 1:
+        # The range starts before the live CSV, the older rows come from the archive
+        older = read_time_range(parts[0], start_time=start_time)
+        dataframe = pd.concat([older, dataframe], ignore_index=True) if len(dataframe) > 0 else older
+    return dataframe, max(offset, len(header))
+
 def get_seconds_ago(dataframe):
     # Convert the 'Time' column in the dataframe from string to datetime objects
     # using the specified format: 'Year-Month-Day Hour:Minute:Second'
@@ -51,6 +249,17 @@ def get_seconds_ago(dataframe):
     # Return the new 'seconds_ago' Series from the dataframe
     return dataframe['seconds_ago']
 
+# Converts the 'Time' column to absolute timestamps (seconds since epoch, same as time.time())
+def get_timestamps(dataframe):
+    timestamps = pd.to_datetime(dataframe['Time'], format='%Y-%m-%d %H:%M:%S')
+
+    # Read both clocks once, so every row is shifted by the same amount
+    now_epoch = time.time()
+    current_time = datetime.now()
+
+    # Log timestamps are whole seconds, rounding removes the tiny difference between the two clock reads so the same row always gets the same timestamp
+    return np.round(now_epoch - (current_time - timestamps).dt.total_seconds().to_numpy())
+
 def get_outer_vessel_pressure(dataframe):
     # Convert gauge values to numeric, coercing errors (like 'Off') to NaN
     gauge1 = pd.to_numeric(dataframe['Gauge 1'], errors='coerce')
@@ -122,26 +331,68 @@ def get_temperature(dataframe):
     # Return the temperature values as a pandas Series with the same index as the input DataFrame
     return pd.Series(temperature, name='Temperature', index=dataframe.index)
 
+# Wide temperature logs (see core_tools/temperature) hold every VMM in one row per sample, in columns 'VMM 0', 'VMM 1', ... (empty when a VMM could not be read)
+def get_temperature_columns(dataframe):
+    return [column for column in dataframe.columns if column.startswith('VMM ')]
+
+# Decodes every VMM of a wide temperature log at once, returns a 2-D numpy array with one row per sample and one column per VMM (in the log's column order)
+def get_temperature_block(dataframe):
+    temperatures = dataframe[get_temperature_columns(dataframe)]
+    if any(dtype == object for dtype in temperatures.dtypes):
+        temperatures = temperatures.apply(pd.to_numeric, errors='coerce')  # Only needed if a column holds text (e.g., a line cut short), otherwise pandas already parsed them as floats
+    return temperatures.to_numpy(dtype=float)
+
+# Decodes one VMM of a wide temperature log, vmm is the VMM's column number (0 for the first 'VMM' column)
+def get_vmm_temperature(dataframe, vmm):
+    temperature = pd.to_numeric(dataframe[get_temperature_columns(dataframe)[vmm]], errors='coerce')
+    return pd.Series(temperature, name='Temperature', index=dataframe.index)
+
+# Decoder used for each supported datatype, each takes a dataframe of raw log rows and returns a pandas Series of values
+DECODERS = {
+    'outer_vessel_pressure': get_outer_vessel_pressure,
+    'inner_vessel_pressure': get_inner_vessel_pressure,
+    'flowrate': get_flowrate,
+    'temperature': get_temperature,
+}
+
+# Datatypes of wide logs, written '<name>:<column>' to pick one column (e.g., 'vmm_temperature:5' is VMM 5)
+# Each has a block decoder (dataframe -> 2-D array of every column) and a column decoder (dataframe, column -> pandas Series of that column)
+BLOCK_DECODERS = {
+    'vmm_temperature': (get_temperature_block, get_vmm_temperature),
+}
+
+# Splits a wide log datatype into (name, column), e.g. 'vmm_temperature:5' -> ('vmm_temperature', 5), returns None for any other datatype
+def parse_block_datatype(datatype):
+    name, _, column = datatype.partition(':')
+    if name in BLOCK_DECODERS and column.isdigit():
+        return name, int(column)
+    return None
+
+# Number of columns the block decoder of a wide log datatype (e.g., 'vmm_temperature') finds in a log, only the header of the log is read
+def count_block_columns(csv_filepath, name):
+    csv_filepath = resolve_log_filepath(csv_filepath)
+    if is_archive(csv_filepath):
+        header = pd.read_csv(io.BytesIO(read_archive_header(csv_filepath)))
+    else:
+        header = pd.read_csv(csv_filepath, nrows=0)
+    return BLOCK_DECODERS[name][0](header).shape[1]
+
+# Decodes the values of a dataframe of raw log rows for the requested datatype
+def decode_datatype(dataframe, datatype):
+    block_datatype = parse_block_datatype(datatype)
+    if block_datatype is not None:
+        name, column = block_datatype
+        return BLOCK_DECODERS[name][1](dataframe, column)
+    if datatype not in DECODERS:
+        # Raise an error if the datatype is not supported
+        supported = [repr(name) for name in DECODERS] + [f"'{name}:<column>'" for name in BLOCK_DECODERS]
+        raise ValueError(f"Unsupported datatype: {datatype}. Supported types are: {', '.join(supported)}.")
+    return DECODERS[datatype](dataframe)
+
 def get_n_XY_datapoints(csv_filepath, n, datatype):
     dataframe = read_last_n_rows(csv_filepath, n)
 
     # Depending on the requested datatype, process and return the appropriate data
-    if datatype == 'outer_vessel_pressure':
-        times = get_seconds_ago(dataframe)
-        pressures = get_outer_vessel_pressure(dataframe)
-        return times, pressures
-    elif datatype == 'inner_vessel_pressure':
-        times = get_seconds_ago(dataframe)
-        pressures = get_inner_vessel_pressure(dataframe)
-        return times, pressures
-    elif datatype == 'flowrate':
-        times = get_seconds_ago(dataframe)
-        flowrates = get_flowrate(dataframe)
-        return times, flowrates
-    elif datatype == 'temperature':
-        times = get_seconds_ago(dataframe)
-        temperature = get_temperature(dataframe)
-        return times, temperature
-    else:
-        # Raise an error if the datatype is not supported
-        raise ValueError(f"Unsupported datatype: {datatype}. Supported types are: 'outer_vessel_pressure', 'inner_vessel_pressure', 'flowrate', 'temperature'.")
\ No newline at end of file
+    times = get_seconds_ago(dataframe)
+    values = decode_datatype(dataframe, datatype)
+    return times, values
\ No newline at end of file
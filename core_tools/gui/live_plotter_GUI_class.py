@@ -1,17 +1,25 @@
-from pyqtgraph.Qt import QtWidgets, QtCore
-import pyqtgraph as pg
-import numpy as np
+try:
+    from PyQt5 import QtWidgets, QtCore  # Import the Qt binding directly so pyqtgraph (and numpy) are only imported once a tab is shown
+except ImportError:
+    from pyqtgraph.Qt import QtWidgets, QtCore
 import sys
-import pandas as pd
-from .get_data_for_GUI import get_n_XY_datapoints
-import subprocess
+from ..streaming.sample_stream_client_class import SampleStreamClient
+from ..analysis.leak_rate_estimator_class import LeakRateEstimator, format_window
 import shlex
 import platform
+import time
 
 '''Class to handle live plotting and add various controls/buttons in a Qt GUI application.'''
 
+# pyqtgraph, numpy, pandas and get_data_for_GUI (which imports pandas) are imported inside the functions that need them
+# This keeps them off the start-up path: the window shows up first, and they are imported the first time a tab is shown
+
 class LivePlotter:
-    def __init__(self, win_title):
+    def __init__(self, win_title, measure_startup_from=None):
+        # measure_startup_from: time.perf_counter() value taken when the program started, if given the GUI prints how long
+        # it took to become interactive and to show the plots of the first tab, then quits (start-up time measurement mode)
+        self.measure_startup_from = measure_startup_from
+
         # Create the main Qt application
         self.app = QtWidgets.QApplication(sys.argv)
 
@@ -28,29 +36,110 @@ class LivePlotter:
         self.main_layout.addWidget(self.tabs)
 
         self.tab_objects = {}  # tab_name -> LiveTab object
+        self.dashboard = None  # DashboardServer showing the plots in a browser, see start_dashboard
+
+        # Plot buffer cache, see enable_buffer_cache
+        self.buffer_cache_filepath = None
+        self.cached_buffers = None  # '<tab name>/<plot title>' -> entry loaded from the cache, only loaded once a tab is first shown
+        self.buffer_cache_timer = None
 
         #Calls the clanup function when the application is about to quit so that all running subprocesses are terminated
         self.app.aboutToQuit.connect(self.cleanup)
 
     #Create a tab in the window to put plots and buttons in
-    def create_tab(self, tab_name, plots_per_row):
-        tab = LiveTab(plots_per_row)
+    #The plots, timers and buffers of the tab are only created the first time the tab is shown, see LiveTab.materialize
+    #dense=True draws all the plots of the tab in one graphics view refreshed together (for tabs with many plots, e.g. VMM temperatures), use_opengl=True renders that view with OpenGL
+    def create_tab(self, tab_name, plots_per_row, dense=False, use_opengl=False):
+        tab = LiveTab(plots_per_row, dense=dense, use_opengl=use_opengl)
         self.tab_objects[tab_name] = tab
+        tab.cached_buffer_source = lambda title: self.get_cached_buffer(tab_name, title)
+        if self.measure_startup_from is not None and len(self.tab_objects) == 1:
+            tab.materialize_callbacks.append(self.report_first_tab_ready)
         self.tabs.addTab(tab, tab_name)
         return tab
 
+    # Keep the CSV plots' buffers in a cache file (saved every interval_sec and when the GUI closes), so after a restart every plot shows the history it had right away
+    # and only the rows logged since the last save are read from the logs, instead of starting empty and rereading the logs
+    def enable_buffer_cache(self, filepath, interval_sec=60):
+        self.buffer_cache_filepath = filepath
+        self.buffer_cache_timer = QtCore.QTimer()
+        self.buffer_cache_timer.timeout.connect(self.save_buffer_cache)
+        self.buffer_cache_timer.start(int(interval_sec * 1000))
+
+    # Returns the cached buffer of a plot (and forgets it, it is only used once), or None if there is none
+    def get_cached_buffer(self, tab_name, title):
+        if self.buffer_cache_filepath is None:
+            return None
+        if self.cached_buffers is None:
+            from .plot_buffer_cache_functions import load_plot_buffers
+            self.cached_buffers = load_plot_buffers(self.buffer_cache_filepath)
+        return self.cached_buffers.pop(f'{tab_name}/{title}', None)
+
+    # Saves the buffers of every CSV plot to the cache file, cached buffers of tabs that have not been shown yet are kept as they were
+    def save_buffer_cache(self):
+        if self.cached_buffers is None:
+            return  # No tab shown yet, the cache file is still up to date
+        from .plot_buffer_cache_functions import save_plot_buffers
+
+        entries = dict(self.cached_buffers)
+        for tab_name, tab in self.tab_objects.items():
+            for title, entry in tab.get_csv_plot_buffers().items():
+                entries[f'{tab_name}/{title}'] = entry
+        try:
+            save_plot_buffers(self.buffer_cache_filepath, entries)
+        except OSError as error:
+            print(f'Could not save plot buffer cache {self.buffer_cache_filepath}: {error}')
+
     #Call cleanup function for each tab to end all running subprocesses
     def cleanup(self):
+        if self.buffer_cache_filepath is not None:
+            self.save_buffer_cache()
         for tab_name in self.tab_objects:
             self.tab_objects[tab_name].cleanup()
+        if self.dashboard is not None:
+            self.dashboard.close()
+
+    # Layout of the plots of every tab, in order: list of {'tab': tab name, 'plots_per_row': int, 'plots': list of LiveTab.plot_layout entries}
+    def get_plot_layout(self):
+        return [{'tab': tab_name, 'plots_per_row': tab.plots_per_row, 'plots': list(tab.plot_layout.values())} for tab_name, tab in self.tab_objects.items()]
+
+    # Serve the plots of every tab (same layout, read-only) to any number of web browsers on http://<this PC>:port, see core_tools/dashboard
+    # Call after all the tabs have been filled, the server runs in background threads next to the GUI
+    def start_dashboard(self, port, host='0.0.0.0'):
+        from ..dashboard.dashboard_server_class import DashboardServer
+        self.dashboard = DashboardServer(self.get_plot_layout(), port, host=host)
+        self.dashboard.start()
+        print(f'Dashboard served on http://{host}:{port}')
+
+    # Serve the dashboard without showing the GUI window (e.g., on a PC without a screen), runs until interrupted
+    def serve_dashboard(self, port, host='0.0.0.0'):
+        self.start_dashboard(port, host=host)
+        try:
+            self.dashboard.wait()
+        except KeyboardInterrupt:
+            pass
+        self.cleanup()
     
     # Show the window and start the event loop
     def run(self):
+        if self.measure_startup_from is not None:
+            QtCore.QTimer.singleShot(0, self.report_interactive)  # Fires on the first pass of the event loop, i.e. once the window responds to input
         self.main_window.show()
         sys.exit(self.app.exec_())
 
+    # Start-up time measurement mode: time until the event loop is running with the window shown
+    def report_interactive(self):
+        elapsed = time.perf_counter() - self.measure_startup_from
+        print(f'Window interactive after {elapsed:.3f} s (target < 1 s)')
+
+    # Start-up time measurement mode: time until the plots of the first tab exist, then quit
+    def report_first_tab_ready(self):
+        elapsed = time.perf_counter() - self.measure_startup_from
+        print(f'First tab plots ready after {elapsed:.3f} s')
+        self.app.quit()
+
 class LiveTab(QtWidgets.QWidget):
-    def __init__(self, plots_per_row):
+    def __init__(self, plots_per_row, dense=False, use_opengl=False):
         super().__init__() # Call the constructor of the parent class (QWidget) to properly initialize the widget. This class is now a custom QTWidget
 
         '''self.layout = QtWidgets.QGridLayout() ## Create a grid layout manager to arrange child widgets (plots, buttons) in a grid format.
@@ -62,9 +151,17 @@ class LiveTab(QtWidgets.QWidget):
 
         # Container widget inside the scroll area
         container = QtWidgets.QWidget()
-        self.layout = QtWidgets.QGridLayout(container)
+        if dense:
+            # Dense mode: one graphics view holding every plot on top (added when the tab is first shown), the grid below it holds the other widgets
+            self.dense_layout = QtWidgets.QVBoxLayout(container)
+            grid_widget = QtWidgets.QWidget()
+            self.layout = QtWidgets.QGridLayout(grid_widget)
+            self.dense_layout.addWidget(grid_widget)
+        else:
+            self.layout = QtWidgets.QGridLayout(container)
 
         scroll.setWidget(container)
+        self.scroll = scroll
 
         # Main layout for the tab is just the scroll area
         outer_layout = QtWidgets.QVBoxLayout()
@@ -74,8 +171,13 @@ class LiveTab(QtWidgets.QWidget):
         self.plots_per_row = plots_per_row
         self.plot_counts = 0
 
+        # Lazy tab state: everything heavy (plot widgets, curves, buffers, timers) is queued up and only created the first time the tab is shown
+        self.materialized = False
+        self.pending_builders = []                # functions to call (in order) when the tab is first shown
+        self.materialize_callbacks = []           # functions to call once the tab has been materialized
+
         # Internal state tracking for plots
-        self.data = {}                            # title -> {x: pandas Series, y: pandas Series, buffer_size: int}
+        self.data = {}                            # title -> {t: timestamps, y: values, buffer_size: int, ...} (only buffer_size until the tab is shown), see init_buffers
         self.curves = {}                          # title -> plot curve
         self.interval_timers = {}                 # title -> QTimer for updates
         self.elapsed_timers = {}                  # title -> QElapsedTimer for time axis
@@ -83,20 +185,75 @@ class LiveTab(QtWidgets.QWidget):
         self.start_stop_buttons = {}              # title -> start/stop QPushButton
         self.csv_filepath = {}                    # title -> CSV filepath from logging to pull data from
         self.datatype = {}                        # Datatype for the plots (e.g., 'pressure', 'temperature')
+        self.cached_buffer_source = None          # function title -> buffer saved by a previous run of the GUI (or None), set by LivePlotter.create_tab
+        self.block_buffers = {}                   # (CSV filepath, wide log datatype) -> SharedBlockBuffer read once per update for every plot of that log
+        self.block_columns = {}                   # title -> (SharedBlockBuffer, column) for plots of one column of a wide log (e.g., datatype 'vmm_temperature:5')
+
+        #Internal state tracking for dense mode, where all plots share one graphics view and one refresh timer
+        self.dense = dense
+        self.use_opengl = use_opengl
+        self.dense_view = None                    # pg.GraphicsLayoutWidget holding every plot of the tab
+        self.dense_start_stop_button = None       # QPushButton starting/stopping every plot of the tab
+        self.dense_plot_items = {}                # title -> pg.PlotItem inside dense_view
+        self.dense_update_funcs = {}              # title -> function updating the plot, called by refresh_dense_plots
+        self.dense_timer = None                   # single QTimer refreshing every plot of the tab
+        self.dense_plot_counts = 0
+        self.dense_row_height = 200               # minimum height in pixels of each row of plots
+
+        #Internal state tracking for plots fed by a sample stream instead of a CSV
+        self.stream_clients = {}                  # stream address -> SampleStreamClient shared by all plots using that address
+        self.stream_channels = {}                 # title -> (SampleStreamClient, channel name)
+
+        #Internal state tracking for leak rate readouts
+        self.leak_rate_estimators = {}            # title -> (LeakRateEstimator, title of the pressure plot it follows)
+        self.leak_rate_labels = {}                # title -> QLabel showing the fitted rates
+        self.leak_rate_offsets = {}               # title -> byte offset in the followed CSV log read up to, only set once the first fill from the log is done
 
         #Internal state tracking for command buttons
         self.cmd_buttons = {}                     # title -> QPushButton for terminal commands
-        self.cmd_processes = {}                   # title -> subprocess.Popen object for running commands
-        self.cmd_running_state = {}               # title -> bool: is command running
+        self.cmd_processes = {}                   # title -> QProcess of the latest run of the command
+        self.cmd_running_state = {}               # title -> bool: is command running (or waiting to be restarted)
         self.cmd_command_strings = {}             # title -> command string (useful if we want to change command on the fly)
+        self.cmd_output_panes = {}                # title -> QPlainTextEdit showing the command's output
+        self.cmd_partial_output = {}              # title -> output received after the last complete line
+        self.cmd_auto_restart = {}                # title -> bool: restart the command if it crashes
+        self.cmd_restart_counts = {}              # title -> number of restarts in a row, sets the backoff delay
+        self.cmd_restart_timers = {}              # title -> single shot QTimer of a pending restart
+        self.cmd_start_times = {}                 # title -> time.monotonic() when the command was last started
 
         #Internal state tracking for dropdown menus
         self.dd_menus = {}                        # title ->
         self.dd_option_names = {}                 # title ->
         self.dd_option_values = {}                 # title ->
+
+        #Description of every plot of the tab in the order they were added (kind, axes, data source), used to show the same plots in the dashboard
+        self.plot_layout = {}                     # title -> dict, see add_plot, add_stream_plot and add_subtraction_plot
     
     # Add a new plot with button below it
     def add_plot(self, title, x_axis, y_axis, buffer_size, csv_filepath, datatype): #x_axis and y_axis are tuples of (label, unit), and buffer_size is the number of data points to display at once
+        #Store the filepath of the CSV associated with this plot
+        self.csv_filepath[title] = csv_filepath
+
+        # Store the datatype for this plot
+        self.datatype[title] = datatype
+
+        self.plot_layout[title] = {'title': title, 'kind': 'csv', 'x_axis': x_axis, 'y_axis': y_axis, 'buffer_size': buffer_size, 'csv_filepath': csv_filepath, 'datatype': datatype}
+        self.create_plot_container(title, x_axis, y_axis, buffer_size)
+
+    # Creates the plot widget, curve, data buffers and start/stop button for a plot and adds them to the grid
+    # Only an empty placeholder is added to the grid right away, the rest is built when the tab is first shown
+    def create_plot_container(self, title, x_axis, y_axis, buffer_size):
+        # Only keep the buffer size for now, the buffers themselves are created with the plot
+        self.data[title] = {"buffer_size": buffer_size}
+
+        if self.dense:
+            index = self.dense_plot_counts
+            self.dense_plot_counts += 1
+            row = index // self.plots_per_row
+            col = index % self.plots_per_row
+            self.defer(lambda: self.build_dense_plot(title, x_axis, y_axis, row, col))
+            return
+
         index = self.plot_counts
         plots_per_row = self.plots_per_row
         self.plot_counts += 1
@@ -106,20 +263,26 @@ class LiveTab(QtWidgets.QWidget):
         # Vertical layout to hold the plot and button
         container = QtWidgets.QVBoxLayout()
 
+        # Wrap the layout in a QWidget and add it to the grid
+        container_widget = QtWidgets.QWidget()
+        container_widget.setLayout(container)
+        container_widget.setMinimumSize(40*16, 40*9)
+        self.layout.addWidget(container_widget, row, col)
+
+        self.defer(lambda: self.build_plot(title, x_axis, y_axis, container))
+
+    # Builds the plot widget, curve, data buffers and start/stop button of a plot inside its placeholder container
+    def build_plot(self, title, x_axis, y_axis, container):
+        import pyqtgraph as pg
+
         # Create the plot widget
         plot_widget = pg.PlotWidget(title=title)
         plot_widget.setLabel('bottom', x_axis[0], units=x_axis[1])
         plot_widget.setLabel('left', y_axis[0], units=y_axis[1])
         plot_widget.showGrid(x=True, y=True)
 
-        # Initialize circular buffers for x and y data
-        self.data[title] = {"x": pd.Series(np.full(buffer_size, np.nan), name='x'), "y": pd.Series(np.full(buffer_size, np.nan), name='y'), "buffer_size": buffer_size}
-
-        #Store the filepath of the CSV associated with this plot
-        self.csv_filepath[title] = csv_filepath
-
-        # Store the datatype for this plot
-        self.datatype[title] = datatype
+        # Initialize the data buffers, using the latest buffer size in case it was changed before the tab was shown
+        self.init_buffers(title, self.data[title]["buffer_size"], use_cache=True)
 
         # Create the plot curve
         curve = plot_widget.plot(pen='y')  # yellow line
@@ -135,42 +298,310 @@ class LiveTab(QtWidgets.QWidget):
         container.addWidget(plot_widget)
         container.addWidget(start_stop_button)
 
-        # Wrap the layout in a QWidget and add it to the grid
-        container_widget = QtWidgets.QWidget()
-        container_widget.setLayout(container)
-        container_widget.setMinimumSize(40*16, 40*9)
-        self.layout.addWidget(container_widget, row, col)
+    # Dense mode: builds a small plot inside the tab's single graphics view
+    def build_dense_plot(self, title, x_axis, y_axis, row, col):
+        if self.dense_view is None:
+            self.build_dense_view()
+
+        plot_item = self.dense_view.addPlot(row=row, col=col, title=title)
+        plot_item.setLabel('bottom', x_axis[0], units=x_axis[1])
+        plot_item.setLabel('left', y_axis[0], units=y_axis[1])
+        plot_item.showGrid(x=True, y=True)
+
+        # Link every time axis to the first plot, so zooming/panning in time applies to all of them
+        if self.dense_plot_items:
+            plot_item.setXLink(next(iter(self.dense_plot_items.values())))
+        self.dense_plot_items[title] = plot_item
+
+        # Initialize the data buffers, using the latest buffer size in case it was changed before the tab was shown
+        self.init_buffers(title, self.data[title]["buffer_size"], use_cache=True)
+
+        # Create the plot curve
+        curve = plot_item.plot(pen='y')  # yellow line
+        self.curves[title] = curve
+
+        # Grow the view so every row of plots stays readable, the scroll area takes care of the rest
+        self.dense_view.setMinimumHeight(max(self.dense_view.minimumHeight(), (row + 1) * self.dense_row_height))
+
+    # Dense mode: creates the single graphics view and start/stop button shared by every plot of the tab
+    def build_dense_view(self):
+        import pyqtgraph as pg
+
+        self.dense_view = pg.GraphicsLayoutWidget()
+        if self.use_opengl:
+            try:
+                self.dense_view.useOpenGL(True)
+            except Exception as error:
+                print(f'OpenGL rendering not available, using software rendering: {error}')
+        self.dense_layout.insertWidget(0, self.dense_view)
+
+        # Create the start/stop button for every plot of the tab
+        self.dense_start_stop_button = QtWidgets.QPushButton("Stop all plots")
+        self.dense_start_stop_button.setStyleSheet("background-color: red;")
+        self.dense_start_stop_button.clicked.connect(lambda _: self.toggle_all_dense_plots())
+        self.dense_layout.insertWidget(1, self.dense_start_stop_button)
+
+    # Dense mode: adds a plot to the tab's single refresh timer, which runs at the fastest interval asked for
+    def add_to_dense_refresh(self, title, interval_ms, update_func):
+        self.dense_update_funcs[title] = update_func
+        if self.dense_timer is None:
+            self.dense_timer = QtCore.QTimer(self)  # Parented to the tab so it lives exactly as long as the tab does
+            self.dense_timer.timeout.connect(self.refresh_dense_plots)
+            self.dense_timer.setInterval(interval_ms)
+        else:
+            self.dense_timer.setInterval(min(self.dense_timer.interval(), interval_ms))
+        if self.isVisible() and not self.dense_timer.isActive():
+            self.dense_timer.start()
+
+    # Dense mode: updates every running plot that is scrolled into view, with a single repaint of the view at the end
+    def refresh_dense_plots(self):
+        # Part of the view visible through the scroll area, in view coordinates
+        viewport = self.scroll.viewport()
+        visible_rect = QtCore.QRect(self.dense_view.mapFrom(viewport, QtCore.QPoint(0, 0)), viewport.size())
+
+        self.dense_view.setUpdatesEnabled(False)  # Hold off repainting until every curve has its new data
+        try:
+            for title in self.dense_update_funcs:
+                if not self.running_state[title]:
+                    continue
+                plot_rect = self.dense_view.mapFromScene(self.dense_plot_items[title].sceneBoundingRect()).boundingRect()
+                if not plot_rect.intersects(visible_rect):
+                    continue  # Scrolled out of view, it gets updated once it is scrolled back in
+                self.dense_update_funcs[title]()
+        finally:
+            self.dense_view.setUpdatesEnabled(True)  # Repaints the whole view once
+
+    # Dense mode: start/stop every plot of the tab at once
+    def toggle_all_dense_plots(self):
+        running = any(self.running_state[title] for title in self.dense_update_funcs)
+        for title in self.dense_update_funcs:
+            if self.running_state[title] == running:
+                self.toggle_plot(title)
+        if running:
+            self.dense_start_stop_button.setText("Start all plots")
+            self.dense_start_stop_button.setStyleSheet("background-color: green;")
+        else:
+            self.dense_start_stop_button.setText("Stop all plots")
+            self.dense_start_stop_button.setStyleSheet("background-color: red;")
 
-    # Update function: fetches data from CSV and updates the plot
+    # Run func now if the tab has already been shown, otherwise queue it up until the tab is first shown
+    def defer(self, func):
+        if self.materialized:
+            func()
+        else:
+            self.pending_builders.append(func)
+
+    # Create every queued plot, buffer and timer of the tab, called the first time the tab is shown
+    def materialize(self):
+        if self.materialized:
+            return
+        self.materialized = True
+        for func in self.pending_builders:
+            func()
+        self.pending_builders = []
+        self.resume_timers()
+        for func in self.materialize_callbacks:
+            func()
+
+    # Pause the plot update timers, called when the tab is hidden (another tab selected, window minimized)
+    def pause_timers(self):
+        if self.dense_timer is not None:
+            self.dense_timer.stop()
+        for title in self.running_state:
+            if title in self.interval_timers:
+                self.interval_timers[title].stop()
+
+    # Restart the update timers of every plot that the user has not stopped, called when the tab is shown again
+    def resume_timers(self):
+        if self.dense_timer is not None and not self.dense_timer.isActive():
+            self.dense_timer.start()
+        for title in self.running_state:
+            if self.running_state[title] and title in self.interval_timers and not self.interval_timers[title].isActive():
+                self.interval_timers[title].start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.materialized:
+            self.resume_timers()
+        else:
+            QtCore.QTimer.singleShot(0, self.materialize)  # Let the window paint first, then build the plots
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.pause_timers()
+
+    # Initialize (or reset) the data buffers of a plot
+    # Every plot keeps the absolute timestamps (seconds since epoch) and values of its newest buffer_size points, CSV plots also keep the byte offset
+    # in the log they have read up to (so each update only reads the rows appended since) and whether the buffer holds every row of the log
+    # CSV plots keep up to keep_size points (the largest buffer size used so far, or the length of the cached buffer) and show the newest buffer_size of them,
+    # so lowering the buffer size and raising it again does not read the log again
+    # use_cache=True starts a CSV plot from the buffer a previous run of the GUI saved for it, if there is one for the same log and datatype
+    # and the log still starts with the same row (otherwise the saved offset belongs to a log file that was deleted, started again or archived since)
+    def init_buffers(self, title, buffer_size, use_cache=False):
+        import numpy as np
+
+        self.data[title] = {"t": np.array([]), "y": np.array([]), "buffer_size": buffer_size}
+        if title in self.csv_filepath and self.init_block_column(title, use_cache):
+            return  # Plots of a wide log share one buffer per log, it is kept in the buffer cache as one entry for all of them
+        if title in self.csv_filepath:
+            from .get_data_for_GUI import get_log_identity
+
+            self.data[title].update({"offset": 0, "has_all_rows": False, "keep_size": buffer_size, "log_id": None})
+            cached = self.cached_buffer_source(title) if use_cache and self.cached_buffer_source is not None else None
+            if (cached is not None and cached['csv_filepath'] == self.csv_filepath[title] and cached['datatype'] == self.datatype[title]
+                    and cached.get('log_id') is not None and cached['log_id'] == get_log_identity(self.csv_filepath[title])):
+                # The whole cached buffer is kept even if the GUI starts with a smaller buffer size, choosing the larger size again shows it without reading the log
+                self.data[title].update({"t": cached['t'], "y": cached['y'], "offset": cached['offset'], "has_all_rows": cached['has_all_rows'],
+                                         "keep_size": max(buffer_size, len(cached['t'])), "log_id": cached['log_id']})
+
+    # If the plot shows one column of a wide log (e.g., datatype 'vmm_temperature:5'), connects it to the tab's shared buffer of that log and returns True
+    # Raises a ValueError if the log does not have that column (e.g., 'vmm_temperature:32' for a log of 32 VMMs)
+    def init_block_column(self, title, use_cache=False):
+        from .get_data_for_GUI import parse_block_datatype
+        from .shared_block_buffer_class import SharedBlockBuffer
+
+        block_datatype = parse_block_datatype(self.datatype[title])
+        if block_datatype is None:
+            return False
+        name, column = block_datatype
+        key = (self.csv_filepath[title], name)
+        if key not in self.block_buffers:
+            self.block_buffers[key] = SharedBlockBuffer(self.csv_filepath[title], name)
+            cached = self.cached_buffer_source(f'{key[0]}:{name}') if use_cache and self.cached_buffer_source is not None else None
+            if cached is not None:
+                self.block_buffers[key].restore(cached)
+        num_columns = self.block_buffers[key].num_columns
+        if column >= num_columns:
+            raise ValueError(f"Unsupported datatype for plot '{title}': {self.datatype[title]}. {self.csv_filepath[title]} has {num_columns} columns, use '{name}:0' to '{name}:{num_columns - 1}'.")
+        self.block_columns[title] = (self.block_buffers[key], column)
+        return True
+
+    # Returns the buffers of every CSV plot that has been built, in the format of core_tools/gui/plot_buffer_cache_functions.py
+    # The shared buffer of a wide log is one entry for all its plots, under '<CSV filepath>:<name>' instead of a plot title
+    def get_csv_plot_buffers(self):
+        buffers = {}
+        for title in self.csv_filepath:
+            if "offset" in self.data[title]:
+                buffers[title] = {'t': self.data[title]["t"], 'y': self.data[title]["y"], 'offset': self.data[title]["offset"], 'has_all_rows': self.data[title]["has_all_rows"], 'log_id': self.data[title]["log_id"],
+                                  'csv_filepath': self.csv_filepath[title], 'datatype': self.datatype[title]}
+        for (csv_filepath, name), shared in self.block_buffers.items():
+            if shared.end > shared.start:
+                buffers[f'{csv_filepath}:{name}'] = shared.get_cache_entry()
+        return buffers
+
+    # Add a new plot that gets its samples pushed from a SampleStreamServer (e.g., log_pressure.py started with a stream address) instead of reading a CSV
+    # stream_address is the TCP port or Unix socket path the logger serves on, channel is the name of the channel to plot (e.g., 'outer_vessel_pressure', 'flowrate')
+    def add_stream_plot(self, title, x_axis, y_axis, buffer_size, stream_address, channel):
+        # One connection per address is shared by every plot in the tab that subscribes to it
+        if stream_address not in self.stream_clients:
+            self.stream_clients[stream_address] = SampleStreamClient(stream_address)
+        self.stream_channels[title] = (self.stream_clients[stream_address], channel)
+
+        self.plot_layout[title] = {'title': title, 'kind': 'stream', 'x_axis': x_axis, 'y_axis': y_axis, 'buffer_size': buffer_size, 'stream_address': stream_address, 'channel': channel}
+        self.create_plot_container(title, x_axis, y_axis, buffer_size)
+
+    # Update function: reads the rows appended to the CSV since the last update and updates the plot
     def update(self, title):
-        x_data, y_data, buffer_size = self.data[title]["x"], self.data[title]["y"], self.data[title]["buffer_size"]
-        csv_filepath = self.csv_filepath[title]
-        datatype = self.datatype[title]
-        x_data, y_data = get_n_XY_datapoints(csv_filepath, buffer_size, datatype)
-        self.curves[title].setData(x=x_data, y=y_data)
+        if title in self.stream_channels:
+            self.update_stream_plot(title)
+            return
+        if title in self.block_columns:
+            self.update_block_plot(title)
+            return
+
+        import numpy as np
+        from .get_data_for_GUI import read_new_rows, get_timestamps, decode_datatype, get_log_identity
+
+        data = self.data[title]
+        buffer_size = data["buffer_size"]
+        data["keep_size"] = keep_size = max(data["keep_size"], buffer_size)
+        offset = data["offset"]
+        if len(data["t"]) < buffer_size and not data["has_all_rows"]:
+            offset = 0  # Buffer size was raised past the points kept (or first update), read the last keep_size rows again from the end of the log
+
+        dataframe, data["offset"], reset = read_new_rows(self.csv_filepath[title], offset, max_rows=keep_size)
+        if reset:
+            data["t"], data["y"] = np.array([]), np.array([])
+            data["has_all_rows"] = len(dataframe) < keep_size
+        if reset or data["log_id"] is None:
+            data["log_id"] = get_log_identity(self.csv_filepath[title])  # Saved with the offset in the buffer cache
+        if len(dataframe) > 0:
+            data["t"] = np.concatenate((data["t"], get_timestamps(dataframe)))
+            data["y"] = np.concatenate((data["y"], decode_datatype(dataframe, self.datatype[title]).to_numpy(dtype=float)))
+        if len(data["t"]) > keep_size:
+            # Keep only the newest keep_size points
+            data["t"], data["y"] = data["t"][-keep_size:], data["y"][-keep_size:]
+            data["has_all_rows"] = False
+
+        # Plot the newest buffer_size points vs seconds ago (negative numbers)
+        self.curves[title].setData(x=data["t"][-buffer_size:] - time.time(), y=data["y"][-buffer_size:])
+
+    # Update function for plots of one column of a wide log: the log is read and decoded once for all its plots (see SharedBlockBuffer), this plot gets a view of its column
+    def update_block_plot(self, title):
+        shared, column = self.block_columns[title]
+        times, values = shared.get(title, column, self.data[title]["buffer_size"])
+        self.data[title]["t"], self.data[title]["y"] = times, values
+
+        # Plot vs seconds ago (negative numbers), same as the other plots
+        self.curves[title].setData(x=times - time.time(), y=values)
+
+    # Update function for stream plots: appends the samples pushed since the last update and redraws, no file I/O
+    def update_stream_plot(self, title):
+        import numpy as np
+
+        client, channel = self.stream_channels[title]
+        new_times, new_values = client.get_new_samples(channel)
+        buffer_size = self.data[title]["buffer_size"]
+
+        # Keep only the newest buffer_size samples
+        times = np.concatenate((self.data[title]["t"], new_times))[-buffer_size:]
+        values = np.concatenate((self.data[title]["y"], new_values))[-buffer_size:]
+        self.data[title]["t"] = times
+        self.data[title]["y"] = values
+
+        # Plot vs seconds ago (negative numbers), same as the CSV plots
+        self.curves[title].setData(x=times - time.time(), y=values)
 
     # Return elapsed time in seconds since the plot started
     def get_elapsed_time(self, title):
         return self.elapsed_timers[title].elapsed() / 1000.0 #convert ms to seconds
 
     # Starts the QTimer that drives the updates for a given plot
+    # If the tab has not been shown yet, the timer is created (and started) the first time it is
     def start_timer(self, title, interval_ms):
-        # Create a timer to update the plot regularly
-        timer = QtCore.QTimer()
-        timer.timeout.connect(lambda: self.update(title))
-        timer.start(interval_ms)
-        self.interval_timers[title] = timer
+        # Mark the plot as running
+        self.running_state[title] = True
+        self.defer(lambda: self.create_timer(title, interval_ms, lambda: self.update(title)))
+
+    # Creates the interval timer calling update_func and the elapsed timer of a plot
+    # Plots of a dense tab share the tab's refresh timer instead of getting their own
+    def create_timer(self, title, interval_ms, update_func):
+        if title in self.dense_plot_items:
+            self.add_to_dense_refresh(title, interval_ms, update_func)
+        else:
+            # Create a timer to update the plot regularly
+            timer = QtCore.QTimer(self)  # Parented to the tab so it lives exactly as long as the tab does
+            timer.timeout.connect(update_func)
+            timer.setInterval(interval_ms)
+            if self.running_state[title] and self.isVisible():
+                timer.start()
+            self.interval_timers[title] = timer
 
         # Start a timer to track elapsed time
         elapsed = QtCore.QElapsedTimer()
         elapsed.start()
         self.elapsed_timers[title] = elapsed
 
-        # Mark the plot as running
-        self.running_state[title] = True
-
     # Toggle between start and stop for a given plot
     def toggle_plot(self, title):
+        if title in self.dense_plot_items:
+            # Dense plots have no button or timer of their own, the shared refresh timer skips the ones that are stopped
+            self.running_state[title] = not self.running_state[title]
+            if self.running_state[title]:
+                self.init_buffers(title, self.data[title]["buffer_size"])
+                self.elapsed_timers[title].restart()
+            return
+
         if self.running_state[title]:
             # Stop the timer and update the button text
             self.interval_timers[title].stop()
@@ -180,70 +611,87 @@ class LiveTab(QtWidgets.QWidget):
         else:
             # Reset data and timer, restart updates
             buffer_size = self.data[title]["buffer_size"]
-            self.data[title] = {"x": pd.Series(np.full(buffer_size, np.nan), name='x'), "y": pd.Series(np.full(buffer_size, np.nan), name='y'), "buffer_size": buffer_size}
+            self.init_buffers(title, buffer_size)
             self.elapsed_timers[title].restart()
             self.interval_timers[title].start()
             self.start_stop_buttons[title].setText(f"Stop {title}")
             self.start_stop_buttons[title].setStyleSheet("background-color: red;")
             self.running_state[title] = True
 
-    #Run a terminal command using subprocess
+    #Run a terminal command as a QProcess, the GUI is told when it exits (finished signal) and its output is streamed into the command's output pane
     def run_terminal_command(self, title, command):
-        system = platform.system()
-
-        if system == 'Windows':
-            #Use shlex.split to safely split the command respecting shell syntax
-            cmd_parts = shlex.split(command, posix=False)  # Use posix=False for Windows compatibility
-            process = subprocess.Popen(cmd_parts, shell=True) #Use shell=True for Windows to handle commands correctly
+        #Use shlex.split to safely split the command respecting shell syntax
+        if platform.system() == 'Windows':
+            cmd_parts = [part.strip('"') for part in shlex.split(command, posix=False)]  # Use posix=False for Windows compatibility (keeps backslashes in paths)
         else:
             cmd_parts = shlex.split(command)
-            process = subprocess.Popen(cmd_parts)
-        
+
+        process = QtCore.QProcess(self)
+        process.setProcessChannelMode(QtCore.QProcess.MergedChannels)  # stdout and stderr in one stream, in the order they were written
+
+        # Python buffers the loggers' output when it is not a console, unbuffered output shows up in the pane as soon as it is printed
+        environment = QtCore.QProcessEnvironment.systemEnvironment()
+        environment.insert('PYTHONUNBUFFERED', '1')
+        process.setProcessEnvironment(environment)
+
+        process.readyReadStandardOutput.connect(lambda t=title, p=process: self.append_command_output(t, p))
+        process.finished.connect(lambda exit_code, exit_status, t=title, p=process: self.command_finished(t, p, exit_code, exit_status))
+        process.errorOccurred.connect(lambda error, t=title, p=process: self.command_error(t, p, error))
+
         self.cmd_processes[title] = process
-    
-    #Terminate a running terminal command
+        self.cmd_start_times[title] = time.monotonic()
+        self.cmd_partial_output[title] = ''
+        self.cmd_output_panes[title].appendPlainText(f'--- {time.strftime("%Y-%m-%d %H:%M:%S")} Started: {command} ---')
+        process.start(cmd_parts[0], cmd_parts[1:])
+
+    #Terminate a running terminal command (the process itself, no shell in between, so no process tree to kill)
     def stop_terminal_command(self, title):
-        process = self.cmd_processes[title]
+        # Cancel a pending automatic restart
+        if title in self.cmd_restart_timers:
+            self.cmd_restart_timers.pop(title).stop()
+
+        process = self.cmd_processes.get(title)
+        if process is not None and process.state() != QtCore.QProcess.NotRunning:
+            process.kill()
 
-        #Check if the process is still running and terminate it
-        if process and process.poll() is None:
-            system = platform.system()
-            if system == 'Windows':
-                subprocess.run(['taskkill', '/PID', str(process.pid), '/T', '/F'], check=True)
-            else:
-                process.kill()
-    
     #Handle button click for starting/stopping terminal commands
     def cmd_button_clicked(self, title):
         command = self.cmd_command_strings[title] #this method allows us to dynamically change the command if necessary
         if self.cmd_running_state[title]:
-            # If the command is running, stop it
-            self.stop_terminal_command(title)
-
-            cmd_button = self.cmd_buttons[title]
-            cmd_button.setText(f'Start {title}')
-            cmd_button.setStyleSheet("background-color: green;")
-
+            # If the command is running (or waiting to be restarted), stop it
+            # The state is changed first so command_finished knows the exit was asked for and does not restart it
             self.cmd_running_state[title] = False
+            self.stop_terminal_command(title)
+            self.set_cmd_button_state(title, False)
         else:
             # If the command is not running, start it
+            self.cmd_running_state[title] = True
+            self.cmd_restart_counts[title] = 0
             self.run_terminal_command(title, command)
+            self.set_cmd_button_state(title, True)
 
-            cmd_button = self.cmd_buttons[title]
+    # Shows the Start (green) or Stop (red) state on a command button
+    def set_cmd_button_state(self, title, running):
+        cmd_button = self.cmd_buttons[title]
+        if running:
             cmd_button.setText(f'Stop {title}')
             cmd_button.setStyleSheet("background-color: red;")
+        else:
+            cmd_button.setText(f'Start {title}')
+            cmd_button.setStyleSheet("background-color: green;")
 
-            self.cmd_running_state[title] = True
-        
-    # Add a button that runs a terminal command on click
-    def add_command_button(self, title, command):
+    # Add a button that runs a terminal command on click, with a pane below it showing the command's output
+    # max_output_lines bounds the pane, the oldest lines are dropped first
+    # auto_restart=True restarts the command if it crashes or exits with an error while it is supposed to be running (e.g., a logger losing its serial port),
+    # waiting 1 s before the first restart and twice as long before each of the following ones (up to 1 minute)
+    def add_command_button(self, title, command, auto_restart=False, max_output_lines=500):
         index = self.plot_counts
         plots_per_row = self.plots_per_row
         self.plot_counts += 1
         row = index // plots_per_row
         col = index % plots_per_row
 
-        # Vertical layout to hold the plot and button
+        # Vertical layout to hold the button and output pane
         container = QtWidgets.QVBoxLayout()
 
         # Create button
@@ -253,8 +701,17 @@ class LiveTab(QtWidgets.QWidget):
         cmd_button.clicked.connect(lambda _, t=title: self.cmd_button_clicked(t))
         self.cmd_buttons[title] = cmd_button
 
-        # Add button to vertical container
+        # Output pane, appending a line is cheap and the pane never grows past max_output_lines
+        output_pane = QtWidgets.QPlainTextEdit()
+        output_pane.setReadOnly(True)
+        output_pane.setMaximumBlockCount(max_output_lines)
+        output_pane.setStyleSheet("font-family: monospace;")
+        output_pane.setFixedHeight(120)
+        self.cmd_output_panes[title] = output_pane
+
+        # Add button and pane to vertical container
         container.addWidget(cmd_button)
+        container.addWidget(output_pane)
 
         # Wrap the layout in a QWidget and add it to the grid
         container_widget = QtWidgets.QWidget()
@@ -263,25 +720,73 @@ class LiveTab(QtWidgets.QWidget):
 
         # Mark the command as not running
         self.cmd_running_state[title] = False
-    
-    # Check the status of all command processes and update button states
-    def check_command_status(self):
-        for title in self.cmd_processes:
-            process = self.cmd_processes[title]
-            if process.poll() is not None:
-                # Process has finished, update button state
-                cmd_button = self.cmd_buttons[title]
-                cmd_button.setText(f'Start {title}')
-                cmd_button.setStyleSheet("background-color: green;")
-                self.cmd_running_state[title] = False
-    
+        self.cmd_auto_restart[title] = auto_restart
+        self.cmd_restart_counts[title] = 0
+
+    # Called whenever a command has new output, only complete lines are added to the pane
+    def append_command_output(self, title, process):
+        text = self.cmd_partial_output[title] + bytes(process.readAllStandardOutput()).decode('utf-8', errors='replace')
+        lines = text.replace('\r\n', '\n').split('\n')
+        self.cmd_partial_output[title] = lines.pop()  # Rest of a line that has not been fully written yet
+        if lines:
+            self.cmd_output_panes[title].appendPlainText('\n'.join(lines))
+
+    # Called when a command's process exits, whether it finished, crashed or was stopped
+    def command_finished(self, title, process, exit_code, exit_status):
+        if process is not self.cmd_processes.get(title):
+            return  # An older process of this command, already replaced
+
+        if self.cmd_partial_output[title]:
+            self.cmd_output_panes[title].appendPlainText(self.cmd_partial_output[title])
+            self.cmd_partial_output[title] = ''
+
+        crashed = exit_status == QtCore.QProcess.CrashExit or exit_code != 0
+        if not self.cmd_running_state[title]:
+            self.cmd_output_panes[title].appendPlainText(f'--- {time.strftime("%Y-%m-%d %H:%M:%S")} Stopped ---')
+        elif crashed and self.cmd_auto_restart[title]:
+            self.cmd_output_panes[title].appendPlainText(f'--- {time.strftime("%Y-%m-%d %H:%M:%S")} Exited with code {exit_code} ---')
+            self.schedule_command_restart(title)
+        else:
+            # Finished on its own (e.g., logging duration is over) or crashed without auto restart
+            self.cmd_output_panes[title].appendPlainText(f'--- {time.strftime("%Y-%m-%d %H:%M:%S")} Exited with code {exit_code} ---')
+            self.cmd_running_state[title] = False
+            self.set_cmd_button_state(title, False)
+
+    # Deprecated, does nothing: buttons used to be reverted by a timer polling the commands, the QProcess finished signal now does it as soon as a command exits (see command_finished)
+    # Kept so launch scripts that still call it keep working
     def cmd_timer(self, interval_ms):
-        # Create a timer to check command status on a regular interval
-        timer = QtCore.QTimer()
-        timer.timeout.connect(lambda: self.check_command_status())
-        timer.start(interval_ms)
-        self.interval_timers['cmd_timer'] = timer #Store primarily to prevent garbage collection
-    
+        pass
+
+    # Called when a command could not be started (e.g., wrong path to python.exe), no finished signal comes in that case
+    def command_error(self, title, process, error):
+        if error != QtCore.QProcess.FailedToStart or process is not self.cmd_processes.get(title):
+            return
+        self.cmd_output_panes[title].appendPlainText(f'--- {time.strftime("%Y-%m-%d %H:%M:%S")} Failed to start: {process.errorString()} ---')
+        if self.cmd_running_state[title] and self.cmd_auto_restart[title]:
+            self.schedule_command_restart(title)
+        else:
+            self.cmd_running_state[title] = False
+            self.set_cmd_button_state(title, False)
+
+    # Restarts a crashed command after a delay that doubles with every restart in a row, a command that ran for over a minute starts again from 1 s
+    def schedule_command_restart(self, title):
+        if time.monotonic() - self.cmd_start_times[title] > 60:
+            self.cmd_restart_counts[title] = 0
+        delay_sec = min(2 ** self.cmd_restart_counts[title], 60)
+        self.cmd_restart_counts[title] += 1
+        self.cmd_output_panes[title].appendPlainText(f'--- Restarting in {delay_sec} s ---')
+
+        timer = QtCore.QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda t=title: self.restart_command(t))
+        timer.start(delay_sec * 1000)
+        self.cmd_restart_timers[title] = timer
+
+    def restart_command(self, title):
+        self.cmd_restart_timers.pop(title, None)
+        if self.cmd_running_state[title]:
+            self.run_terminal_command(title, self.cmd_command_strings[title])
+
     #Add a dropdown menu with specified options and values attached to the options
     def add_dropdown_menu(self, title, option_names, option_values, ctrl_var=None, on_change_callback=None):
         index = self.plot_counts
@@ -324,17 +829,90 @@ class LiveTab(QtWidgets.QWidget):
         container_widget.setMaximumWidth(500) #prevent stretching (aesthetics)
         self.layout.addWidget(container_widget, row, col)
 
+    # Add a text readout of the pressure rise (leak) rate of a pressure plot, fitted over several sliding time windows
+    # plot_title is the title of a pressure plot already added to this tab (CSV or stream plot), windows_sec are the lengths of the fit windows in seconds
+    def add_leak_rate_readout(self, title, plot_title, windows_sec=(600, 3600, 6*3600), interval_ms=1000):
+        index = self.plot_counts
+        plots_per_row = self.plots_per_row
+        self.plot_counts += 1
+        row = index // plots_per_row
+        col = index % plots_per_row
+
+        # Vertical layout to hold the label and readout
+        container = QtWidgets.QVBoxLayout()
+
+        # Label
+        label = QtWidgets.QLabel(title)
+        container.addWidget(label)
+
+        # Readout, one line per window
+        readout = QtWidgets.QLabel('Waiting for data')
+        readout.setStyleSheet("font-family: monospace;")
+        container.addWidget(readout)
+        self.leak_rate_labels[title] = readout
+
+        estimator = LeakRateEstimator(windows_sec)
+        self.leak_rate_estimators[title] = (estimator, plot_title)
+
+        # Stream plots feed every sample to the estimator as soon as it arrives, CSV plots are read on the readout's timer
+        if plot_title in self.stream_channels:
+            client, channel = self.stream_channels[plot_title]
+            client.add_callback(channel, lambda ch, t, value: estimator.add_sample(t, value))
+
+        # Wrap the layout in a QWidget and add it to the grid
+        container_widget = QtWidgets.QWidget()
+        container_widget.setLayout(container)
+        container_widget.setMaximumWidth(500) #prevent stretching (aesthetics)
+        self.layout.addWidget(container_widget, row, col)
+
+        # Mark the readout as running, its timer is created when the tab is first shown
+        self.running_state[title] = True
+        self.defer(lambda: self.create_timer(title, interval_ms, lambda: self.update_leak_rate_readout(title)))
+
+    # Feeds the new samples of the followed pressure plot to the estimator and updates the readout text
+    def update_leak_rate_readout(self, title):
+        estimator, plot_title = self.leak_rate_estimators[title]
+
+        if plot_title not in self.stream_channels:
+            from .get_data_for_GUI import read_rows_since, read_new_rows, get_timestamps, decode_datatype
+
+            csv_filepath = self.csv_filepath[plot_title]
+            if title not in self.leak_rate_offsets:
+                # First update: fill the longest window with what is already in the log, reading back from the end of the log only as far as the window goes
+                # Done once even if the log has no rows in the window yet (estimator.last_time stays None until the first row arrives)
+                start_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time() - max(estimator.windows_sec)))
+                dataframe, self.leak_rate_offsets[title] = read_rows_since(csv_filepath, start_time)
+            else:
+                # Afterwards only the rows appended since the last update are read, rows already added (e.g., after the log was recreated) are skipped by the estimator
+                dataframe, self.leak_rate_offsets[title], reset = read_new_rows(csv_filepath, self.leak_rate_offsets[title], max_rows=1000)
+
+            if len(dataframe) > 0:
+                times = get_timestamps(dataframe)
+                values = decode_datatype(dataframe, self.datatype[plot_title]).to_numpy(dtype=float)
+                for t, value in zip(times, values):
+                    estimator.add_sample(t, value)
+
+        lines = []
+        for window_sec, result in estimator.results():
+            # Show rates per hour, more readable than per second for leak checks
+            lines.append(f"{format_window(window_sec):>4}: {result['slope']*3600:+.3e} +/- {result['slope_err']*3600:.1e} Torr/hr (n={result['n']})")
+        self.leak_rate_labels[title].setText('\n'.join(lines))
+
     #Changes the command string associated with a specified command button based on the title of the button
     def change_cmd_button_command(self, title, new_command):
         self.cmd_command_strings[title] = new_command
     
     #Specialized function specifically for the 40L TPC log pressure and/or log/change gas flowrate command, will likely not be useful for a general user of this program
     #People using this program for a different use case will need to edit this function and/or write a new one to do the editing they need to the command string
+    #ctrl_title can also be a (title, argument index) tuple if the value to change is not the last argument of the command (e.g., a stream address is given after it)
     def change_pressure_or_flowrate_cmd(self, title, ctrl_title, dropdown_text, new_option_value):
+        arg_index = -1
+        if isinstance(ctrl_title, tuple):
+            ctrl_title, arg_index = ctrl_title
         old_command = self.cmd_command_strings[ctrl_title]
 
         parts = old_command.split()
-        parts[-1] = str(new_option_value)
+        parts[arg_index] = str(new_option_value)
 
         new_command = ' '.join(parts)
 
@@ -342,46 +920,17 @@ class LiveTab(QtWidgets.QWidget):
 
         self.change_cmd_button_command(ctrl_title, new_command)
     
+    #Change several command strings at once with change_pressure_or_flowrate_cmd, intended to be attached to a dropdown menu
+    #ctrl_titles is a list of titles (or (title, argument index) tuples) of the command buttons to change
+    def change_cmd_multiple(self, title, ctrl_titles, dropdown_text, new_option_value):
+        for ctrl_title in ctrl_titles:
+            self.change_pressure_or_flowrate_cmd(title, ctrl_title, dropdown_text, new_option_value)
+
     #Adds a plot that is the subtraction of 2 plots, plot1 and plot2
     #The specification for what plot1 and plot2 are to be subtracted is actually in start_subtraction_plot_timer
     def add_subtraction_plot(self, title, x_axis, y_axis, buffer_size): #x_axis and y_axis are tuples of (label, unit), and buffer_size is the number of data points to display at once
-        index = self.plot_counts
-        plots_per_row = self.plots_per_row
-        self.plot_counts += 1
-        row = index // plots_per_row
-        col = index % plots_per_row
-
-        # Vertical layout to hold the plot and button
-        container = QtWidgets.QVBoxLayout()
-
-        # Create the plot widget
-        plot_widget = pg.PlotWidget(title=title)
-        plot_widget.setLabel('bottom', x_axis[0], units=x_axis[1])
-        plot_widget.setLabel('left', y_axis[0], units=y_axis[1])
-        plot_widget.showGrid(x=True, y=True)
-
-        # Initialize circular buffers for x and y data
-        self.data[title] = {"x": pd.Series(np.full(buffer_size, np.nan), name='x'), "y": pd.Series(np.full(buffer_size, np.nan), name='y'), "buffer_size": buffer_size}
-
-        # Create the plot curve
-        curve = plot_widget.plot(pen='y')  # yellow line
-        self.curves[title] = curve
-
-        # Create the start/stop button
-        start_stop_button = QtWidgets.QPushButton(f"Stop {title}")
-        start_stop_button.setStyleSheet("background-color: red;")
-        start_stop_button.clicked.connect(lambda _, t=title: self.toggle_plot(t))
-        self.start_stop_buttons[title] = start_stop_button
-
-        # Add plot and button to vertical container
-        container.addWidget(plot_widget)
-        container.addWidget(start_stop_button)
-
-        # Wrap the layout in a QWidget and add it to the grid
-        container_widget = QtWidgets.QWidget()
-        container_widget.setLayout(container)
-        container_widget.setMinimumSize(40*16, 40*9)
-        self.layout.addWidget(container_widget, row, col)
+        self.plot_layout[title] = {'title': title, 'kind': 'subtraction', 'x_axis': x_axis, 'y_axis': y_axis, 'buffer_size': buffer_size, 'plot1_title': None, 'plot2_title': None}
+        self.create_plot_container(title, x_axis, y_axis, buffer_size)
     
     # Update subtraction plot function: fetches the curves to be subtracted, subtracts them, then updates the curve object
     def update_subtraction_plot(self, title, plot1_title, plot2_title):
@@ -399,19 +948,12 @@ class LiveTab(QtWidgets.QWidget):
     # Starts the QTimer that drives the updates for a subtracton plot
     #This is where plot1 and plot2 are specified so add_subtraction_plot can run
     def start_subtraction_plot_timer(self, title, plot1_title, plot2_title, interval_ms):
-        # Create a timer to update the plot regularly
-        timer = QtCore.QTimer()
-        timer.timeout.connect(lambda: self.update_subtraction_plot(title, plot1_title, plot2_title))
-        timer.start(interval_ms)
-        self.interval_timers[title] = timer
-
-        # Start a timer to track elapsed time
-        elapsed = QtCore.QElapsedTimer()
-        elapsed.start()
-        self.elapsed_timers[title] = elapsed
+        self.plot_layout[title]['plot1_title'] = plot1_title
+        self.plot_layout[title]['plot2_title'] = plot2_title
 
         # Mark the plot as running
         self.running_state[title] = True
+        self.defer(lambda: self.create_timer(title, interval_ms, lambda: self.update_subtraction_plot(title, plot1_title, plot2_title)))
     
     #Change the buffer size of a specified plot, intended to be attached to a dropdown menu
     def change_buffer_size(self, title, ctrl_title, dropdown_text, new_option_value):
@@ -426,10 +968,15 @@ class LiveTab(QtWidgets.QWidget):
     # End all running subprocesses
     def cleanup(self):
         for title in self.cmd_processes:
+            self.cmd_running_state[title] = False  # So they are not restarted
             process = self.cmd_processes[title]
-            if process.poll() is None:
+            if process.state() != QtCore.QProcess.NotRunning:
                 self.stop_terminal_command(title)
-        
+                process.waitForFinished(1000)
+
+        for stream_address in self.stream_clients:
+            self.stream_clients[stream_address].close()
+
 
 # Example usage
 if __name__ == '__main__':
@@ -447,7 +994,6 @@ if __name__ == '__main__':
 
     pressure_tab.add_command_button(title='Log Vessel Pressure', command=f'.venv\Scripts\python.exe 40L_run_control/log_pressure.py {pressure_log_filepath} COM4 2')
     pressure_tab.add_command_button(title='test', command=f'timeout /T 10')
-    pressure_tab.cmd_timer(500)
 
     temp_tab.add_plot(title='Plot VMM 1 Temperature', x_axis=('Time since present', 's'), y_axis=('Temperature', 'deg C'), buffer_size=100, csv_filepath=pressure_log_filepath, datatype='pressure')
     temp_tab.start_timer(title='Plot VMM 1 Temperature', interval_ms=1000)
@@ -459,6 +1005,5 @@ if __name__ == '__main__':
     temp_tab.start_timer(title='Plot VMM 3 Temperature', interval_ms=1000)
 
     temp_tab.add_command_button(title='test', command=f'timeout /T 10')
-    temp_tab.cmd_timer(500)
 
     plotter.run()
\ No newline at end of file
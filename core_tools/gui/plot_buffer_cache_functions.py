@@ -0,0 +1,49 @@
+import json
+import os
+import zipfile
+import numpy as np
+
+'''Functions to save the GUI's plot buffers to a cache file and load them back, so a restarted GUI shows the history it had right away'''
+
+# Each entry is the buffer of one CSV plot (or the shared buffer of every plot of a wide log, see SharedBlockBuffer): {'t': absolute timestamps, 'y': decoded values (2-D for a wide log), 'offset': byte offset in the log the buffer was read up to,
+# 'has_all_rows': True if the buffer holds every row of the log, 'log_id': first row of the log file the offset is in (see get_log_identity), 'csv_filepath', 'datatype'}
+# The arrays of all the plots go into one .npz file (keys '<i>_t' and '<i>_y'), the rest of each entry goes into a JSON string stored next to them
+# The file is written to a temporary file first and then renamed, so a GUI closed mid-save never leaves a half written cache behind
+
+# Saves a dict of key -> entry (key is '<tab name>/<plot title>', see LivePlotter.save_buffer_cache) to filepath
+def save_plot_buffers(filepath, entries):
+    arrays = {}
+    metadata = []
+    for i, (key, entry) in enumerate(entries.items()):
+        arrays[f'{i}_t'] = np.asarray(entry['t'], dtype=float)
+        arrays[f'{i}_y'] = np.asarray(entry['y'], dtype=float)
+        metadata.append({'key': key, 'offset': int(entry['offset']), 'has_all_rows': bool(entry['has_all_rows']), 'log_id': entry['log_id'], 'csv_filepath': entry['csv_filepath'], 'datatype': entry['datatype']})
+    arrays['metadata'] = np.array(json.dumps(metadata))
+
+    temp_filepath = filepath + '.tmp'
+    with open(temp_filepath, 'wb') as file:  # Passing a file keeps numpy from adding its own .npz extension
+        np.savez_compressed(file, **arrays)
+    os.replace(temp_filepath, filepath)
+
+# Loads the entries saved by save_plot_buffers, returns an empty dict if there is no cache (or it cannot be read, the plots then start empty as usual)
+def load_plot_buffers(filepath):
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        with np.load(filepath, allow_pickle=False) as cache:
+            entries = {}
+            for i, entry in enumerate(json.loads(str(cache['metadata']))):
+                key = entry.pop('key')
+                entry['t'] = cache[f'{i}_t']
+                entry['y'] = cache[f'{i}_y']
+                entries[key] = entry
+            return entries
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+        print(f'Could not read plot buffer cache {filepath}, starting with empty plots: {error}')
+        return {}
+
+# Example usage
+if __name__ == '__main__':
+    save_plot_buffers('plot_buffer_cache.npz', {'Pressure/Plot Outer Vessel Pressure': {'t': [1.7e9, 1.7e9 + 2], 'y': [760.0, 759.9], 'offset': 1234, 'has_all_rows': True, 'log_id': '2025-12-17 15:12:40,7.60E+02',
+                                                                                       'csv_filepath': '40L_run_control/outer_vessel_pressure_log.csv', 'datatype': 'outer_vessel_pressure'}})
+    print(load_plot_buffers('plot_buffer_cache.npz'))
@@ -0,0 +1,112 @@
+import numpy as np
+from .get_data_for_GUI import read_new_rows, get_timestamps, get_log_identity, count_block_columns, BLOCK_DECODERS
+
+'''Class to read a wide log (e.g., every VMM temperature in one row) once per update for all the plots showing one of its columns'''
+
+# Holds the newest rows of a wide log decoded into one 2-D array, stored one row per column of the log (all the samples of a VMM are next to each other in memory)
+# so each plot gets its column as a view of the shared array, without copying
+# Every plot of the log asks for its column with get(), the log is only read again (the rows appended since the last read, see read_new_rows)
+# when a plot asks a second time, i.e. once per round of updates no matter how many plots there are or how their timers are set up
+# Rows are appended into spare room at the end of the array, when it runs out the newest rows are copied to the start of a new array (one copy every buffer_size rows, not every update)
+# Rows already handed out are never written over, so a curve still showing an older view (e.g., a stopped plot) keeps showing the right data
+class SharedBlockBuffer:
+    def __init__(self, csv_filepath, block_datatype):
+        self.csv_filepath = csv_filepath
+        self.block_datatype = block_datatype
+        self.decode_block = BLOCK_DECODERS[block_datatype][0]
+        self.num_columns = count_block_columns(csv_filepath, block_datatype)  # From the header of the log, plots ask for columns 0 to num_columns - 1
+        self.buffer_sizes = {}                    # title -> buffer size of each plot, the buffer keeps enough rows for the largest
+        self.seen_version = {}                    # title -> version of the data the plot got last
+        self.version = 0                          # Incremented every time the log is read
+        self.keep_size = 0                        # Rows kept, the largest buffer size asked for so far (or the number of rows restored from the buffer cache)
+        self.reset()
+
+    # Drops every row, the next read starts from the end of the log again
+    def reset(self):
+        self.times = np.array([])
+        self.block = None                         # 2-D array (columns of the log, capacity), filled from start to end
+        self.start = 0
+        self.end = 0
+        self.offset = 0                           # Byte offset in the log read up to
+        self.has_all_rows = False                 # True if the buffer holds every row of the log
+        self.log_id = None                        # First row of the log file the offset is in, see get_log_identity
+
+    # Returns (timestamps, values) of the newest buffer_size rows of a column for the plot title, both views of the shared arrays
+    def get(self, title, column, buffer_size):
+        self.buffer_sizes[title] = buffer_size
+        if self.version == 0 or self.seen_version.get(title) == self.version:
+            self.read()  # This plot already has the latest rows, so a new round of updates has started
+        self.seen_version[title] = self.version
+        if self.block is None:
+            return self.times[:0], self.times[:0]  # No rows logged yet
+        start = max(self.start, self.end - buffer_size)
+        return self.times[start:self.end], self.block[column, start:self.end]
+
+    # Reads the rows appended to the log since the last read and decodes them all at once
+    def read(self):
+        self.keep_size = buffer_size = max(max(self.buffer_sizes.values()), self.keep_size)
+        offset = self.offset
+        if self.end - self.start < buffer_size and not self.has_all_rows:
+            offset = 0  # Buffer size was raised (or first read), read the last buffer_size rows again from the end of the log
+
+        dataframe, self.offset, reset = read_new_rows(self.csv_filepath, offset, max_rows=buffer_size)
+        if reset:
+            new_offset = self.offset
+            self.reset()
+            self.offset = new_offset
+            self.has_all_rows = len(dataframe) < buffer_size
+        if reset or self.log_id is None:
+            self.log_id = get_log_identity(self.csv_filepath)
+        if len(dataframe) > 0:
+            self.append(get_timestamps(dataframe), self.decode_block(dataframe), buffer_size)
+        self.version += 1
+
+    def append(self, times, block, buffer_size):
+        num_rows = len(times)
+        if num_rows > buffer_size:
+            times, block, num_rows = times[-buffer_size:], block[-buffer_size:], buffer_size
+
+        same_columns = self.block is not None and len(self.block) == block.shape[1]
+        if not same_columns or self.end + num_rows > len(self.times) or len(self.times) < 2 * buffer_size:
+            # Out of room (or first rows, or the buffer size was raised): new arrays with room for buffer_size more rows, starting with the newest rows already held
+            kept = min(self.end - self.start, buffer_size - num_rows) if same_columns else 0
+            capacity = 2 * buffer_size
+            new_times = np.full(capacity, np.nan)
+            new_block = np.full((block.shape[1], capacity), np.nan)
+            if kept > 0:
+                new_times[:kept] = self.times[self.end - kept:self.end]
+                new_block[:, :kept] = self.block[:, self.end - kept:self.end]
+            self.times, self.block, self.start, self.end = new_times, new_block, 0, kept
+
+        self.times[self.end:self.end + num_rows] = times
+        self.block[:, self.end:self.end + num_rows] = block.T
+        self.end += num_rows
+        if self.end - self.start > buffer_size:
+            self.start = self.end - buffer_size
+            self.has_all_rows = False
+
+    # Returns the rows held in the format of core_tools/gui/plot_buffer_cache_functions.py, 'y' is 2-D (one row per column of the log)
+    def get_cache_entry(self):
+        block = self.block[:, self.start:self.end] if self.block is not None else np.empty((0, 0))
+        return {'t': self.times[self.start:self.end], 'y': block, 'offset': self.offset, 'has_all_rows': self.has_all_rows, 'log_id': self.log_id,
+                'csv_filepath': self.csv_filepath, 'datatype': self.block_datatype}
+
+    # Starts from an entry saved by get_cache_entry (by a previous run of the GUI), the next read only reads the rows logged since
+    # The entry is ignored if it is for another log or datatype, or if the log does not start with the same row anymore (deleted and started again, or archived)
+    def restore(self, entry):
+        if entry['csv_filepath'] != self.csv_filepath or entry['datatype'] != self.block_datatype or len(entry['t']) == 0:
+            return
+        if entry.get('log_id') is None or entry['log_id'] != get_log_identity(self.csv_filepath) or entry['y'].shape != (self.num_columns, len(entry['t'])):
+            return
+        self.times = np.array(entry['t'], dtype=float)
+        self.block = np.array(entry['y'], dtype=float)
+        self.start, self.end = 0, len(self.times)
+        self.offset, self.has_all_rows, self.log_id = entry['offset'], entry['has_all_rows'], entry['log_id']
+        self.keep_size = max(self.keep_size, len(self.times))
+
+# Example usage
+if __name__ == '__main__':
+    shared = SharedBlockBuffer('40L_run_control/temperature_log.csv', 'vmm_temperature')
+    for vmm in range(32):
+        times, values = shared.get(f'Plot VMM {vmm} Temperature', vmm, 100)
+    print(f'{len(times)} rows, read {shared.version} time(s) for 32 plots')
@@ -0,0 +1,250 @@
+import csv
+import math
+import os
+import threading
+import time
+from collections import deque
+
+'''Classes to check alarm/interlock rules on every new sample on the acquisition side and fire actions (e.g., close the gas flow) as soon as a rule trips'''
+
+# Every rule watches one channel (same names as the sample stream, e.g., 'outer_vessel_pressure' in Torr, 'flowrate' in L/min)
+# check(timestamp, value) returns a message while the rule's condition is met and None otherwise, the engine takes care of firing and latching
+# actions are functions called as func(rule, timestamp, value, message), see set_flow_setpoint_action
+# latch=True keeps a rule tripped (no more actions) until InterlockEngine.reset is called, latch=False re-arms it once the condition clears
+class ThresholdRule:
+    def __init__(self, name, channel, above=None, below=None, actions=(), latch=True):
+        self.name = name
+        self.channel = channel
+        self.above = above
+        self.below = below
+        self.actions = list(actions)
+        self.latch = latch
+        self.tripped = False
+
+    def check(self, timestamp, value):
+        if math.isnan(value):
+            return None  # Invalid readings are left to a StaleDataRule
+        if self.above is not None and value > self.above:
+            return f'{value:g} above {self.above:g}'
+        if self.below is not None and value < self.below:
+            return f'{value:g} below {self.below:g}'
+        return None
+
+# Trips when the value changed faster than max_rise_per_sec (or fell faster than max_fall_per_sec) over the last window_sec seconds
+# The rate is taken against the oldest sample still in the window, which smooths out single noisy readings
+# At most max_samples are kept, so the cost per sample is bounded even if samples arrive much faster than expected
+class RateOfChangeRule:
+    def __init__(self, name, channel, window_sec, max_rise_per_sec=None, max_fall_per_sec=None, actions=(), latch=True, max_samples=1000):
+        self.name = name
+        self.channel = channel
+        self.window_sec = window_sec
+        self.max_rise_per_sec = max_rise_per_sec
+        self.max_fall_per_sec = max_fall_per_sec
+        self.actions = list(actions)
+        self.latch = latch
+        self.tripped = False
+        self.samples = deque(maxlen=max_samples)  # (timestamp, value) of the valid samples inside the window
+
+    def check(self, timestamp, value):
+        if math.isnan(value):
+            return None
+        while self.samples and timestamp - self.samples[0][0] > self.window_sec:
+            self.samples.popleft()
+        self.samples.append((timestamp, value))
+
+        oldest_time, oldest_value = self.samples[0]
+        if timestamp <= oldest_time:
+            return None
+        rate = (value - oldest_value) / (timestamp - oldest_time)
+        if self.max_rise_per_sec is not None and rate > self.max_rise_per_sec:
+            return f'rising {rate:g}/s, limit {self.max_rise_per_sec:g}/s'
+        if self.max_fall_per_sec is not None and -rate > self.max_fall_per_sec:
+            return f'falling {-rate:g}/s, limit {self.max_fall_per_sec:g}/s'
+        return None
+
+# Trips when no valid sample has arrived for max_age_sec (logger stopped, sensor off, cable pulled, etc.)
+# Checked by the engine's watchdog thread, since there is no new sample to react to when data goes stale
+class StaleDataRule:
+    def __init__(self, name, channel, max_age_sec, actions=(), latch=True):
+        self.name = name
+        self.channel = channel
+        self.max_age_sec = max_age_sec
+        self.actions = list(actions)
+        self.latch = latch
+        self.tripped = False
+        self.last_valid_time = time.time()        # Counts from when the rule is made, so data that never arrives also trips it
+
+    def check(self, timestamp, value):
+        if not math.isnan(value):
+            self.last_valid_time = max(self.last_valid_time, timestamp)
+        return None
+
+    def check_age(self, now):
+        age = now - self.last_valid_time
+        if age > self.max_age_sec:
+            return f'no valid data for {age:.1f} s, limit {self.max_age_sec:g} s'
+        return None
+
+# Runs the rules on every sample handed to process_sample (from the logging loop, or from a SampleStreamClient with attach_stream)
+# Rules are indexed by channel, so a sample only costs the rules that watch its channel
+# Every trigger is logged (to log_filepath if given) with its latency: time from the sample being read to the actions being done
+# If reset_filepath is given, latched rules can be reset from another process (e.g., a GUI button) by creating that file, see request_interlock_reset
+class InterlockEngine:
+    def __init__(self, log_filepath=None, stale_check_interval_sec=0.1, reset_filepath=None):
+        self.rules = {}                           # name -> rule
+        self.rules_by_channel = {}                # channel -> list of rules checked on every sample of that channel
+        self.stale_rules = []
+        self.lock = threading.Lock()
+        self.running = True
+
+        self.log_file = None
+        if log_filepath is not None:
+            create_interlock_log_csv(log_filepath)
+            self.log_file = open(log_filepath, mode='a', newline='')
+            self.log_writer = csv.writer(self.log_file)
+
+        self.reset_filepath = reset_filepath
+        self.stale_check_interval_sec = stale_check_interval_sec
+        self.watchdog_thread = threading.Thread(target=self.watchdog_loop, daemon=True)
+        self.watchdog_thread.start()
+
+    def add_rule(self, rule):
+        with self.lock:
+            self.rules[rule.name] = rule
+            self.rules_by_channel.setdefault(rule.channel, []).append(rule)
+            if isinstance(rule, StaleDataRule):
+                self.stale_rules.append(rule)
+
+    # Check every rule of the channel against a new sample (timestamp from time.time() when the sample was read)
+    # Actions run right here, in the caller's thread, before the caller goes on to write the sample to disk
+    def process_sample(self, channel, timestamp, value):
+        with self.lock:
+            for rule in self.rules_by_channel.get(channel, ()):
+                self.update_rule(rule, rule.check(timestamp, value), timestamp, value)
+
+    # Runs in its own thread, checks the stale data rules and the reset file
+    def watchdog_loop(self):
+        while self.running:
+            time.sleep(self.stale_check_interval_sec)
+            if self.reset_filepath is not None and os.path.exists(self.reset_filepath):
+                self.reset_from_file()
+            with self.lock:
+                now = time.time()
+                for rule in self.stale_rules:
+                    self.update_rule(rule, rule.check_age(now), rule.last_valid_time + rule.max_age_sec, float('nan'))
+
+    # Fires the rule's actions when its condition is newly met, and re-arms unlatched rules once it clears
+    def update_rule(self, rule, message, timestamp, value):
+        if message is None:
+            if rule.tripped and not rule.latch:
+                rule.tripped = False
+            return
+        if rule.tripped:
+            return
+        rule.tripped = True
+
+        action_start = time.time()
+        errors = []
+        for action in rule.actions:
+            try:
+                action(rule, timestamp, value, message)
+            except Exception as error:  # One failing action must not stop the others
+                errors.append(f'{getattr(action, "__name__", "action")}: {error}')
+        done = time.time()
+        self.log_trigger(rule, timestamp, value, message, (done - timestamp) * 1000, (done - action_start) * 1000, errors)
+
+    # Logging happens after the actions so disk writes never delay them
+    def log_trigger(self, rule, timestamp, value, message, latency_ms, action_ms, errors):
+        log_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+        print(f'{log_time} - INTERLOCK {rule.name} ({rule.channel}): {message}, latency {latency_ms:.2f} ms' + (f', errors: {"; ".join(errors)}' if errors else ''))
+        if self.log_file is not None:
+            self.log_writer.writerow([log_time, rule.name, rule.channel, value, message, f'{latency_ms:.3f}', f'{action_ms:.3f}', '; '.join(errors)])
+            self.log_file.flush()
+            os.fsync(self.log_file.fileno())
+
+    # Re-arms a latched rule (or every rule if name is None) once the cause has been dealt with
+    # A rule whose condition is still met trips again (and fires its actions again) on its next check
+    def reset(self, name=None):
+        with self.lock:
+            for rule in ([self.rules[name]] if name is not None else self.rules.values()):
+                if rule.tripped:
+                    self.log_reset(rule)
+                rule.tripped = False
+                if isinstance(rule, StaleDataRule):
+                    rule.last_valid_time = time.time()
+
+    # Resets the rule named in the reset file (every rule if the file is empty), then deletes the file so the reset is only done once
+    def reset_from_file(self):
+        try:
+            with open(self.reset_filepath, 'r') as reset_file:
+                name = reset_file.read().strip() or None
+            os.remove(self.reset_filepath)
+        except OSError as error:
+            print(f'Could not read interlock reset file {self.reset_filepath}: {error}')
+            return
+        if name is not None and name not in self.rules:
+            print(f'Interlock reset requested for unknown rule {name}, rules are: {", ".join(self.rules)}')
+            return
+        self.reset(name)
+
+    def log_reset(self, rule):
+        log_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        print(f'{log_time} - INTERLOCK {rule.name} ({rule.channel}): reset')
+        if self.log_file is not None:
+            self.log_writer.writerow([log_time, rule.name, rule.channel, '', 'Reset', '', '', ''])
+            self.log_file.flush()
+
+    # Names of the rules that are currently tripped
+    def tripped_rules(self):
+        with self.lock:
+            return [name for name, rule in self.rules.items() if rule.tripped]
+
+    # Check the rules on every sample a SampleStreamClient receives, from the client's receiving thread
+    def attach_stream(self, stream_client):
+        with self.lock:
+            channels = list(self.rules_by_channel)
+        for channel in channels:
+            stream_client.add_callback(channel, self.process_sample)
+
+    def close(self):
+        self.running = False
+        with self.lock:
+            if self.log_file is not None:
+                self.log_file.close()
+                self.log_file = None
+
+# Action that writes a new setpoint (percentage of full scale) to a flow controller, new_setpoint(0) closes the gas flow
+# Works with GF100Serial or a controller on a GF100Bus (use the bus so the write is not slowed down by fixed sleeps)
+def set_flow_setpoint_action(controller, flowPercent=0):
+    def set_flow_setpoint(rule, timestamp, value, message):
+        controller.new_setpoint(flowPercent)
+    return set_flow_setpoint
+
+# Asks an InterlockEngine running in another process (started with this reset_filepath) to reset a rule, or every rule if name is None
+# The file is written under a temporary name first so the engine never reads it half written
+def request_interlock_reset(reset_filepath, name=None):
+    with open(reset_filepath + '.tmp', 'w') as reset_file:
+        reset_file.write(name or '')
+    os.replace(reset_filepath + '.tmp', reset_filepath)
+
+# Creates a new interlock log CSV with a header row if it doesn't already exist
+def create_interlock_log_csv(filepath):
+    if not os.path.exists(filepath):  # Check if the file already exists
+        with open(filepath, mode='w', newline='') as file:  # Open in write mode
+            writer = csv.writer(file)
+            writer.writerow(['Time', 'Rule', 'Channel', 'Value', 'Message', 'LatencyMs', 'ActionMs', 'Errors'])  # Write column headers
+
+# Example usage
+if __name__ == '__main__':
+    def print_action(rule, timestamp, value, message):
+        print(f'Action for {rule.name}')
+
+    engine = InterlockEngine()
+    engine.add_rule(ThresholdRule('overpressure', 'outer_vessel_pressure', above=900.0, actions=[print_action]))
+    engine.add_rule(RateOfChangeRule('fast rise', 'outer_vessel_pressure', window_sec=10, max_rise_per_sec=5.0, actions=[print_action]))
+    engine.add_rule(StaleDataRule('pressure stale', 'outer_vessel_pressure', max_age_sec=1.0, actions=[print_action]))
+    for pressure in [750.0, 760.0, 950.0]:
+        engine.process_sample('outer_vessel_pressure', time.time(), pressure)
+        time.sleep(0.5)
+    time.sleep(1.5)
+    engine.close()
@@ -0,0 +1,165 @@
+import io
+import os
+import threading
+import time
+import numpy as np
+from ..gui.get_data_for_GUI import resolve_log_filepath, read_time_range, decode_datatype
+from ..analysis.run_analysis_functions import get_wall_clock_seconds
+
+'''Classes to replay existing logs as if the hardware was running, at 1x-1000x speed with the timestamps rewritten to the time they are replayed'''
+
+# One log to replay: the rows of source_filepath are written to target_filepath (a new file, overwritten if it exists)
+# with the same columns as the source, only the 'Time' column is replaced by the time the row is replayed
+# If a datatype is given, the rows are also decoded (same decoders as the GUI) so they can be published on a sample stream channel of that name
+class LogReplay:
+    def __init__(self, source_filepath, target_filepath, datatype=None):
+        source_filepath = resolve_log_filepath(source_filepath)
+        if os.path.abspath(source_filepath) == os.path.abspath(target_filepath):
+            raise ValueError(f'Replay target {target_filepath} is the log being replayed, use another filepath')
+        self.source_filepath = source_filepath
+        self.target_filepath = target_filepath
+        self.datatype = datatype
+
+        dataframe = read_time_range(source_filepath)  # Whole log, works for archives too
+        if len(dataframe) == 0:
+            raise ValueError(f'{source_filepath} has no rows to replay')
+        self.times = get_wall_clock_seconds(dataframe)  # Seconds, only differences between rows are used
+        self.values = decode_datatype(dataframe, datatype).to_numpy(dtype=float) if datatype is not None else None
+
+        # Every row as CSV text without its 'Time' column, so writing a row is just the new time + the rest of the line
+        buffer = io.StringIO()
+        dataframe.drop(columns=['Time']).to_csv(buffer, header=False, index=False, lineterminator='\n')
+        self.row_tails = [',' + line + '\n' for line in buffer.getvalue().split('\n')[:-1]]
+        self.header = ','.join(dataframe.columns) + '\n'
+
+        # Length of one pass through the log, the next pass starts one typical interval after the last row
+        self.cycle_sec = self.times[-1] - self.times[0] + (float(np.median(np.diff(self.times))) if len(self.times) > 1 else 1.0)
+        self.index = 0
+        self.cycle = 0
+
+    # Source time of the next row to write, counted from the first row of the first pass
+    def next_time(self):
+        return self.times[self.index] - self.times[0] + self.cycle * self.cycle_sec
+
+    def advance(self, loop):
+        self.index += 1
+        if self.index == len(self.times) and loop:
+            self.index = 0
+            self.cycle += 1
+
+    def finished(self):
+        return self.index >= len(self.times)
+
+# Replays several logs together, interleaved by their original times, at speed times real time (speed can be changed while it runs)
+# Logs keep their offsets relative to each other, e.g. a log that started 20 s after another starts 20 s / speed after it in the replay
+# Every row due at the same moment is written in one batch with one flush per file, so high speeds do not cost a flush per row
+class LogReplayer:
+    def __init__(self, replays, speed=1.0, stream_server=None, loop=True):
+        self.replays = replays
+        self.stream_server = stream_server
+        self.loop = loop
+        self.running = False
+        self.lock = threading.Lock()
+        self.files = None                         # target filepath -> open file, see open_targets
+        self.set_speed(speed)
+
+        # Statistics, see get_stats
+        self.rows_written = 0
+        self.max_lag_sec = 0.0                    # How late rows were written compared to when they were due
+
+    # Changes the speed, replay continues from where it is
+    def set_speed(self, speed):
+        with self.lock:
+            now = time.monotonic()
+            if hasattr(self, 'speed'):
+                self.source_anchor = self.source_now(now)
+            else:
+                self.source_anchor = 0.0
+            self.wall_anchor = now
+            self.speed = speed
+
+    # Source time (seconds from the first row) that the replay is at on the monotonic clock time now
+    def source_now(self, now):
+        return self.source_anchor + (now - self.wall_anchor) * self.speed
+
+    # Returns a dict of the statistics since the last reset, and resets them if reset=True
+    def get_stats(self, reset=False):
+        with self.lock:
+            stats = {'rows_written': self.rows_written, 'max_lag_sec': self.max_lag_sec}
+            if reset:
+                self.rows_written = 0
+                self.max_lag_sec = 0.0
+        return stats
+
+    # Creates every target file (overwriting it) with just the header, so plots of the targets can be set up before the first row is replayed
+    def open_targets(self):
+        self.files = {}
+        for replay in self.replays:
+            self.files[replay.target_filepath] = open(replay.target_filepath, mode='w', newline='')  # Start every target from a fresh file
+            self.files[replay.target_filepath].write(replay.header)
+            self.files[replay.target_filepath].flush()
+
+    # Replays until every log is done (never if loop=True), until duration_sec has passed, or until stop is called
+    def run(self, duration_sec=None):
+        if self.files is None:
+            self.open_targets()
+        files = self.files
+
+        self.running = True
+        start = time.monotonic()
+        try:
+            while self.running and (duration_sec is None or time.monotonic() - start < duration_sec):
+                active = [replay for replay in self.replays if not replay.finished()]
+                if not active:
+                    break
+
+                with self.lock:
+                    now = time.monotonic()
+                    source_time = self.source_now(now)
+                    next_due = min(replay.next_time() for replay in active)
+                    wait_sec = (next_due - source_time) / self.speed
+                if wait_sec > 0:
+                    time.sleep(min(wait_sec, 0.05))  # Short sleeps so speed changes and stop are picked up quickly
+                    continue
+
+                # Write every row that is due, one batch per file
+                timestamp_time = time.time()
+                timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp_time))
+                written = 0
+                for replay in active:
+                    lines = []
+                    while not replay.finished() and replay.next_time() <= source_time:
+                        lines.append(timestamp + replay.row_tails[replay.index])
+                        if self.stream_server is not None and replay.values is not None:
+                            self.stream_server.publish(replay.datatype, timestamp_time, replay.values[replay.index])
+                        replay.advance(self.loop)
+                    if lines:
+                        files[replay.target_filepath].write(''.join(lines))
+                        files[replay.target_filepath].flush()
+                        written += len(lines)
+
+                with self.lock:
+                    self.rows_written += written
+                    self.max_lag_sec = max(self.max_lag_sec, (source_time - next_due) / self.speed)
+        finally:
+            self.running = False
+            for file in files.values():
+                file.close()
+            self.files = None
+
+    # Runs the replay in a background thread, the target files exist (with their header) when this returns
+    def start(self, duration_sec=None):
+        if self.files is None:
+            self.open_targets()
+        self.thread = threading.Thread(target=self.run, kwargs={'duration_sec': duration_sec}, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+# Example usage
+if __name__ == '__main__':
+    replayer = LogReplayer([LogReplay('40L_run_control/outer_vessel_pressure_log.csv', '40L_run_control/replay/outer_vessel_pressure_log.csv', 'outer_vessel_pressure'),
+                            LogReplay('40L_run_control/gas_flow_log.csv', '40L_run_control/replay/gas_flow_log.csv', 'flowrate')], speed=10)
+    replayer.run(duration_sec=10)
+    print(replayer.get_stats())
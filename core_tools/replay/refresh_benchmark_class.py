@@ -0,0 +1,128 @@
+import time
+import numpy as np
+try:
+    from PyQt5 import QtCore
+except ImportError:
+    from pyqtgraph.Qt import QtCore
+
+'''Class to find the replay speed at which the GUI's refresh pipeline (timers, CSV reads, decoding, drawing) can no longer keep up'''
+
+# Ramps a LogReplayer through speeds while a LivePlotter plots the replayed logs, spending seconds_per_speed at each speed
+# At each speed it measures:
+#   the time spent in plot updates (every LiveTab.update call is timed) and the share of the wall time it takes (utilization)
+#   the event loop lag: how late a probe timer fires compared to when it was due, the GUI feels frozen when this grows
+#   the replayer's own lag, so a slow disk is not mistaken for a slow GUI
+# The GUI is falling behind at a speed if utilization reaches max_utilization or the event loop lag (95th percentile) reaches max_loop_lag_ms
+class RefreshBenchmark:
+    def __init__(self, plotter, replayer, speeds=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000), seconds_per_speed=10, max_utilization=0.8, max_loop_lag_ms=250, probe_interval_ms=50):
+        self.plotter = plotter
+        self.replayer = replayer
+        self.speeds = list(speeds)
+        self.seconds_per_speed = seconds_per_speed
+        self.max_utilization = max_utilization
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.probe_interval_ms = probe_interval_ms
+
+        self.update_times = []                    # Duration in seconds of every plot update in the current stage
+        self.loop_lags = []                       # Event loop lag in seconds of every probe in the current stage
+        self.results = []                         # One dict per speed, see finish_stage
+        self.stage = -1
+
+        # Time every plot update, the timers call tab.update(title) so replacing the bound method on the tab is enough
+        for tab in plotter.tab_objects.values():
+            tab.update = self.timed_update(tab.update)
+
+        self.probe_timer = QtCore.QTimer()
+        self.probe_timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.probe_timer.timeout.connect(self.probe)
+        self.stage_timer = QtCore.QTimer()
+        self.stage_timer.setSingleShot(True)
+        self.stage_timer.timeout.connect(self.next_stage)
+
+    def timed_update(self, update):
+        def update_and_time(title):
+            start = time.perf_counter()
+            update(title)
+            self.update_times.append(time.perf_counter() - start)
+        return update_and_time
+
+    def probe(self):
+        now = time.perf_counter()
+        self.loop_lags.append(max(0.0, now - self.last_probe - self.probe_interval_ms / 1000.0))
+        self.last_probe = now
+
+    # Starts the replay and the first stage, call before LivePlotter.run
+    def start(self):
+        self.replayer.set_speed(self.speeds[0])
+        self.replayer.start()
+        QtCore.QTimer.singleShot(0, self.next_stage)
+
+    def next_stage(self):
+        if self.stage >= 0:
+            self.finish_stage()
+            if self.results[-1]['falling_behind'] or self.stage + 1 == len(self.speeds):
+                self.report()
+                return
+
+        self.stage += 1
+        self.replayer.set_speed(self.speeds[self.stage])
+        self.replayer.get_stats(reset=True)
+        self.update_times = []
+        self.loop_lags = []
+        self.stage_start = time.perf_counter()
+        self.last_probe = self.stage_start
+        self.probe_timer.start(self.probe_interval_ms)
+        self.stage_timer.start(int(self.seconds_per_speed * 1000))
+
+    def finish_stage(self):
+        self.probe_timer.stop()
+        wall_sec = time.perf_counter() - self.stage_start
+        replay_stats = self.replayer.get_stats(reset=True)
+        update_times = np.array(self.update_times) if self.update_times else np.array([0.0])
+        loop_lags = np.array(self.loop_lags) if self.loop_lags else np.array([0.0])
+        utilization = float(np.sum(update_times)) / wall_sec
+        loop_lag_p95_ms = float(np.percentile(loop_lags, 95)) * 1000
+        self.results.append({
+            'speed': self.speeds[self.stage],
+            'rows_per_sec': replay_stats['rows_written'] / wall_sec,
+            'replay_lag_ms': replay_stats['max_lag_sec'] * 1000,
+            'updates': len(self.update_times),
+            'mean_update_ms': float(np.mean(update_times)) * 1000,
+            'max_update_ms': float(np.max(update_times)) * 1000,
+            'utilization': utilization,
+            'loop_lag_p95_ms': loop_lag_p95_ms,
+            'loop_lag_max_ms': float(np.max(loop_lags)) * 1000,
+            'falling_behind': utilization >= self.max_utilization or loop_lag_p95_ms >= self.max_loop_lag_ms,
+        })
+        result = self.results[-1]
+        print(f"{result['speed']:>6}x  {result['rows_per_sec']:>9.1f}  {result['replay_lag_ms']:>10.1f}  {result['updates']:>7}  {result['mean_update_ms']:>8.2f}  {result['max_update_ms']:>8.2f}  {result['utilization']:>6.1%}  {result['loop_lag_p95_ms']:>8.1f}  {result['loop_lag_max_ms']:>8.1f}  {'BEHIND' if result['falling_behind'] else 'ok'}")
+
+    # Prints the verdict, stops the replay and quits the GUI
+    def report(self):
+        self.replayer.stop()
+        behind = [result for result in self.results if result['falling_behind']]
+        if behind:
+            keeping_up = [result['speed'] for result in self.results if not result['falling_behind']]
+            print(f"GUI falls behind at {behind[0]['speed']}x replay speed ({behind[0]['rows_per_sec']:.0f} rows/s)" + (f", keeps up at {keeping_up[-1]}x" if keeping_up else ''))
+        else:
+            print(f'GUI kept up at every speed tested (up to {self.speeds[-1]}x)')
+        self.plotter.app.quit()
+
+    @staticmethod
+    def print_header():
+        print(' Speed   Rows/s  ReplayLag  Updates  MeanUpd   MaxUpd   Util   LagP95    LagMax  (times in ms)')
+
+# Example usage
+if __name__ == '__main__':
+    from ..gui.live_plotter_GUI_class import LivePlotter
+    from .log_replay_class import LogReplay, LogReplayer
+
+    plotter = LivePlotter('Replay benchmark')
+    tab = plotter.create_tab('Replay', plots_per_row=1)
+    tab.add_plot(title='Outer Vessel Pressure', x_axis=('Time since present', 's'), y_axis=('Pressure', 'Torr'), buffer_size=1000, csv_filepath='40L_run_control/replay/outer_vessel_pressure_log.csv', datatype='outer_vessel_pressure')
+    tab.start_timer(title='Outer Vessel Pressure', interval_ms=1000)
+    replayer = LogReplayer([LogReplay('40L_run_control/outer_vessel_pressure_log.csv', '40L_run_control/replay/outer_vessel_pressure_log.csv')])
+    benchmark = RefreshBenchmark(plotter, replayer, seconds_per_speed=5)
+    RefreshBenchmark.print_header()
+    benchmark.start()
+    plotter.run()
@@ -0,0 +1,53 @@
+import struct
+import socket
+
+'''Functions to encode/decode the framed binary samples sent over the local sample stream'''
+
+# Every frame on the wire is: [4 byte little-endian length of the body][body]
+# The body is: [1 byte channel name length][channel name (utf-8)][8 byte float timestamp][8 byte float value]
+# The timestamp is seconds since the epoch (time.time()), invalid readings (e.g., 'Off', 'Bad') are sent as NaN
+FRAME_HEADER = struct.Struct('<I')
+SAMPLE_BODY = struct.Struct('<dd')
+
+# Turns an address given on the command line into something socket.bind/connect understands
+# A plain number is treated as a TCP port on localhost, anything else is treated as a Unix socket path
+def parse_stream_address(text):
+    if isinstance(text, tuple):
+        return text
+    if str(text).isdigit():
+        return ('127.0.0.1', int(text))
+    return str(text)
+
+# Creates an unconnected socket of the right family for the address (Unix socket path or (host, port) tuple)
+def create_stream_socket(address):
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+# Packs one sample into a single frame of bytes ready to be sent
+def encode_sample_frame(channel, timestamp, value):
+    channel_bytes = channel.encode('utf-8')
+    if len(channel_bytes) > 255:
+        raise ValueError(f'Channel name is too long to be framed: {channel}')
+    body = bytes([len(channel_bytes)]) + channel_bytes + SAMPLE_BODY.pack(float(timestamp), float(value))
+    return FRAME_HEADER.pack(len(body)) + body
+
+# Decodes every complete frame at the start of buffer
+# Returns a list of (channel, timestamp, value) tuples and the number of bytes consumed, so partial frames can be kept for the next recv
+def decode_sample_frames(buffer):
+    samples = []
+    position = 0
+    while len(buffer) - position >= FRAME_HEADER.size:
+        (body_length,) = FRAME_HEADER.unpack_from(buffer, position)
+        frame_end = position + FRAME_HEADER.size + body_length
+        if len(buffer) < frame_end:
+            break  # Rest of the frame has not arrived yet
+
+        body_start = position + FRAME_HEADER.size
+        channel_length = buffer[body_start]
+        channel = bytes(buffer[body_start + 1:body_start + 1 + channel_length]).decode('utf-8')
+        timestamp, value = SAMPLE_BODY.unpack_from(buffer, body_start + 1 + channel_length)
+        samples.append((channel, timestamp, value))
+
+        position = frame_end
+    return samples, position
@@ -0,0 +1,102 @@
+import socket
+import threading
+import time
+from collections import deque
+from .sample_frame_functions import decode_sample_frames, create_stream_socket, parse_stream_address
+
+'''Class to subscribe to the sample stream served by SampleStreamServer and collect new samples as they are pushed'''
+
+class SampleStreamClient:
+    def __init__(self, address, channels=None, max_queue_samples=10000, reconnect_sec=1.0):
+        # address: TCP port number, (host, port) tuple, or a Unix socket path (see parse_stream_address)
+        # channels: list of channel names to keep, None keeps every channel
+        # max_queue_samples: how many samples per channel are kept until get_new_samples is called, oldest are dropped first
+        # reconnect_sec: how long to wait before trying to connect again if the server is not up (e.g., logger not started yet)
+        self.address = parse_stream_address(address)
+        self.channels = set(channels) if channels is not None else None
+        self.max_queue_samples = max_queue_samples
+        self.reconnect_sec = reconnect_sec
+
+        self.samples = {}                         # channel -> deque of (timestamp, value) not yet collected
+        self.callbacks = {}                       # channel -> list of functions called as func(channel, timestamp, value)
+        self.lock = threading.Lock()
+        self.connected = False
+        self.running = True
+        self.sock = None
+
+        self.thread = threading.Thread(target=self.receive_loop, daemon=True)
+        self.thread.start()
+
+    # Register a function to be called (from the receiving thread) on every new sample of a channel
+    def add_callback(self, channel, func):
+        with self.lock:
+            self.callbacks.setdefault(channel, []).append(func)
+
+    # Runs in its own thread, connects to the server and keeps decoding frames until closed
+    def receive_loop(self):
+        while self.running:
+            try:
+                self.sock = create_stream_socket(self.address)
+                self.sock.connect(self.address)
+            except OSError:
+                self.sock.close()
+                time.sleep(self.reconnect_sec)
+                continue
+
+            self.connected = True
+            buffer = bytearray()
+            try:
+                while self.running:
+                    chunk = self.sock.recv(65536)
+                    if not chunk:
+                        break  # Server closed the connection
+                    buffer += chunk
+                    samples, consumed = decode_sample_frames(buffer)
+                    del buffer[:consumed]
+                    for channel, timestamp, value in samples:
+                        self.store_sample(channel, timestamp, value)
+            except OSError:
+                pass
+            finally:
+                self.connected = False
+                self.sock.close()
+
+            if self.running:
+                time.sleep(self.reconnect_sec)
+
+    def store_sample(self, channel, timestamp, value):
+        if self.channels is not None and channel not in self.channels:
+            return
+        with self.lock:
+            if channel not in self.samples:
+                self.samples[channel] = deque(maxlen=self.max_queue_samples)
+            self.samples[channel].append((timestamp, value))
+            callbacks = list(self.callbacks.get(channel, []))
+        for func in callbacks:
+            func(channel, timestamp, value)
+
+    # Returns (timestamps, values) lists of every sample received for a channel since the last call
+    def get_new_samples(self, channel):
+        with self.lock:
+            pending = self.samples.get(channel)
+            if not pending:
+                return [], []
+            timestamps, values = zip(*pending)
+            pending.clear()
+        return list(timestamps), list(values)
+
+    def close(self):
+        self.running = False
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)  # Wakes up the receiving thread if it is blocked in recv
+                self.sock.close()
+            except OSError:
+                pass
+
+# Example usage
+if __name__ == '__main__':
+    client = SampleStreamClient(50007)
+    while True:
+        time.sleep(1)
+        print(client.get_new_samples('test'))
@@ -0,0 +1,129 @@
+import os
+import socket
+import threading
+from collections import deque
+from .sample_frame_functions import encode_sample_frame, create_stream_socket, parse_stream_address
+
+'''Class to serve new samples from the acquisition side to any number of local subscribers (GUI, alarms, second monitor, etc.)'''
+
+class StreamSubscriber:
+    def __init__(self, connection, max_queue_frames):
+        self.connection = connection
+        # Bounded queue of frames waiting to be sent, when it is full the oldest frame is dropped so a slow consumer never blocks the logger
+        self.frames = deque(maxlen=max_queue_frames)
+        self.condition = threading.Condition()
+        self.dropped_frames = 0
+        self.closed = False
+
+        self.thread = threading.Thread(target=self.send_loop, daemon=True)
+        self.thread.start()
+
+    # Queue a frame for this subscriber, never blocks
+    def push(self, frame):
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped_frames += 1  # deque drops the oldest frame on its own, just keep count
+            self.frames.append(frame)
+            self.condition.notify()
+
+    # Runs in its own thread, sends everything queued in one go whenever there is something to send
+    def send_loop(self):
+        while True:
+            with self.condition:
+                while not self.frames and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                batch = b''.join(self.frames)
+                self.frames.clear()
+
+            try:
+                self.connection.sendall(batch)
+            except OSError:
+                self.close()  # Subscriber went away, server will forget about it on the next publish
+                return
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.connection.close()
+        except OSError:
+            pass
+
+class SampleStreamServer:
+    def __init__(self, address, max_queue_frames=1000):
+        # address: TCP port number, (host, port) tuple, or a Unix socket path (see parse_stream_address)
+        # max_queue_frames: how many frames each subscriber can fall behind by before the oldest ones get dropped
+        self.address = parse_stream_address(address)
+        self.max_queue_frames = max_queue_frames
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.running = True
+
+        self.server_socket = create_stream_socket(self.address)
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.remove(self.address)  # Remove a stale socket file left behind by a previous run
+        else:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind(self.address)
+        self.server_socket.listen()
+
+        self.accept_thread = threading.Thread(target=self.accept_loop, daemon=True)
+        self.accept_thread.start()
+
+    # Runs in its own thread, adds every new connection as a subscriber
+    def accept_loop(self):
+        while self.running:
+            try:
+                connection, _ = self.server_socket.accept()
+            except OSError:
+                return  # Server socket was closed
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            with self.lock:
+                self.subscribers.append(StreamSubscriber(connection, self.max_queue_frames))
+
+    # Push a new sample to every subscriber, the frame is encoded once no matter how many subscribers there are
+    def publish(self, channel, timestamp, value):
+        frame = encode_sample_frame(channel, timestamp, value)
+        with self.lock:
+            self.subscribers = [subscriber for subscriber in self.subscribers if not subscriber.closed]
+            for subscriber in self.subscribers:
+                subscriber.push(frame)
+
+    # Number of frames dropped for slow subscribers that are still connected
+    def dropped_frames(self):
+        with self.lock:
+            return sum(subscriber.dropped_frames for subscriber in self.subscribers)
+
+    def close(self):
+        self.running = False
+        try:
+            self.server_socket.shutdown(socket.SHUT_RDWR)  # Wakes up the accepting thread
+        except OSError:
+            pass
+        try:
+            self.server_socket.close()
+        except OSError:
+            pass
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.close()
+            self.subscribers = []
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+# Example usage
+if __name__ == '__main__':
+    import time
+
+    server = SampleStreamServer(50007)
+    while True:
+        server.publish('test', time.time(), 1.0)
+        time.sleep(1)
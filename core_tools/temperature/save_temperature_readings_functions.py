@@ -0,0 +1,60 @@
+import time
+import csv
+import math
+import os
+from .vmm_temperature_sensor_class import SimulatedVMMTemperatureSensor
+
+'''Functions to handle VMM temperature readings and log them to a CSV file'''
+
+# Every VMM goes into the same row: one timestamped row per sample with a 'VMM <i>' column per VMM, instead of one file or row per VMM
+# so the GUI reads and decodes one block per update no matter how many VMMs there are (see get_temperature_block in core_tools/gui/get_data_for_GUI.py)
+
+# Formats one temperature for the log, a VMM that could not be read is left empty (read back as NaN)
+def format_temperature(value):
+    return '' if value is None or math.isnan(value) else f'{value:.2f}'
+
+# Creates a new CSV file with a header row if it doesn't already exist
+def create_temperature_log_csv(filepath, num_vmms):
+    if not os.path.exists(filepath):  # Check if the file already exists
+        with open(filepath, mode='w', newline='') as file:  # Open in write mode
+            writer = csv.writer(file)
+            writer.writerow(['Time'] + [f'VMM {i}' for i in range(num_vmms)])  # Write column headers
+
+#Logs the temperature of every VMM to CSV at regular intervals indefinitely or for a set duration
+#If a SampleStreamServer is given, every reading is also pushed to its subscribers, one channel per VMM named like the GUI datatypes ('vmm_temperature:0', 'vmm_temperature:1', ...)
+def log_temperature_to_csv(sensor, filepath, interval_sec, duration_sec=None, stream_server=None): #None by default means run indefinitely unless specified
+    start_time = time.time()
+
+    with open(filepath, mode='a', newline='') as file:  # Open in append mode
+        writer = csv.writer(file)
+
+        while duration_sec is None or time.time() - start_time < duration_sec:  # Loop indefinitely or keep looping until time is up
+            temperatures = sensor.read_temperatures()  # Read every VMM at once
+            sample_time = time.time()
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sample_time))  # Format current time
+
+            if stream_server is not None:
+                for i, temperature in enumerate(temperatures):
+                    stream_server.publish(f'vmm_temperature:{i}', sample_time, temperature)  # Push to subscribers before the slow disk write
+
+            writer.writerow([timestamp] + [format_temperature(temperature) for temperature in temperatures])  # One row for every VMM
+            file.flush()               # Flush Python’s internal buffer
+            os.fsync(file.fileno())   # Force OS to flush file to disk
+
+            valid = [temperature for temperature in temperatures if not math.isnan(temperature)]
+            print(f"{timestamp} - {len(valid)}/{len(temperatures)} VMMs read" + (f", min/max: {min(valid):.2f}/{max(valid):.2f} deg C" if valid else ''))  # Console log
+            time.sleep(interval_sec)  # Wait before next reading
+
+    sensor.close_port()  # Close connection when done
+    if stream_server is not None:
+        stream_server.close()
+
+# Example usage
+if __name__ == '__main__':
+    log_filepath = '40L_run_control/temperature_log.csv'  # CSV log file path
+    num_vmms = 32
+
+    create_temperature_log_csv(log_filepath, num_vmms)  # Ensure the file exists and has a header
+
+    temperatureSensor = SimulatedVMMTemperatureSensor(num_vmms)
+    log_temperature_to_csv(temperatureSensor, log_filepath, interval_sec=2)  # Start logging
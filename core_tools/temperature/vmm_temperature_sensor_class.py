@@ -0,0 +1,30 @@
+import math
+import random
+import time
+
+'''Class standing in for the VMM temperature readout, until the readout hardware is connected'''
+
+# Any sensor given to log_temperature_to_csv needs the same two functions:
+#   read_temperatures()  returns a list with one temperature (deg C) per VMM, NaN for a VMM that could not be read
+#   close_port()         closes the connection to the readout
+# This one makes up readings (a slow drift plus noise around base_temperature) so the logger, logs and GUI can be tested without the hardware
+class SimulatedVMMTemperatureSensor:
+    def __init__(self, num_vmms, base_temperature=30.0, noise=0.05, seed=None):
+        self.num_vmms = num_vmms
+        self.base_temperature = base_temperature
+        self.noise = noise
+        self.random = random.Random(seed)
+        self.offsets = [self.random.uniform(-2.0, 2.0) for _ in range(num_vmms)]  # Each VMM runs a bit warmer or cooler
+        self.start_time = time.time()
+
+    def read_temperatures(self):
+        drift = 0.5 * math.sin((time.time() - self.start_time) / 600.0)  # 10 minute scale drift shared by every VMM
+        return [self.base_temperature + offset + drift + self.random.gauss(0.0, self.noise) for offset in self.offsets]
+
+    def close_port(self):
+        pass
+
+# Example usage
+if __name__ == '__main__':
+    sensor = SimulatedVMMTemperatureSensor(num_vmms=32)
+    print(sensor.read_temperatures())
@@ -1,3 +1,6 @@
+import time
+startup_t0 = time.perf_counter()  # Taken before any other import so start-up time measurement includes them
+import sys
 from core_tools.gui.live_plotter_GUI_class import LivePlotter
 from core_tools.MKSPDR2000_pressure.save_pressure_readings_functions import create_pressure_log_csv
 from core_tools.flowrate.save_gas_flow_readings_functions import create_flow_log_csv
@@ -5,18 +8,37 @@ from core_tools.flowrate.save_gas_flow_readings_functions import create_flow_log
 '''Launches run control GUI for the 40L system as specified by the user in this file.'''
 #Create the CSV files for logging data BEFORE adding the relevant plot to the GUI window because the plotter will look for the file when it is created. Use the create_X_log_csv functions to create the files.
 #Do NOT use any filenames with whitespaces in them, as this will cause issues with the terminal command buttons.
+#The output of each command is shown in a pane below its button, auto_restart=True restarts a logger automatically if it crashes (e.g., serial port unplugged).
 #The widgets (plots, buttons, etc.) are added to the GUI window in the order they are written here and fill from left to right, top to bottom.
 #For more infromation on how to use the LivePlotter class, see GitHub readme file or the source code at core_tools/gui/live_plotter_GUI_class.py
+#Run with --measure-startup to print how long the GUI takes to become interactive and to show the first tab, then quit
+#Run with --dashboard <port> to also serve the plots (read-only) to web browsers on other machines at http://<this PC>:<port>, add --no-window to only serve the dashboard
 
-plotter = LivePlotter("Test Live Plotter")
+if '--no-window' in sys.argv:
+    import os
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # No screen needed, the widgets are made but never shown
+
+plotter = LivePlotter("Test Live Plotter", measure_startup_from=startup_t0 if '--measure-startup' in sys.argv else None)
 
 pressure_log_filepath = '40L_run_control/outer_vessel_pressure_log.csv'
 inner_vessel_pressure_log_filepath = '40L_run_control/inner_vessel_pressure_log.csv'
 gas_flow_log_filepath = '40L_run_control/gas_flow_log.csv'
+interlock_log_filepath = '40L_run_control/interlock_log.csv'
+interlock_reset_filepath = '40L_run_control/interlock_reset'
+temperature_log_filepath = '40L_run_control/temperature_log.csv'
+
+#Local ports the loggers serve their live samples on, so other programs (alarms, second monitor, etc.) can subscribe without reading the CSVs
+#To plot straight from a stream instead of a CSV, use add_stream_plot, e.g.:
+#pressure_tab.add_stream_plot(title='Plot Outer Vessel Pressure', x_axis=('Time since present', 's'), y_axis=('Pressure', 'Torr'), buffer_size=10, stream_address=pressure_stream_port, channel='outer_vessel_pressure')
+pressure_stream_port = 50007
+gas_flow_stream_port = 50008
 
 create_pressure_log_csv(pressure_log_filepath)
 create_flow_log_csv(gas_flow_log_filepath)
 
+#Cache of the plots' data so a restarted GUI shows the history it had right away, saved every 60 seconds and when the GUI closes
+plotter.enable_buffer_cache('40L_run_control/gui_plot_buffer_cache.npz', interval_sec=60)
+
 pressure_tab = plotter.create_tab(tab_name='Pressure', plots_per_row=2)
 
 #pressure tab plots
@@ -26,18 +48,29 @@ pressure_tab.start_timer(title='Plot Inner Vessel Pressure', interval_ms=1000)
 pressure_tab.add_plot(title='Plot Outer Vessel Pressure', x_axis=('Time since present', 's'), y_axis=('Pressure', 'Torr'), buffer_size=10, csv_filepath=pressure_log_filepath, datatype='outer_vessel_pressure')
 pressure_tab.start_timer(title='Plot Outer Vessel Pressure', interval_ms=1000)
 
+#Gauge pressure is outer vessel - inner vessel (plot2 - plot1), regulate_pressure.py takes its setpoint with the same sign
 pressure_tab.add_subtraction_plot(title='Plot Gauge Pressure', x_axis=('Time since present', 's'), y_axis=('Pressure', 'Torr'), buffer_size=10)
 pressure_tab.start_subtraction_plot_timer(title='Plot Gauge Pressure', plot1_title='Plot Inner Vessel Pressure', plot2_title='Plot Outer Vessel Pressure', interval_ms=1000)
 
 pressure_tab.add_plot(title='Plot Gas Flowrate', x_axis=('Time since present', 's'), y_axis=('Flowrate', 'L/min'), buffer_size=10, csv_filepath=gas_flow_log_filepath, datatype='flowrate')
 pressure_tab.start_timer(title='Plot Gas Flowrate', interval_ms=1000)
 
-#pressure tab controls
-pressure_tab.add_dropdown_menu(title='Pressure log increment', option_names=['2s', '10s', '1m', '10m', '1hr'], option_values=[2, 10, 60, 600, 600*6], ctrl_var='Log Outer Vessel Pressure', on_change_callback=pressure_tab.change_pressure_or_flowrate_cmd)
-pressure_tab.add_command_button(title='Log Outer Vessel Pressure', command=f'.venv\Scripts\python.exe 40L_run_control/log_pressure.py {pressure_log_filepath} COM4 2')
+#pressure rise (leak) rate of each vessel, fitted over the last 10 minutes, 1 hour and 6 hours
+pressure_tab.add_leak_rate_readout(title='Inner Vessel Leak Rate', plot_title='Plot Inner Vessel Pressure', windows_sec=[600, 3600, 6*3600], interval_ms=1000)
+pressure_tab.add_leak_rate_readout(title='Outer Vessel Leak Rate', plot_title='Plot Outer Vessel Pressure', windows_sec=[600, 3600, 6*3600], interval_ms=1000)
 
-pressure_tab.add_dropdown_menu(title='Gas flowrate log increment', option_names=['2s', '10s', '1m', '10m', '1hr'], option_values=[2, 10, 60, 600, 600*6], ctrl_var='Log Gas Flowrate', on_change_callback=pressure_tab.change_pressure_or_flowrate_cmd)
-pressure_tab.add_command_button(title='Log Gas Flowrate', command=f'.venv\Scripts\python.exe 40L_run_control/log_gas_flowrate.py {gas_flow_log_filepath} COM3 2')
+#pressure tab controls
+#The pressure log increment is also given to 'Log Gas Flowrate' so the interlock knows how often to expect pressure data (restart 'Log Gas Flowrate' after changing it)
+pressure_tab.add_dropdown_menu(title='Pressure log increment', option_names=['2s', '10s', '1m', '10m', '1hr'], option_values=[2, 10, 60, 600, 600*6], ctrl_var=[('Log Outer Vessel Pressure', 4), ('Log Gas Flowrate', 9)], on_change_callback=pressure_tab.change_cmd_multiple)
+pressure_tab.add_command_button(title='Log Outer Vessel Pressure', command=f'.venv\Scripts\python.exe 40L_run_control/log_pressure.py {pressure_log_filepath} COM4 2 None {pressure_stream_port}', auto_restart=True)
+
+pressure_tab.add_dropdown_menu(title='Gas flowrate log increment', option_names=['2s', '10s', '1m', '10m', '1hr'], option_values=[2, 10, 60, 600, 600*6], ctrl_var=('Log Gas Flowrate', 4), on_change_callback=pressure_tab.change_pressure_or_flowrate_cmd)
+#The gas flow logger can also run the interlock (off by default, turn it on before starting 'Log Gas Flowrate'): it follows the pressure served by 'Log Outer Vessel Pressure'
+#and closes the gas flow on an overpressure, a fast pressure rise, or stale pressure data (limits are set in log_gas_flowrate.py), so only turn it on while 'Log Outer Vessel Pressure' is running
+#A tripped rule stays tripped (latched) until 'Reset Interlock' is pressed once the cause is fixed
+pressure_tab.add_dropdown_menu(title='Gas flow interlock', option_names=['Off', 'On'], option_values=['None', pressure_stream_port], ctrl_var=('Log Gas Flowrate', 7), on_change_callback=pressure_tab.change_pressure_or_flowrate_cmd)
+pressure_tab.add_command_button(title='Log Gas Flowrate', command=f'.venv\Scripts\python.exe 40L_run_control/log_gas_flowrate.py {gas_flow_log_filepath} COM3 2 None {gas_flow_stream_port} None {interlock_log_filepath} 2 {interlock_reset_filepath}', auto_restart=True)
+pressure_tab.add_command_button(title='Reset Interlock', command=f'.venv\Scripts\python.exe 40L_run_control/reset_interlock.py {interlock_reset_filepath}')
 
 pressure_tab.add_dropdown_menu(title='Gas Flowrate Setting', option_names=['0%', '5%', '25%', '50%', '75%', '100%'], option_values=[0, 5, 25, 50, 75, 100], ctrl_var='Change Gas Flowrate', on_change_callback=pressure_tab.change_pressure_or_flowrate_cmd)
 pressure_tab.add_command_button(title='Change Gas Flowrate', command=f'.venv\Scripts\python.exe 40L_run_control/change_gas_flowrate.py COM3 0')
@@ -46,16 +79,26 @@ pressure_ctrl_titles = ['Plot Inner Vessel Pressure', 'Plot Outer Vessel Pressur
 pressure_tab.add_dropdown_menu(title='# data points shown', option_names=['10', '50', '100', '1000', '10000'], option_values=[10, 50, 100, 1000, 10000], ctrl_var=pressure_ctrl_titles, on_change_callback=pressure_tab.change_buffer_size_multiple)
 
 
-pressure_tab.cmd_timer(500)
-
-'''temp_tab = plotter.create_tab(tab_name='Temperature', plots_per_row=4)
+#dense=True draws all 32 plots in one graphics view refreshed together, which repaints much faster than 32 separate plot widgets
+#Every VMM is logged in one row of the same log, datatype 'vmm_temperature:<i>' plots VMM i, and the log is read once per update for all 32 plots
+'''from core_tools.temperature.save_temperature_readings_functions import create_temperature_log_csv
 num_vmms = 32
+create_temperature_log_csv(temperature_log_filepath, num_vmms)
+temp_tab = plotter.create_tab(tab_name='Temperature', plots_per_row=4, dense=True)
 temp_ctrl_titles = []
 for i in range(0, num_vmms):
-    temp_tab.add_plot(title=f'Plot VMM {i} Temperature', x_axis=('Time since present', 's'), y_axis=('Temperature', 'deg C'), buffer_size=10, csv_filepath=pressure_log_filepath, datatype='outer_vessel_pressure')
+    temp_tab.add_plot(title=f'Plot VMM {i} Temperature', x_axis=('Time since present', 's'), y_axis=('Temperature', 'deg C'), buffer_size=10, csv_filepath=temperature_log_filepath, datatype=f'vmm_temperature:{i}')
     temp_tab.start_timer(title=f'Plot VMM {i} Temperature', interval_ms=1000)
     temp_ctrl_titles.append(f'Plot VMM {i} Temperature')
+temp_tab.add_command_button(title='Log VMM Temperatures', command=f'.venv\Scripts\python.exe 40L_run_control/log_temperature.py {temperature_log_filepath} {num_vmms} 2', auto_restart=True)
 temp_tab.add_dropdown_menu(title='# data points shown', option_names=['10', '50', '100', '1000', '10000'], option_values=[10, 50, 100, 1000, 10000], ctrl_var=temp_ctrl_titles, on_change_callback=temp_tab.change_buffer_size_multiple)
 '''
 
+if '--dashboard' in sys.argv:
+    dashboard_port = int(sys.argv[sys.argv.index('--dashboard') + 1])
+    if '--no-window' in sys.argv:
+        plotter.serve_dashboard(dashboard_port)
+        sys.exit()
+    plotter.start_dashboard(dashboard_port)
+
 plotter.run()
\ No newline at end of file
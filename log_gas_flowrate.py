@@ -1,16 +1,39 @@
 from core_tools.flowrate.save_gas_flow_readings_functions import create_flow_log_csv, log_flow_to_csv
-from core_tools.flowrate.gas_flow_controller_serial_class import GF100Serial
+from core_tools.flowrate.gas_flow_controller_bus_class import GF100Bus
+from core_tools.streaming.sample_stream_server_class import SampleStreamServer
+from core_tools.streaming.sample_stream_client_class import SampleStreamClient
+from core_tools.interlock.interlock_engine_class import InterlockEngine, ThresholdRule, RateOfChangeRule, StaleDataRule, set_flow_setpoint_action
 import sys
 
-#To run script, use format: python3 <log_pressure.py filepath> <log_filepath (make sure to add .csv)> <serial_port> <interval_sec> <duration_sec (optional, leave empty for indefinite)>
-#If using venv, use format: .venv\Scripts\python.exe <log_pressure.py filepath> <log_filepath (make sure to add .csv)> <serial_port> <interval_sec> <duration_sec (optional, leave empty for indefinite)>
+#To run script, use format: python3 <log_gas_flowrate.py filepath> <log_filepath (make sure to add .csv)> <serial_port> <interval_sec> <duration_sec (optional, leave empty or use None for indefinite)> <stream_address (optional, TCP port or Unix socket path to serve live samples on, None to not serve)> <interlock_pressure_stream_address (optional, stream address of log_pressure.py to close the gas flow on an overpressure)> <interlock_log_filepath (optional, make sure to add .csv)> <pressure_interval_sec (optional, interval log_pressure.py logs at, default 2)> <interlock_reset_filepath (optional, see reset_interlock.py)>
+#If using venv, use format: .venv\Scripts\python.exe <log_gas_flowrate.py filepath> <log_filepath (make sure to add .csv)> <serial_port> <interval_sec> <duration_sec (optional, leave empty or use None for indefinite)> <stream_address (optional, TCP port or Unix socket path to serve live samples on, None to not serve)> <interlock_pressure_stream_address (optional, stream address of log_pressure.py to close the gas flow on an overpressure)> <interlock_log_filepath (optional, make sure to add .csv)> <pressure_interval_sec (optional, interval log_pressure.py logs at, default 2)> <interlock_reset_filepath (optional, see reset_interlock.py)>
 
 log_filepath = sys.argv[1]
 serial_port = sys.argv[2]
 interval_sec = float(sys.argv[3])
-duration_sec = float(sys.argv[4]) if len(sys.argv) > 4 else None
+duration_sec = float(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] != 'None' else None
+stream_server = SampleStreamServer(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] != 'None' else None  # Push samples to live subscribers (GUI, alarms, etc.) if an address is given
+interlock_stream_address = sys.argv[6] if len(sys.argv) > 6 and sys.argv[6] != 'None' else None
+interlock_log_filepath = sys.argv[7] if len(sys.argv) > 7 and sys.argv[7] != 'None' else None
+pressure_interval_sec = float(sys.argv[8]) if len(sys.argv) > 8 else 2.0
+interlock_reset_filepath = sys.argv[9] if len(sys.argv) > 9 and sys.argv[9] != 'None' else None
 
 create_flow_log_csv(log_filepath)  # Ensure the file exists and has a header
-flowController = GF100Serial(serial_port, baudrate=115200, macID=36)
-log_flow_to_csv(sensor=flowController, filepath=log_filepath, interval_sec=interval_sec, maxFlow=0.4, maxFlowUnits='L/min', duration_sec=duration_sec)
+bus = GF100Bus(serial_port, baudrate=115200, macIDs=[36])  # The bus driver serializes the logger's polls and the interlock's writes on the same port
+flowController = bus.controller(36)
+
+interlock = None
+if interlock_stream_address is not None:
+    #Interlock limits, change them here (pressure in Torr)
+    #Every rule latches: once tripped it does not fire again until it is reset with reset_interlock.py (needs interlock_reset_filepath) or the logger is restarted
+    #Pressure data counts as stale after 3 missed pressure readings (at least 30 s), so logging pressure at a long interval does not trip the interlock
+    closeGas = set_flow_setpoint_action(flowController, 0)
+    interlock = InterlockEngine(log_filepath=interlock_log_filepath, reset_filepath=interlock_reset_filepath)
+    interlock.add_rule(ThresholdRule('Overpressure', 'outer_vessel_pressure', above=1000.0, actions=[closeGas]))
+    interlock.add_rule(RateOfChangeRule('Fast pressure rise', 'outer_vessel_pressure', window_sec=10, max_rise_per_sec=5.0, actions=[closeGas]))
+    interlock.add_rule(StaleDataRule('Pressure data stale', 'outer_vessel_pressure', max_age_sec=max(30, 3 * pressure_interval_sec), actions=[closeGas]))
+    interlock.attach_stream(SampleStreamClient(interlock_stream_address, channels=['outer_vessel_pressure']))
+
+log_flow_to_csv(sensor=flowController, filepath=log_filepath, interval_sec=interval_sec, maxFlow=0.4, maxFlowUnits='L/min', duration_sec=duration_sec, stream_server=stream_server, interlock=interlock)
+bus.close_port()
 #if baudrate, macID, maxFlow (maximum flowrate), and/or maxFlowUnits (units of maxFlow) change for the mass flow controller, you will have to manually change it here
\ No newline at end of file
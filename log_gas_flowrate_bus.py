@@ -0,0 +1,20 @@
+from core_tools.flowrate.save_gas_flow_readings_functions import create_flow_log_csv, log_bus_flows_to_csv
+from core_tools.flowrate.gas_flow_controller_bus_class import GF100Bus
+from core_tools.streaming.sample_stream_server_class import SampleStreamServer
+import sys
+
+#To run script, use format: python3 <log_gas_flowrate_bus.py filepath> <serial_port> <interval_sec> <stream_address (TCP port or Unix socket path to serve live samples on, or None)> <macID:log_filepath (make sure to add .csv)> <macID:log_filepath (optional, as many as there are controllers on the bus)>
+#If using venv, use format: .venv\Scripts\python.exe <log_gas_flowrate_bus.py filepath> <serial_port> <interval_sec> <stream_address (TCP port or Unix socket path to serve live samples on, or None)> <macID:log_filepath (make sure to add .csv)> <macID:log_filepath (optional, as many as there are controllers on the bus)>
+
+serial_port = sys.argv[1]
+interval_sec = float(sys.argv[2])
+stream_server = SampleStreamServer(sys.argv[3]) if sys.argv[3] != 'None' else None  # Push samples to live subscribers (GUI, alarms, etc.) if an address is given
+filepaths = {}
+for arg in sys.argv[4:]:
+    macID, log_filepath = arg.split(':', 1)
+    filepaths[int(macID)] = log_filepath
+    create_flow_log_csv(log_filepath)  # Ensure the file exists and has a header
+
+bus = GF100Bus(serial_port, baudrate=115200, macIDs=list(filepaths))
+log_bus_flows_to_csv(bus=bus, filepaths=filepaths, interval_sec=interval_sec, maxFlow=0.4, maxFlowUnits='L/min', stream_server=stream_server)
+#if baudrate, maxFlow (maximum flowrate), and/or maxFlowUnits (units of maxFlow) change for the mass flow controllers, you will have to manually change it here
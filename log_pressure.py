@@ -1,15 +1,18 @@
 from core_tools.MKSPDR2000_pressure.save_pressure_readings_functions import create_pressure_log_csv, log_pressure_to_csv
 from core_tools.MKSPDR2000_pressure.pressure_sensor_serial_class import MKSPDR2000Serial
+from core_tools.streaming.sample_stream_server_class import SampleStreamServer
 import sys
 
-#To run script, use format: python3 <log_pressure.py filepath> <log_filepath (make sure to add .csv)> <serial_port> <interval_sec> <duration_sec (optional, leave empty for indefinite)>
-#If using venv, use format: .venv\Scripts\python.exe <log_pressure.py filepath> <log_filepath (make sure to add .csv)> <serial_port> <interval_sec> <duration_sec (optional, leave empty for indefinite)>
+#To run script, use format: python3 <log_pressure.py filepath> <log_filepath (make sure to add .csv)> <serial_port> <interval_sec> <duration_sec (optional, leave empty or use None for indefinite)> <stream_address (optional, TCP port or Unix socket path to serve live samples on, None to not serve)> <leak_rate_log_filepath (optional, make sure to add .csv)>
+#If using venv, use format: .venv\Scripts\python.exe <log_pressure.py filepath> <log_filepath (make sure to add .csv)> <serial_port> <interval_sec> <duration_sec (optional, leave empty or use None for indefinite)> <stream_address (optional, TCP port or Unix socket path to serve live samples on, None to not serve)> <leak_rate_log_filepath (optional, make sure to add .csv)>
 
 log_filepath = sys.argv[1]
 serial_port = sys.argv[2]
 interval_sec = float(sys.argv[3])
-duration_sec = float(sys.argv[4]) if len(sys.argv) > 4 else None
+duration_sec = float(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] != 'None' else None
+stream_server = SampleStreamServer(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] != 'None' else None  # Push samples to live subscribers (GUI, alarms, etc.) if an address is given
+leak_rate_filepath = sys.argv[6] if len(sys.argv) > 6 else None  # Also log the fitted pressure rise rate if a filepath is given
 
 create_pressure_log_csv(log_filepath)  # Ensure the file exists and has a header
 pressureSensor = MKSPDR2000Serial(serial_port)
-log_pressure_to_csv(pressureSensor, log_filepath, interval_sec=interval_sec, duration_sec=duration_sec)
\ No newline at end of file
+log_pressure_to_csv(pressureSensor, log_filepath, interval_sec=interval_sec, duration_sec=duration_sec, stream_server=stream_server, leak_rate_filepath=leak_rate_filepath)
\ No newline at end of file
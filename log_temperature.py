@@ -0,0 +1,19 @@
+from core_tools.temperature.save_temperature_readings_functions import create_temperature_log_csv, log_temperature_to_csv
+from core_tools.temperature.vmm_temperature_sensor_class import SimulatedVMMTemperatureSensor
+from core_tools.streaming.sample_stream_server_class import SampleStreamServer
+import sys
+
+#To run script, use format: python3 <log_temperature.py filepath> <log_filepath (make sure to add .csv)> <num_vmms> <interval_sec> <duration_sec (optional, leave empty or use None for indefinite)> <stream_address (optional, TCP port or Unix socket path to serve live samples on, None to not serve)>
+#If using venv, use format: .venv\Scripts\python.exe <log_temperature.py filepath> <log_filepath (make sure to add .csv)> <num_vmms> <interval_sec> <duration_sec (optional, leave empty or use None for indefinite)> <stream_address (optional, TCP port or Unix socket path to serve live samples on, None to not serve)>
+
+log_filepath = sys.argv[1]
+num_vmms = int(sys.argv[2])
+interval_sec = float(sys.argv[3])
+duration_sec = float(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] != 'None' else None
+stream_server = SampleStreamServer(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] != 'None' else None  # Push samples to live subscribers (GUI, alarms, etc.) if an address is given
+
+create_temperature_log_csv(log_filepath, num_vmms)  # Ensure the file exists and has a header
+
+#The VMM temperature readout is not connected yet, so readings are simulated. Once it is, replace this with its sensor class (anything with read_temperatures() and close_port()), you will have to manually change it here
+temperatureSensor = SimulatedVMMTemperatureSensor(num_vmms)
+log_temperature_to_csv(temperatureSensor, log_filepath, interval_sec=interval_sec, duration_sec=duration_sec, stream_server=stream_server)
@@ -0,0 +1,43 @@
+from core_tools.control.pid_controller_class import PIDController
+from core_tools.control.pressure_regulator_class import PressureRegulator, StreamPressureSource, CSVPressureSource
+from core_tools.flowrate.gas_flow_controller_bus_class import GF100Bus
+from core_tools.flowrate.save_gas_flow_readings_functions import create_flow_log_csv, log_flow_to_csv
+import threading
+import sys
+
+#To run script, use format: python3 <regulate_pressure.py filepath> <serial_port> <setpoint_torr (gauge pressure, outer vessel - inner vessel like 'Plot Gauge Pressure' in the GUI, or the inner vessel pressure if there is no outer source)> <loop_hz> <inner_pressure_source> <outer_pressure_source (or None to regulate the inner vessel pressure alone)> <regulator_log_filepath (make sure to add .csv)> <flow_log_filepath (optional, make sure to add .csv)> <flow_log_interval_sec (optional)>
+#If using venv, use format: .venv\Scripts\python.exe <regulate_pressure.py filepath> <serial_port> <setpoint_torr (gauge pressure, outer vessel - inner vessel like 'Plot Gauge Pressure' in the GUI, or the inner vessel pressure if there is no outer source)> <loop_hz> <inner_pressure_source> <outer_pressure_source (or None to regulate the inner vessel pressure alone)> <regulator_log_filepath (make sure to add .csv)> <flow_log_filepath (optional, make sure to add .csv)> <flow_log_interval_sec (optional)>
+#The setpoint has the same sign as 'Plot Gauge Pressure' in the GUI: to hold the inner vessel 10 Torr above the outer vessel, use -10
+#A pressure source is either a log CSV (ends with .csv) whose last row is read every loop, or the stream address of a logger (e.g., 50007 for log_pressure.py)
+#The script keeps the flow controller's port open for as long as it runs, so do not run log_gas_flowrate.py at the same time: give a flow log filepath here instead and the flowrate is logged over the same connection
+
+# Reads a pressure source argument
+def get_pressure_source(arg, datatype):
+    if arg.endswith('.csv') or arg.endswith('.csv.gz'):
+        return CSVPressureSource(arg, datatype)
+    return StreamPressureSource(arg, datatype)  # Stream channels have the same names as the datatypes
+
+serial_port = sys.argv[1]
+setpoint_torr = float(sys.argv[2])
+loop_hz = float(sys.argv[3])
+inner_source = get_pressure_source(sys.argv[4], 'inner_vessel_pressure')
+outer_source = get_pressure_source(sys.argv[5], 'outer_vessel_pressure') if sys.argv[5] != 'None' else None
+regulator_log_filepath = sys.argv[6]
+flow_log_filepath = sys.argv[7] if len(sys.argv) > 7 else None
+flow_log_interval_sec = float(sys.argv[8]) if len(sys.argv) > 8 else 2.0
+
+bus = GF100Bus(serial_port, baudrate=115200, macIDs=[36])  # One persistent connection shared by the regulator and the flow logger
+flowController = bus.controller(36)
+
+if flow_log_filepath is not None:
+    create_flow_log_csv(flow_log_filepath)  # Ensure the file exists and has a header
+    threading.Thread(target=log_flow_to_csv, kwargs=dict(sensor=flowController, filepath=flow_log_filepath, interval_sec=flow_log_interval_sec, maxFlow=0.4, maxFlowUnits='L/min'), daemon=True).start()
+
+#PID gains and limits, change them here (output is the flow setpoint in % of full scale, measurement in Torr)
+pid = PIDController(kp=0.5, ki=0.05, kd=0.0, output_min=0.0, output_max=100.0, max_output_rate_per_sec=5.0)
+regulator = PressureRegulator(flowController, pid, setpoint_torr, inner_source, outer_source, loop_hz=loop_hz, max_data_age_sec=10.0)
+try:
+    regulator.run(log_filepath=regulator_log_filepath)
+finally:
+    bus.close_port()
+#if baudrate, macID, maxFlow (maximum flowrate), and/or maxFlowUnits (units of maxFlow) change for the mass flow controller, you will have to manually change it here
@@ -0,0 +1,52 @@
+from core_tools.replay.log_replay_class import LogReplay, LogReplayer
+from core_tools.streaming.sample_stream_server_class import SampleStreamServer
+import os
+import sys
+import time
+
+#To run script, use format: python3 <replay_logs.py filepath> <speed (1 to 1000, or benchmark)> <replay_directory> <stream_address (TCP port or Unix socket path to serve the replayed samples on, or None)> <datatype:log_filepath> <datatype:log_filepath (optional, as many as needed)>
+#If using venv, use format: .venv\Scripts\python.exe <replay_logs.py filepath> <speed (1 to 1000, or benchmark)> <replay_directory> <stream_address (or None)> <datatype:log_filepath> <datatype:log_filepath (optional, as many as needed)>
+#Each log is replayed into a file with the same name inside replay_directory (overwritten if it exists), point the GUI plots at those files to watch the replay
+#With benchmark instead of a speed, the logs are replayed at faster and faster speeds into a GUI plotting them, until the GUI can no longer keep up
+
+speed = sys.argv[1]
+replay_directory = sys.argv[2]
+stream_server = SampleStreamServer(sys.argv[3]) if sys.argv[3] != 'None' else None  # Push replayed samples to live subscribers, channels are named after the datatypes
+os.makedirs(replay_directory, exist_ok=True)
+
+replays = []
+for arg in sys.argv[4:]:
+    datatype, log_filepath = arg.split(':', 1)
+    replays.append(LogReplay(log_filepath, os.path.join(replay_directory, os.path.basename(log_filepath).replace('.gz', '')), datatype))
+
+if speed != 'benchmark':
+    replayer = LogReplayer(replays, speed=float(speed), stream_server=stream_server)
+    replayer.start()
+    try:
+        while replayer.running:
+            time.sleep(10)
+            stats = replayer.get_stats(reset=True)
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {stats['rows_written'] / 10:.1f} rows/s, max lag {stats['max_lag_sec'] * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        replayer.stop()
+else:
+    from core_tools.gui.live_plotter_GUI_class import LivePlotter
+    from core_tools.replay.refresh_benchmark_class import RefreshBenchmark
+
+    #Plots to stress, change the buffer size and refresh interval here to match the GUI being tested
+    buffer_size = 1000
+    interval_ms = 1000
+
+    plotter = LivePlotter('Replay benchmark')
+    tab = plotter.create_tab(tab_name='Replay', plots_per_row=2)
+    replayer = LogReplayer(replays, stream_server=stream_server)
+    replayer.open_targets()  # The plots need the files to exist
+    for replay in replays:
+        title = f'Plot {os.path.basename(replay.target_filepath)}'
+        tab.add_plot(title=title, x_axis=('Time since present', 's'), y_axis=(replay.datatype, ''), buffer_size=buffer_size, csv_filepath=replay.target_filepath, datatype=replay.datatype)
+        tab.start_timer(title=title, interval_ms=interval_ms)
+
+    benchmark = RefreshBenchmark(plotter, replayer)
+    RefreshBenchmark.print_header()
+    benchmark.start()
+    plotter.run()
@@ -0,0 +1,12 @@
+from core_tools.interlock.interlock_engine_class import request_interlock_reset
+import sys
+
+#To run script, use format: python3 <reset_interlock.py filepath> <reset_filepath (same as given to log_gas_flowrate.py)> <rule_name (optional, leave empty to reset every rule)>
+#If using venv, use format: .venv\Scripts\python.exe <reset_interlock.py filepath> <reset_filepath (same as given to log_gas_flowrate.py)> <rule_name (optional, leave empty to reset every rule)>
+#Rule names with spaces have to be quoted, e.g. "Pressure data stale"
+
+reset_filepath = sys.argv[1]
+rule_name = ' '.join(sys.argv[2:]) or None
+
+request_interlock_reset(reset_filepath, rule_name)
+print(f'Requested reset of {rule_name or "every interlock rule"}, the running logger picks it up within a second')